@@ -0,0 +1,52 @@
+from argparse import ArgumentParser
+from os import path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from grapy.store.importer import BulkImporter
+
+
+def generate(directory, nodes, edges, seed=0):
+    random = Random(seed)
+    nodes_file = path.join(directory, 'nodes.csv')
+    edges_file = path.join(directory, 'edges.csv')
+
+    with open(nodes_file, 'w', encoding='utf-8') as file:
+        file.write('id,labels,name,age:int\n')
+        for i in range(nodes):
+            file.write('{0},Person,user {0},{1}\n'.format(i, random.randint(18, 90)))
+
+    with open(edges_file, 'w', encoding='utf-8') as file:
+        file.write('source,target,type,weight:float\n')
+        for _ in range(edges):
+            file.write('{0},{1},KNOWS,{2:.3f}\n'.format(random.randrange(nodes), random.randrange(nodes),
+                                                          random.random()))
+
+    return nodes_file, edges_file
+
+
+def main():
+    parser = ArgumentParser(description='Measures bulk import throughput of generated CSV files')
+    parser.add_argument('--nodes', type=int, default=100000)
+    parser.add_argument('--edges', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, default=50000)
+    parser.add_argument('--processes', type=int, default=0)
+    arguments = parser.parse_args()
+
+    with TemporaryDirectory() as input_dir, TemporaryDirectory() as store_dir:
+        nodes_file, edges_file = generate(input_dir, arguments.nodes, arguments.edges)
+
+        importer = BulkImporter(store_dir, dense_ids=True, batch_size=arguments.batch_size,
+                                processes=arguments.processes)
+
+        started = perf_counter()
+        summary = importer.run([nodes_file], [edges_file])
+        elapsed = perf_counter() - started
+
+        print(summary)
+        print('{0:.1f} s, {1:,.0f} edges/s'.format(elapsed, summary.edges / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+from argparse import ArgumentParser
+from struct import Struct
+from time import perf_counter
+
+from grapy.store.property import PropertyCodec, PropertyHeader, PropertyRecord, RecordType, ValueDeserializer, \
+    ValueSerializer, ValueStructFormatFactory
+
+# header written before the value by the previous path
+LEGACY_HEADER_FORMAT = '<QQHQ'
+
+# values fit into property records, blob store writes are not part of the codec
+VALUES = [42, 3.14, True, b'\x00\x01\x02\x03', 'name', 'sixteen bytes...']
+
+
+class LegacyCodec:
+    # previous path: serializer objects, isinstance cascades and separate
+    # header and value structs
+
+    def __init__(self):
+        self.header_struct = Struct(LEGACY_HEADER_FORMAT)
+        self.factory = ValueStructFormatFactory()
+        self.structs = {}
+
+    def struct(self, struct_format):
+        struct = self.structs.get(struct_format, None)
+        if not struct:
+            struct = self.structs[struct_format] = Struct(struct_format)
+
+        return struct
+
+    def encode(self, record):
+        serialized_value = ValueSerializer(record).serialize()
+        struct = self.struct(self.factory.for_store(serialized_value))
+
+        header = record.header
+        header.type = RecordType(record).type
+        header.length = struct.size
+
+        return self.header_struct.pack(*list(header)), struct.pack(serialized_value)
+
+    def decode(self, header_buffer, value_buffer):
+        header = PropertyHeader(*self.header_struct.unpack(header_buffer))
+        struct = self.struct(self.factory.for_restore(header))
+
+        record = PropertyRecord(header)
+        record.value = ValueDeserializer(header).deserialize(struct.unpack(value_buffer)[0])
+
+        return record
+
+
+def make_records(count):
+    records = []
+    for i in range(count):
+        record = PropertyRecord(PropertyHeader(i, i + 1, 0, 0))
+        record.value = VALUES[i % len(VALUES)]
+        records.append(record)
+
+    return records
+
+
+def measure(function, records):
+    started = perf_counter()
+    function(records)
+    return len(records) / (perf_counter() - started)
+
+
+def main():
+    parser = ArgumentParser(description='Compares property record encoding and decoding paths')
+    parser.add_argument('--records', type=int, default=200000)
+    arguments = parser.parse_args()
+
+    records = make_records(arguments.records)
+    legacy = LegacyCodec()
+    codec = PropertyCodec()
+
+    legacy_encoded = [legacy.encode(record) for record in records]
+    encoded = [codec.encode(record) for record in records]
+
+    results = [
+        ('legacy encode', measure(lambda batch: [legacy.encode(record) for record in batch], records)),
+        ('codec encode', measure(lambda batch: [codec.encode(record) for record in batch], records)),
+        ('legacy decode', measure(lambda batch: [legacy.decode(*buffers) for buffers in batch], legacy_encoded)),
+        ('codec decode', measure(lambda batch: [codec.decode(buffer) for buffer in batch], encoded)),
+    ]
+
+    print('{0:>14} {1:>14}'.format('path', 'records/s'))
+    for name, throughput in results:
+        print('{0:>14} {1:>14,.0f}'.format(name, throughput))
+
+
+if __name__ == '__main__':
+    main()
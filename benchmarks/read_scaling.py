@@ -0,0 +1,61 @@
+from argparse import ArgumentParser
+from random import Random
+from tempfile import TemporaryDirectory
+from threading import Barrier, Thread
+from time import perf_counter
+
+from grapy.store.node import NodeRecord, NodeStore
+
+
+def populate(store, records):
+    batch = [NodeRecord(True, i, i, i, i, i, i) for i in range(records)]
+    return store.write_many(batch)
+
+
+def run_readers(store, record_ids, threads, reads_per_thread):
+    barrier = Barrier(threads + 1)
+
+    def reader(seed):
+        random = Random(seed)
+        ids = [random.choice(record_ids) for _ in range(reads_per_thread)]
+
+        barrier.wait()
+        for record_id in ids:
+            store.read(record_id)
+
+    workers = [Thread(target=reader, args=(seed,)) for seed in range(threads)]
+    for worker in workers:
+        worker.start()
+
+    barrier.wait()
+    started = perf_counter()
+
+    for worker in workers:
+        worker.join()
+
+    return threads * reads_per_thread / (perf_counter() - started)
+
+
+def main():
+    parser = ArgumentParser(description='Measures NodeStore read throughput for growing number of threads')
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--reads', type=int, default=50000, help='reads per thread')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    arguments = parser.parse_args()
+
+    with TemporaryDirectory() as temp_dir:
+        with NodeStore(dir=temp_dir) as store:
+            record_ids = populate(store, arguments.records)
+
+            print('{0:>8} {1:>14} {2:>8}'.format('threads', 'reads/s', 'scaling'))
+
+            baseline = None
+            for threads in arguments.threads:
+                throughput = run_readers(store, record_ids, threads, arguments.reads)
+                baseline = baseline or throughput
+
+                print('{0:>8} {1:>14,.0f} {2:>7.2f}x'.format(threads, throughput, throughput / baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from grapy.store.base.store import RecordStore
+from grapy.store.property import PropertyStore
+
+
+class AsyncRecordStore:
+
+    store_type = RecordStore
+
+    def __init__(self, store, max_workers=4, max_pending_writes=64, executor=None):
+        if not isinstance(store, self.store_type):
+            raise TypeError('{0} wraps {1} instances'.format(type(self).__name__, self.store_type.__name__))
+
+        self.store = store
+        self.__owns_executor = executor is None
+        self.__executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+        self.__write_slots = asyncio.Semaphore(max_pending_writes)
+        self.__pending_reads = {}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def open(self):
+        await self.__run(self.store.open)
+
+    async def close(self):
+        await self.__run(self.store.close)
+
+        if self.__owns_executor:
+            self.__executor.shutdown(wait=False)
+
+    async def read(self, record_id):
+        future = self.__pending_reads.get(record_id, None)
+        if future is None:
+            future = asyncio.ensure_future(self.__run(self.store.read, record_id))
+            self.__track(record_id, future)
+
+        # one cancelled waiter must not cancel the read shared with others
+        return await asyncio.shield(future)
+
+    async def read_many(self, record_ids):
+        record_ids = list(record_ids)
+        loop = asyncio.get_event_loop()
+
+        missing = [record_id for record_id in set(record_ids) if record_id not in self.__pending_reads]
+        if missing:
+            batch = asyncio.ensure_future(self.__run(self.store.read_many, missing))
+
+            created = [loop.create_future() for _ in missing]
+            for record_id, future in zip(missing, created):
+                self.__track(record_id, future)
+
+            batch.add_done_callback(lambda done: self.__resolve(created, done))
+
+        futures = [self.__pending_reads[record_id] for record_id in record_ids]
+        return list(await asyncio.shield(asyncio.gather(*futures)))
+
+    async def write(self, record):
+        async with self.__write_slots:
+            record_id = await self.__run(self.store.write, record)
+
+        # reads started before the write must not be joined after it
+        self.__forget([record_id])
+
+        return record_id
+
+    async def write_many(self, records):
+        records = list(records)
+
+        async with self.__write_slots:
+            record_ids = await self.__run(self.store.write_many, records)
+
+        self.__forget(record_ids)
+
+        return record_ids
+
+    async def delete(self, record_id):
+        self.__forget([record_id])
+
+        async with self.__write_slots:
+            await self.__run(self.store.delete, record_id)
+
+        self.__forget([record_id])
+
+    def __run(self, function, *args):
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(self.__executor, function, *args)
+
+    def __track(self, record_id, future):
+        self.__pending_reads[record_id] = future
+        future.add_done_callback(lambda _: self.__release(record_id, future))
+
+    def __forget(self, record_ids):
+        # reads in flight finish for their waiters, later reads start over
+        for record_id in record_ids:
+            self.__pending_reads.pop(record_id, None)
+
+    def __release(self, record_id, future):
+        if self.__pending_reads.get(record_id, None) is future:
+            del self.__pending_reads[record_id]
+
+    @staticmethod
+    def __resolve(futures, batch):
+        if batch.cancelled():
+            for future in futures:
+                future.cancel()
+            return
+
+        error = batch.exception()
+        if error is not None:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for future, record in zip(futures, batch.result()):
+            if not future.done():
+                future.set_result(record)
+
+
+class AsyncPropertyStore(AsyncRecordStore):
+
+    store_type = PropertyStore
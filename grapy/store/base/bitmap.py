@@ -0,0 +1,85 @@
+import re
+import zlib
+
+NON_ZERO_BYTE = re.compile(b'[^\x00]')
+
+
+class Bitmap:
+    # bit n is set when slot n belongs to the set, bytes are little-endian
+    # so set operations can go through int.from_bytes / int.to_bytes
+
+    __slots__ = ('__bits',)
+
+    def __init__(self, bits=b''):
+        self.__bits = bytearray(bits)
+
+    @classmethod
+    def from_int(cls, value):
+        return cls(value.to_bytes((value.bit_length() + 7) // 8, 'little'))
+
+    @classmethod
+    def from_slots(cls, slots):
+        bitmap = cls()
+        for slot in slots:
+            bitmap.add(slot)
+
+        return bitmap
+
+    @classmethod
+    def decompress(cls, data):
+        return cls(zlib.decompress(data))
+
+    def compress(self):
+        return zlib.compress(bytes(self.__bits))
+
+    def __int__(self):
+        return int.from_bytes(self.__bits, 'little')
+
+    def __len__(self):
+        return bin(int(self)).count('1')
+
+    def __bool__(self):
+        return NON_ZERO_BYTE.search(self.__bits) is not None
+
+    def __contains__(self, slot):
+        index = slot >> 3
+        return index < len(self.__bits) and bool(self.__bits[index] & (1 << (slot & 7)))
+
+    def __iter__(self):
+        bits = self.__bits
+        for match in NON_ZERO_BYTE.finditer(bits):
+            index = match.start()
+            byte = bits[index]
+            for bit in range(8):
+                if byte & (1 << bit):
+                    yield (index << 3) + bit
+
+    def __and__(self, other):
+        return Bitmap.from_int(int(self) & int(other))
+
+    def __or__(self, other):
+        return Bitmap.from_int(int(self) | int(other))
+
+    def __sub__(self, other):
+        return Bitmap.from_int(int(self) & ~int(other))
+
+    def __eq__(self, other):
+        return isinstance(other, Bitmap) and int(self) == int(other)
+
+    def __repr__(self):
+        return 'Bitmap({0})'.format(list(self))
+
+    def add(self, slot):
+        index = slot >> 3
+        if index >= len(self.__bits):
+            self.__bits.extend(bytes(index + 1 - len(self.__bits)))
+
+        self.__bits[index] |= 1 << (slot & 7)
+
+    def discard(self, slot):
+        index = slot >> 3
+        if index < len(self.__bits):
+            self.__bits[index] &= ~(1 << (slot & 7)) & 0xFF
+
+    def copy(self):
+        return Bitmap(self.__bits)
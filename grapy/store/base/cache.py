@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from threading import Lock
+
+# invalidations are counted in this many stripes of record ids
+GENERATION_STRIPES = 1024
+
+
+class RecordCache:
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError('Cache capacity has to be positive')
+
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__records = OrderedDict()
+        # reader takes generation before reading the record from file, its
+        # record is not cached when it has been invalidated in the meantime
+        self.__generations = [0] * GENERATION_STRIPES
+        self.__lock = Lock()
+
+    def __len__(self):
+        return len(self.__records)
+
+    def __contains__(self, record_id):
+        return record_id in self.__records
+
+    def get(self, record_id):
+        record = self.__records.get(record_id, None)
+        if record is None:
+            self.misses += 1
+            return None
+
+        try:
+            self.__records.move_to_end(record_id)
+        except KeyError:
+            # evicted or invalidated by another thread in the meantime
+            pass
+
+        self.hits += 1
+        return record
+
+    def generation(self, record_id):
+        return self.__generations[hash(record_id) % GENERATION_STRIPES]
+
+    def put(self, record_id, record, generation=None):
+        with self.__lock:
+            if generation is not None and generation != self.generation(record_id):
+                return
+
+            self.__records[record_id] = record
+            self.__records.move_to_end(record_id)
+
+            while len(self.__records) > self.capacity:
+                try:
+                    self.__records.popitem(last=False)
+                except KeyError:
+                    break
+
+                self.evictions += 1
+
+    def invalidate(self, record_id):
+        with self.__lock:
+            self.__generations[hash(record_id) % GENERATION_STRIPES] += 1
+            self.__records.pop(record_id, None)
+
+    def clear(self):
+        self.__records.clear()
@@ -1,16 +1,14 @@
-from weakref import WeakKeyDictionary
-
-
 class ConstantLengthBytes:
     def __init__(self, length):
         self.length = length
-        self._values = WeakKeyDictionary()
+        # value is kept in instance dictionary, no per-instance weak reference is needed
+        self._attribute = '_constant_length_bytes_{0}'.format(id(self))
 
     def __get__(self, instance, owner):
         if instance is None:
             return self
-        
-        return self._values.get(instance, None)
+
+        return instance.__dict__.get(self._attribute, None)
 
     def __set__(self, instance, value):
         if isinstance(value, str):
@@ -21,4 +19,4 @@ class ConstantLengthBytes:
         if len(raw) > self.length:
             raise ValueError('Value can be at most {0} bytes length'.format(self.length))
 
-        self._values[instance] = raw.ljust(self.length)
+        instance.__dict__[self._attribute] = raw.ljust(self.length)
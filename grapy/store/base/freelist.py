@@ -0,0 +1,129 @@
+from os import O_CREAT, O_RDWR
+from os import open as os_open
+from struct import Struct
+
+FREE_LIST_HEADER_FORMAT = '<8sQ'
+# little-endian
+# 8 bytes - magic - char[]
+# 8 bytes - changes - incremented by every push, pop, remove and clear (integer)
+# header is followed by free list records
+
+FREE_LIST_RECORD_FORMAT = '<Q'
+# little-endian
+# 8 bytes - offset of released record (integer)
+
+FREE_LIST_MAGIC = b'GRAPYFRE'
+
+FREE_LIST_FILE_SUFFIX = '.free'
+
+
+class FreeList:
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.__header = Struct(FREE_LIST_HEADER_FORMAT)
+        self.__struct = Struct(FREE_LIST_RECORD_FORMAT)
+        self.__file = None
+        self.__offsets = []
+        # offset -> position in the file
+        self.__members = {}
+        # records below the end of store are rewritten only after they have
+        # been released, so derived files compare it to find out they are stale
+        self.changes = 0
+
+    def __len__(self):
+        return len(self.__offsets)
+
+    def __contains__(self, offset):
+        return offset in self.__members
+
+    def __iter__(self):
+        return iter(list(self.__offsets))
+
+    def open(self):
+        self.__file = open(os_open(self.file_name, O_RDWR | O_CREAT), 'rb+')
+
+        buffer = self.__file.read()
+        start = 0
+        self.changes = 0
+
+        if buffer[:len(FREE_LIST_MAGIC)] == FREE_LIST_MAGIC and len(buffer) >= self.__header.size:
+            _, self.changes = self.__header.unpack_from(buffer)
+            start = self.__header.size
+
+        usable = len(buffer) - (len(buffer) - start) % self.__struct.size
+
+        self.__offsets = [offset for offset, in self.__struct.iter_unpack(buffer[start:usable])]
+        self.__members = {offset: position for position, offset in enumerate(self.__offsets)}
+
+        if not start:
+            # empty file or file written without header
+            self.__rewrite()
+
+    def close(self):
+        if not self.__file:
+            return
+
+        self.__file.close()
+        self.__file = None
+
+    def push(self, offset):
+        if offset in self.__members:
+            raise ValueError('Record {0} has been already released'.format(offset))
+
+        self.__file.seek(self.__position(len(self.__offsets)))
+        self.__file.write(self.__struct.pack(offset))
+
+        self.__members[offset] = len(self.__offsets)
+        self.__offsets.append(offset)
+
+        self.__changed()
+
+    def pop(self):
+        offset = self.__offsets.pop()
+        del self.__members[offset]
+
+        self.__file.truncate(self.__position(len(self.__offsets)))
+        self.__changed()
+
+        return offset
+
+    def remove(self, offset):
+        # last offset takes place of the removed one, so the file stays dense
+        position = self.__members.pop(offset)
+        last = self.__offsets.pop()
+
+        if last != offset:
+            self.__offsets[position] = last
+            self.__members[last] = position
+
+            self.__file.seek(self.__position(position))
+            self.__file.write(self.__struct.pack(last))
+
+        self.__file.truncate(self.__position(len(self.__offsets)))
+        self.__changed()
+
+    def clear(self):
+        self.__offsets = []
+        self.__members = {}
+
+        self.__file.truncate(self.__header.size)
+        self.__changed()
+
+    def __position(self, index):
+        return self.__header.size + index * self.__struct.size
+
+    def __changed(self):
+        self.changes += 1
+
+        self.__file.seek(0)
+        self.__file.write(self.__header.pack(FREE_LIST_MAGIC, self.changes))
+        self.__file.flush()
+
+    def __rewrite(self):
+        self.__file.seek(0)
+        self.__file.write(self.__header.pack(FREE_LIST_MAGIC, self.changes))
+        for offset in self.__offsets:
+            self.__file.write(self.__struct.pack(offset))
+
+        self.__file.truncate()
+        self.__file.flush()
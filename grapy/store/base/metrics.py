@@ -0,0 +1,171 @@
+from threading import Lock
+from time import perf_counter
+
+# latency bucket i counts calls shorter than 2 ** i microseconds
+LATENCY_BUCKETS = 32
+
+READ = 'read'
+WRITE = 'write'
+DELETE = 'delete'
+
+# store class name -> StoreMetrics
+METRICS = {}
+
+
+class LatencyHistogram:
+    # power-of-two microsecond buckets, counters are updated without locking
+    # so concurrent updates may be lost now and then
+
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * LATENCY_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.buckets[min(LATENCY_BUCKETS - 1, int(seconds * 1000000).bit_length())] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        # upper bound of bucket containing given fraction of calls, in seconds
+        if not self.count:
+            return 0.0
+
+        wanted = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= wanted:
+                return min(self.max, (1 << index) / 1000000)
+
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'buckets': list(self.buckets),
+        }
+
+
+class StoreMetrics:
+    # counters shared by all stores of one class; tracer, when set, is called
+    # with (store, operation, argument, seconds) after every read and write
+
+    def __init__(self, name, tracer=None):
+        self.name = name
+        self.tracer = tracer
+        self.reset()
+
+    def reset(self):
+        self.reads = 0
+        self.writes = 0
+        self.deletes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.struct_hits = 0
+        self.struct_misses = 0
+        self.read_latency = LatencyHistogram()
+        self.write_latency = LatencyHistogram()
+        self.lock_wait = LatencyHistogram()
+        self.lock_hold = LatencyHistogram()
+
+    def record_read(self, store, argument, count, started):
+        elapsed = perf_counter() - started
+        self.reads += count
+        self.read_latency.record(elapsed)
+
+        if self.tracer is not None:
+            self.tracer(store, READ, argument, elapsed)
+
+    def record_write(self, store, operation, argument, count, started):
+        elapsed = perf_counter() - started
+        if operation == DELETE:
+            self.deletes += count
+        else:
+            self.writes += count
+        self.write_latency.record(elapsed)
+
+        if self.tracer is not None:
+            self.tracer(store, operation, argument, elapsed)
+
+    def as_dict(self):
+        return {
+            'reads': self.reads,
+            'writes': self.writes,
+            'deletes': self.deletes,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'struct_hits': self.struct_hits,
+            'struct_misses': self.struct_misses,
+            'read_latency': self.read_latency.as_dict(),
+            'write_latency': self.write_latency.as_dict(),
+            'lock_wait': self.lock_wait.as_dict(),
+            'lock_hold': self.lock_hold.as_dict(),
+        }
+
+
+class TimedLock:
+    # write lock of instrumented stores, measures waiting for and holding it
+
+    __slots__ = ('__lock', '__metrics', '__acquired')
+
+    def __init__(self, metrics):
+        self.__lock = Lock()
+        self.__metrics = metrics
+        self.__acquired = 0.0
+
+    def acquire(self, blocking=True, timeout=-1):
+        started = perf_counter()
+        acquired = self.__lock.acquire(blocking, timeout)
+
+        if acquired:
+            self.__acquired = perf_counter()
+            self.__metrics.lock_wait.record(self.__acquired - started)
+
+        return acquired
+
+    def release(self):
+        self.__metrics.lock_hold.record(perf_counter() - self.__acquired)
+        self.__lock.release()
+
+    def locked(self):
+        return self.__lock.locked()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+def enable_metrics(store_class, tracer=None):
+    # stores of the class created from now on are instrumented, the others
+    # keep running without any bookkeeping
+    metrics = METRICS.get(store_class.__name__, None)
+    if metrics is None:
+        metrics = METRICS[store_class.__name__] = StoreMetrics(store_class.__name__, tracer)
+    else:
+        metrics.tracer = tracer
+
+    store_class.metrics = metrics
+
+    return metrics
+
+
+def disable_metrics(store_class):
+    # collected counters stay available in METRICS
+    store_class.metrics = None
+
+
+def collect():
+    # returns counters of every instrumented store class for export
+    return {name: metrics.as_dict() for name, metrics in METRICS.items()}
@@ -0,0 +1,149 @@
+from os import O_CREAT, O_RDWR, SEEK_END
+from os import open as os_open
+from struct import Struct
+from threading import Lock
+
+NAME_INDEX_FILE_SUFFIX = '.idx'
+
+NAME_INDEX_RECORD_FORMAT = '<Q{0}s'
+# little-endian
+# 8 bytes - offset of name record (integer)
+# n bytes - padded name, same length as in the name store - char[]
+
+
+class NameIndexMixin:
+    # maps padded names to record offsets, it has to precede RecordStore in bases
+    # of stores with records that keep their name in ConstantLengthBytes value
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__entry = Struct(NAME_INDEX_RECORD_FORMAT.format(self.record_size))
+        self.__index_file = None
+        self.__entries = {}
+        self.__names = {}
+        self.__names_lock = Lock()
+
+    @property
+    def index_file(self):
+        return self.store_file + NAME_INDEX_FILE_SUFFIX
+
+    def open(self):
+        super().open()
+
+        self.__index_file = open(os_open(self.index_file, O_RDWR | O_CREAT), 'rb+')
+        self.__load()
+
+    def close(self):
+        if self.__index_file:
+            self.__index_file.close()
+            self.__index_file = None
+
+        super().close()
+
+    def lookup(self, name):
+        offset = self.__names.get(self.__key(name), None)
+        if offset is None:
+            return None
+
+        return self._record_id(offset)
+
+    def get_or_create(self, name):
+        key = self.__key(name)
+
+        offset = self.__names.get(key, None)
+        if offset is not None:
+            return self._record_id(offset)
+
+        with self.__names_lock:
+            offset = self.__names.get(key, None)
+            if offset is not None:
+                return self._record_id(offset)
+
+            return self.write(self.record_factory((key,)))
+
+    def names(self):
+        return {key.decode('utf-8').strip(): self._record_id(offset) for key, offset in self.__names.items()}
+
+    def _write_record(self, record):
+        offset = super()._write_record(record)
+        self.__add(offset, record.value)
+
+        return offset
+
+    def _write_records(self, records):
+        offsets = super()._write_records(records)
+
+        for offset, record in zip(offsets, records):
+            self.__add(offset, record.value)
+
+        return offsets
+
+    def _record_applied(self, offset, record):
+        super()._record_applied(offset, record)
+        self.__add(offset, record.value)
+
+    def _delete_record(self, offset):
+        super()._delete_record(offset)
+
+        key = self.__entries.pop(offset, None)
+        if self.__names.get(key, None) == offset:
+            duplicates = [other for other, other_key in self.__entries.items() if other_key == key]
+            if duplicates:
+                self.__names[key] = min(duplicates)
+            else:
+                del self.__names[key]
+
+        self.__persist()
+
+    def __key(self, name):
+        return self.record_factory((name,)).value
+
+    def __add(self, offset, key):
+        self.__entries[offset] = key
+        self.__names.setdefault(key, offset)
+
+        self.__index_file.seek(0, SEEK_END)
+        self.__index_file.write(self.__entry.pack(offset, key))
+        self.__index_file.flush()
+
+    def __load(self):
+        buffer = self.__index_file.read()
+        usable = len(buffer) - len(buffer) % self.__entry.size
+
+        entries = {offset: key for offset, key in self.__entry.iter_unpack(buffer[:usable])}
+
+        live_records = self._size() // self.record_size - len(self.free_list)
+        if len(entries) != live_records:
+            # index is behind the store, e.g. after crash between both writes
+            entries = self.__scan()
+
+        self.__entries = entries
+        self.__names = {}
+        for offset in sorted(entries):
+            self.__names.setdefault(entries[offset], offset)
+
+        if usable != len(entries) * self.__entry.size:
+            self.__persist()
+
+    def __scan(self):
+        size = self._size()
+        buffer = self._read_at(0, size - size % self.record_size)
+        released = set(self.free_list)
+
+        entries = {}
+        for index, (key,) in enumerate(self._struct.iter_unpack(buffer)):
+            offset = index * self.record_size
+            if offset not in released:
+                entries[offset] = key
+
+        return entries
+
+    def __persist(self):
+        buffer = bytearray()
+        for offset in sorted(self.__entries):
+            buffer += self.__entry.pack(offset, self.__entries[offset])
+
+        self.__index_file.seek(0)
+        self.__index_file.truncate()
+        self.__index_file.write(buffer)
+        self.__index_file.flush()
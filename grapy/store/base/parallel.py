@@ -0,0 +1,188 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from mmap import mmap, ACCESS_READ, ALLOCATIONGRANULARITY
+from os import close, cpu_count, open as os_open, path, O_RDONLY
+
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:  # pragma: no cover
+    SharedMemory = None
+
+# every worker gets a few ranges, so slower ranges do not stall the scan
+RANGES_PER_WORKER = 4
+
+FILTER = 'filter'
+MAP = 'map'
+
+
+class ParallelScan:
+    # scans fixed-size store in record-aligned ranges in worker processes,
+    # every worker maps its range of the store file and writes results into
+    # shared memory, only counts are sent back
+    #
+    # functions have to be picklable (defined at module level), they get
+    # records or - with views=True - record views valid only during the call
+
+    def __init__(self, store, workers=None, views=False):
+        if SharedMemory is None:
+            raise ImportError('multiprocessing.shared_memory is required for parallel scans')
+
+        self.store = store
+        self.workers = workers or cpu_count() or 1
+        self.views = views
+        self.__executor = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def open(self):
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def close(self):
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+    def ranges(self, count):
+        # record-aligned (start, end) slot ranges
+        if not count:
+            return []
+
+        parts = max(1, min(count, self.workers * RANGES_PER_WORKER))
+        size = -(-count // parts)
+
+        return [(start, min(count, start + size)) for start in range(0, count, size)]
+
+    def filter(self, predicate):
+        # returns array of ids of records accepted by predicate, in file order
+        count = self.store.record_count
+        memory = SharedMemory(create=True, size=max(1, count * 8))
+        try:
+            found = self.__run(FILTER, predicate, 'Q', memory, count)
+
+            ids = memory.buf.cast('Q')
+            try:
+                result = array('Q')
+                for (start, _), matched in found:
+                    result.frombytes(ids[start:start + matched].cast('B'))
+            finally:
+                ids.release()
+
+            return result
+        finally:
+            memory.close()
+            memory.unlink()
+
+    def map(self, function, value_format='d'):
+        # returns array with function result for every record, value_format
+        # is native array type code of results
+        count = self.store.record_count
+        item_size = array(value_format).itemsize
+        memory = SharedMemory(create=True, size=max(1, count * item_size))
+        try:
+            self.__run(MAP, function, value_format, memory, count)
+
+            result = array(value_format)
+            result.frombytes(memory.buf[:count * item_size])
+
+            return result
+        finally:
+            memory.close()
+            memory.unlink()
+
+    def __run(self, kind, function, value_format, memory, count):
+        store = self.store
+        options = {'dense_ids': store.dense_ids}
+
+        owned = self.__executor is None
+        self.open()
+        try:
+            dir = path.dirname(store.store_file)
+            futures = [
+                (start, end, self.__executor.submit(scan_range, type(store), dir, options, start, end, function, kind,
+                                                    memory.name, value_format, self.views))
+                for start, end in self.ranges(count)
+            ]
+
+            return [((start, end), future.result()) for start, end, future in futures]
+        finally:
+            if owned:
+                self.close()
+
+
+def parallel_filter(store, predicate, workers=None, views=False):
+    return ParallelScan(store, workers, views).filter(predicate)
+
+
+def parallel_map(store, function, value_format='d', workers=None, views=False):
+    return ParallelScan(store, workers, views).map(function, value_format)
+
+
+def scan_range(store_type, dir, options, start, end, function, kind, memory_name, value_format, views):
+    # runs in worker process, returns number of results written from slot start;
+    # store is not opened, it only describes records of the file mapped read-only,
+    # opening would write its free list and index files from every worker
+    store = store_type(dir or '.', **options)
+    descriptor = os_open(store.store_file, O_RDONLY)
+    try:
+        store._open_values()
+        try:
+            return scan_mapped(store, descriptor, start, end, function, kind, memory_name, value_format, views)
+        finally:
+            store._close_values()
+    finally:
+        close(descriptor)
+
+
+def scan_mapped(store, descriptor, start, end, function, kind, memory_name, value_format, views):
+    record_size = store.record_size
+    offset = start * record_size
+    aligned = offset - offset % ALLOCATIONGRANULARITY
+
+    mapping = mmap(descriptor, end * record_size - aligned, offset=aligned, access=ACCESS_READ)
+    memory = attach(memory_name)
+    results = memory.buf.cast(value_format)
+    window = memoryview(mapping)[offset - aligned:]
+    records = None
+    written = 0
+    try:
+        if views:
+            # one view is moved over the whole range
+            view = store.view_type()
+            records = (view.move(window, index * record_size) for index in range(end - start))
+        else:
+            factory = store.record_factory
+            records = (factory(values) for values in store._struct.iter_unpack(window))
+
+        if kind == FILTER:
+            record_id = store.record_id_at
+            for index, record in enumerate(records):
+                if function(record):
+                    results[start + written] = record_id((start + index) * record_size)
+                    written += 1
+        else:
+            for index, record in enumerate(records):
+                results[start + index] = function(record)
+                written += 1
+    finally:
+        # buffers have to be released before the mapping is closed
+        records = None
+        window.release()
+        results.release()
+        memory.close()
+        mapping.close()
+
+    return written
+
+
+def attach(name):
+    try:
+        # python 3.13+, the creating process alone is responsible for unlinking
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        return SharedMemory(name=name)
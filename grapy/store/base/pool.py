@@ -0,0 +1,228 @@
+from os import pread, pwrite
+from threading import Lock
+
+DEFAULT_PAGE_SIZE = 8192
+
+
+class PageFrame:
+    # page_number-th page_size bytes of store file, data is shorter than
+    # page size only for the last page of the file
+    __slots__ = ('key', 'data', 'pins', 'referenced', 'dirty')
+
+    def __init__(self, key, data):
+        self.key = key
+        self.data = data
+        self.pins = 0
+        self.referenced = True
+        self.dirty = False
+
+
+class PoolStatistics:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.write_backs = 0
+
+    @property
+    def hit_ratio(self):
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+
+class BufferPool:
+    # pages of all attached store files share one memory budget, victims
+    # are chosen by clock (second chance) and dirty pages are written back
+    # when evicted or flushed
+
+    def __init__(self, capacity, page_size=DEFAULT_PAGE_SIZE):
+        if page_size < 1:
+            raise ValueError('Page size has to be positive')
+
+        if capacity < page_size:
+            raise ValueError('Buffer pool has to hold at least one page')
+
+        self.capacity = capacity
+        self.page_size = page_size
+        self.frame_count = capacity // page_size
+
+        self.__lock = Lock()
+        self.__frames = []
+        self.__pages = {}
+        self.__hand = 0
+        self.__files = {}
+        self.__statistics = {}
+        # file name -> dirty frames, so flushing one store does not walk every frame
+        self.__dirty = {}
+
+    def __len__(self):
+        return len(self.__pages)
+
+    def attach(self, store):
+        with self.__lock:
+            self.__files[store.store_file] = store._file.fileno()
+            self.__statistics.setdefault(store.store_file, PoolStatistics())
+            self.__dirty.setdefault(store.store_file, set())
+
+    def detach(self, store):
+        file_name = store.store_file
+
+        with self.__lock:
+            for frame in self.__frames:
+                if frame.key is not None and frame.key[0] == file_name:
+                    if frame.pins:
+                        raise RuntimeError('Page {0} of {1} is still pinned'.format(frame.key[1], file_name))
+
+                    self.__write_back(frame)
+                    del self.__pages[frame.key]
+                    frame.key = None
+                    frame.data = bytearray()
+
+            self.__files.pop(file_name, None)
+            self.__dirty.pop(file_name, None)
+
+    def statistics(self, store):
+        return self.__statistics.setdefault(store.store_file, PoolStatistics())
+
+    def hit_ratio(self, store):
+        return self.statistics(store).hit_ratio
+
+    def pin(self, store, page_number):
+        # pinned page is never evicted, its data can be used until unpin
+        with self.__lock:
+            frame = self.__page(store.store_file, page_number)
+            frame.pins += 1
+
+        return frame
+
+    def unpin(self, frame, dirty=False):
+        with self.__lock:
+            if frame.pins < 1:
+                raise ValueError('Page is not pinned')
+
+            frame.pins -= 1
+            if dirty:
+                self.__mark_dirty(frame)
+
+    def read(self, store, offset, size):
+        # like pread, returns less than size bytes at the end of file
+        file_name = store.store_file
+        page_size = self.page_size
+        chunks = []
+
+        with self.__lock:
+            while size > 0:
+                page_number, start = divmod(offset, page_size)
+                length = min(size, page_size - start)
+
+                chunk = self.__page(file_name, page_number).data[start:start + length]
+                chunks.append(chunk)
+
+                if len(chunk) < length:
+                    break
+
+                offset += length
+                size -= length
+
+        return bytes(chunks[0]) if len(chunks) == 1 else b''.join(chunks)
+
+    def write(self, store, offset, buffer):
+        file_name = store.store_file
+        page_size = self.page_size
+        buffer = memoryview(buffer)
+        position = 0
+
+        with self.__lock:
+            while position < len(buffer):
+                page_number, start = divmod(offset + position, page_size)
+                length = min(len(buffer) - position, page_size - start)
+
+                frame = self.__page(file_name, page_number)
+                data = frame.data
+                if len(data) < start:
+                    # gap up to the written place reads as zeros, like a file hole
+                    data.extend(bytes(start - len(data)))
+
+                data[start:start + length] = buffer[position:position + length]
+                self.__mark_dirty(frame)
+
+                position += length
+
+    def flush(self, store=None):
+        with self.__lock:
+            if store is None:
+                frames = [frame for dirty in self.__dirty.values() for frame in dirty]
+            else:
+                frames = list(self.__dirty.get(store.store_file, ()))
+
+            # pages are written in file order
+            for frame in sorted(frames, key=lambda frame: frame.key):
+                self.__write_back(frame)
+
+    def __mark_dirty(self, frame):
+        if not frame.dirty:
+            frame.dirty = True
+            self.__dirty[frame.key[0]].add(frame)
+
+    def __page(self, file_name, page_number):
+        key = (file_name, page_number)
+        statistics = self.__statistics[file_name]
+
+        frame = self.__pages.get(key, None)
+        if frame is not None:
+            statistics.hits += 1
+            frame.referenced = True
+            return frame
+
+        statistics.misses += 1
+
+        data = bytearray(pread(self.__files[file_name], self.page_size, page_number * self.page_size))
+        frame = self.__victim()
+        if frame is None:
+            frame = PageFrame(key, data)
+            self.__frames.append(frame)
+        else:
+            frame.key = key
+            frame.data = data
+            frame.referenced = True
+
+        self.__pages[key] = frame
+
+        return frame
+
+    def __victim(self):
+        if len(self.__frames) < self.frame_count:
+            return None
+
+        # two sweeps clear every reference bit, so only pinned pages can stop it
+        frames = self.__frames
+        for _ in range(2 * len(frames)):
+            frame = frames[self.__hand]
+            self.__hand = (self.__hand + 1) % len(frames)
+
+            if frame.pins:
+                continue
+
+            if frame.referenced and frame.key is not None:
+                frame.referenced = False
+                continue
+
+            if frame.key is not None:
+                self.__write_back(frame)
+                del self.__pages[frame.key]
+                self.__statistics[frame.key[0]].evictions += 1
+
+            return frame
+
+        raise RuntimeError('All buffer pool pages are pinned')
+
+    def __write_back(self, frame):
+        if not frame.dirty:
+            return
+
+        file_name, page_number = frame.key
+        pwrite(self.__files[file_name], frame.data, page_number * self.page_size)
+        frame.dirty = False
+        self.__dirty[file_name].discard(frame)
+
+        self.__statistics[file_name].write_backs += 1
@@ -1,3 +1,10 @@
+NULL_POINTER = 0xFFFFFFFFFFFFFFFF
+# pointer value marking the end of a chain (all bits set in 8 byte pointer)
+
+NULL_SHORT_POINTER = 0xFFFFFFFF
+# 4 byte pointer value marking unused label or edge type slot
+
+
 class RecordValidation(type):
     def __new__(mcs, name, bases, class_dict):
         if bases != (object,):
@@ -0,0 +1,112 @@
+import re
+from struct import calcsize
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+BYTE_ORDERS = {
+    '<': '<',
+    '>': '>',
+    '!': '>',
+    '=': '=',
+}
+
+NUMPY_CODES = {
+    '?': '?',
+    'c': 'S1',
+    'b': 'i1',
+    'B': 'u1',
+    'h': 'i2',
+    'H': 'u2',
+    'i': 'i4',
+    'I': 'u4',
+    'l': 'i4',
+    'L': 'u4',
+    'q': 'i8',
+    'Q': 'u8',
+    'e': 'f2',
+    'f': 'f4',
+    'd': 'f8',
+}
+
+FORMAT_ITEM = re.compile(r'(\d*)([a-zA-Z?])')
+
+
+def record_layout(record_format, field_names):
+    # native alignment adds padding numpy can not guess
+    if record_format[:1] not in BYTE_ORDERS:
+        raise ValueError('Record format {0} has no explicit byte order'.format(record_format))
+
+    prefix = BYTE_ORDERS[record_format[0]]
+    items = record_format[1:]
+    layout = []
+    offset = 0
+
+    for count, code in FORMAT_ITEM.findall(items):
+        count = int(count) if count else 1
+
+        if code == 'x':
+            offset += count
+        elif code == 's':
+            layout.append(('S{0}'.format(count), offset))
+            offset += count
+        elif code in NUMPY_CODES:
+            size = calcsize('<' + code)
+            for index in range(count):
+                layout.append((prefix + NUMPY_CODES[code], offset + index * size))
+            offset += count * size
+        else:
+            raise ValueError('Format character {0} is not supported in scans'.format(code))
+
+    if len(layout) != len(field_names):
+        raise ValueError('Record format {0} has {1} fields, {2} names given'.format(
+            record_format, len(layout), len(field_names)))
+
+    return [(name, numpy_type, field_offset) for name, (numpy_type, field_offset) in zip(field_names, layout)]
+
+
+def record_dtype(record_format, field_names):
+    if numpy is None:
+        raise ImportError('numpy is required for columnar scans')
+
+    layout = record_layout(record_format, field_names)
+
+    return numpy.dtype({
+        'names': [name for name, _, _ in layout],
+        'formats': [numpy_type for _, numpy_type, _ in layout],
+        'offsets': [offset for _, _, offset in layout],
+        'itemsize': calcsize(record_format),
+    })
+
+
+class StoreScan:
+    def __init__(self, records):
+        self.records = records
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, field):
+        return self.records[field]
+
+    @property
+    def fields(self):
+        return self.records.dtype.names
+
+    def column(self, field):
+        return self.records[field]
+
+
+def scan(store):
+    dtype = record_dtype(store.record_format, store.record_fields)
+    count = store.record_count
+
+    if count == 0:
+        return StoreScan(numpy.zeros(0, dtype=dtype))
+
+    # read-only memmap, columns are strided views over the same pages
+    records = numpy.memmap(store.store_file, dtype=dtype, mode='r', shape=(count,))
+
+    return StoreScan(records)
@@ -1,6 +1,20 @@
-from os import path, SEEK_END
+from mmap import mmap, ACCESS_READ
+from os import fstat, fsync, path, replace, O_CREAT, O_RDWR, SEEK_END
+from os import open as os_open
+try:
+    from os import pread
+except ImportError:  # pragma: no cover
+    pread = None
 from struct import Struct
 from threading import Lock
+from time import perf_counter
+
+from grapy.store.base.cache import RecordCache
+from grapy.store.base.freelist import FreeList, FREE_LIST_FILE_SUFFIX
+from grapy.store.base.metrics import DELETE, WRITE, TimedLock
+from grapy.store.base.record import NULL_POINTER
+from grapy.store.base.scan import scan as scan_store
+from grapy.store.base.view import view_type
 
 
 class RecordStoreValidation(type):
@@ -33,20 +47,129 @@ class RecordStore(object, metaclass=RecordStoreValidation):
     store_file_name = None
     record_factory = None
 
-    def __init__(self, dir='.'):
+    # names of record_format fields, used by columnar scans
+    record_fields = None
+
+    # record_fields holding 8 byte pointers, they are set to NULL_POINTER in
+    # released slots so that chains never lead through deleted records
+    pointer_fields = ()
+
+    # read_many merges records separated by at most coalesce_gap bytes
+    # into one read which is never longer than coalesce_limit bytes
+    coalesce_gap = 4096
+    coalesce_limit = 1024 * 1024
+
+    # number of records kept in memory by default, 0 disables the cache
+    cache_size = 0
+
+    # number of records read at once while walking chains
+    read_ahead = 16
+
+    # StoreMetrics set by enable_metrics, stores take it when they are created
+    metrics = None
+
+    def __init__(self, dir='.', memory_map=False, cache_size=None, dense_ids=False, buffer_pool=None,
+                 versions=None):
         self.__struct = Struct(self.record_format)
+        self.__released = self.__released_record()
         self._file = None
         self.__dir = dir
-        self.__lock = Lock()
+        self.__metrics = self.metrics
+        self.__write_lock = Lock() if self.__metrics is None else TimedLock(self.__metrics)
+        self.__memory_map = memory_map
+        self.__mapping = None
+        self.__dense_ids = dense_ids
+        self.__buffer_pool = buffer_pool
+        self.__versions = versions
+        # commit of the write operation in progress, only with versions
+        self.__commit = None
+
+        if cache_size is None:
+            cache_size = self.cache_size
+        self.__cache = RecordCache(cache_size) if cache_size else None
+        # offsets written by the write operation in progress, see _flush
+        self.__stale = []
+        self.__free_list = FreeList(self.store_file + FREE_LIST_FILE_SUFFIX)
+        self.__listeners = []
+        # write-ahead log of the store, writes outside of transactions are logged too
+        self.__log = None
+        self.__applying = False
+        self.__end = 0
+        # files replaced by compaction, readers may still use them
+        self.__retired = []
 
     @property
     def record_size(self):
         return self.__struct.size
 
+    @property
+    def _struct(self):
+        return self.__struct
+
+    @property
+    def _write_lock(self):
+        return self.__write_lock
+
     @property
     def store_file(self):
         return path.join(self.__dir, self.store_file_name)
 
+    @property
+    def size(self):
+        with self.__write_lock:
+            self._flush()
+            return self._size()
+
+    @property
+    def record_count(self):
+        return self.size // self.record_size
+
+    @property
+    def memory_map(self):
+        return self.__memory_map
+
+    @property
+    def dense_ids(self):
+        return self.__dense_ids
+
+    @property
+    def cache(self):
+        return self.__cache
+
+    @property
+    def free_list(self):
+        return self.__free_list
+
+    @property
+    def changes(self):
+        # counts releases and reuses of slots, files derived from the store
+        # are stale when it differs even though the size is the same
+        return self.__free_list.changes
+
+    @property
+    def buffer_pool(self):
+        return self.__buffer_pool
+
+    @property
+    def versions(self):
+        return self.__versions
+
+    def add_listener(self, listener):
+        # listener is notified with record offsets under the write lock,
+        # it provides record_written(offset, record) and record_deleted(offset, record),
+        # optional store_replaced() is called after the file has been compacted
+        self.__listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.__listeners.remove(listener)
+
+    def _attach_log(self, log):
+        self.__log = log
+
+    def _detach_log(self, log):
+        if self.__log is log:
+            self.__log = None
+
     def __enter__(self):
         self.open()
         return self
@@ -55,34 +178,636 @@ class RecordStore(object, metaclass=RecordStoreValidation):
         self.close()
 
     def open(self):
-        self._file = open(self.store_file, 'ab+')
+        self._file = open(os_open(self.store_file, O_RDWR | O_CREAT), 'rb+')
+        self.__end = self._file.seek(0, SEEK_END)
+
+        if self.__buffer_pool is not None:
+            self.__buffer_pool.attach(self)
+
+        self.__free_list.open()
+
+        if self.__versions is not None:
+            self.__versions.attach(self)
 
     def close(self):
         if not self._file:
             return
 
+        self.__free_list.close()
+
+        if self.__mapping is not None:
+            self.__mapping.close()
+            self.__mapping = None
+
+        if self.__buffer_pool is not None:
+            self.__buffer_pool.detach(self)
+
+        if self.__versions is not None:
+            self.__versions.detach(self)
+
+        for file in self.__retired:
+            file.close()
+        self.__retired = []
+
         self._file.close()
 
+    def _open_values(self):
+        # opens other files records refer to, read-only and without opening
+        # the store, workers of parallel scans map the store file themselves
+        pass
+
+    def _close_values(self):
+        pass
+
     def write(self, record):
-        with self.__lock:
-            return self._write_record(record)
+        metrics = self.__metrics
+        if metrics is not None:
+            started = perf_counter()
+
+        with self.__write_lock:
+            commit = self.__begin()
+            try:
+                offset = self._write_record(record)
+                # readers do not share the buffer, they see only flushed data
+                self._flush()
+            finally:
+                self.__complete(commit)
+
+            for listener in self.__listeners:
+                listener.record_written(offset, record)
+
+        record_id = self._record_id(offset)
+        if metrics is not None:
+            metrics.record_write(self, WRITE, record_id, 1, started)
+
+        return record_id
 
     def _write_record(self, record):
-        self._file.seek(0, SEEK_END)
-        record_id = self._file.tell()
+        buffer = self._encode(record)
+
+        if self.__free_list:
+            offset = self.__free_list.pop()
+            self._write_at(offset, buffer)
+        else:
+            offset = self._append(buffer)
+
+        self._invalidate(offset)
+
+        return offset
+
+    def write_many(self, records):
+        records = list(records)
+
+        metrics = self.__metrics
+        if metrics is not None:
+            started = perf_counter()
+
+        with self.__write_lock:
+            commit = self.__begin()
+            try:
+                offsets = self._write_records(records)
+                self._flush()
+            finally:
+                self.__complete(commit)
+
+            for listener in self.__listeners:
+                for offset, record in zip(offsets, records):
+                    listener.record_written(offset, record)
+
+        record_ids = [self._record_id(offset) for offset in offsets]
+        if metrics is not None:
+            metrics.record_write(self, WRITE, record_ids, len(record_ids), started)
+
+        return record_ids
+
+    def _write_records(self, records):
+        reused = []
+        while self.__free_list and len(reused) < len(records):
+            offset = self.__free_list.pop()
+            self._write_at(offset, self._encode(records[len(reused)]))
+            reused.append(offset)
+
+        records = records[len(reused):]
+
+        record_size = self.record_size
+        buffer = b''.join([self._encode(record) for record in records])
+
+        first = self._append(buffer) if records else None
+
+        offsets = reused + [first + index * record_size for index in range(len(records))]
+        self._invalidate(*offsets)
+
+        return offsets
+
+    def delete(self, record_id):
+        offset = self._offset(record_id)
+
+        metrics = self.__metrics
+        if metrics is not None:
+            started = perf_counter()
+
+        with self.__write_lock:
+            record = None
+            if self.__listeners:
+                self.__check_slot(offset)
+                record = self._read_record(offset)
+
+            commit = self.__begin()
+            try:
+                self._delete_record(offset)
+                self._flush()
+            finally:
+                self.__complete(commit)
+
+            for listener in self.__listeners:
+                listener.record_deleted(offset, record)
+
+        if metrics is not None:
+            metrics.record_write(self, DELETE, record_id, 1, started)
+
+    def _delete_record(self, offset):
+        self.__check_slot(offset)
+
+        # released slot is zeroed, so records with in_use flag read as deleted,
+        # and its pointers are reset
+        self._write_at(offset, self.__released)
+        self.__free_list.push(offset)
+
+        self._invalidate(offset)
+
+    def released(self, record):
+        # chains end at released records, record can be a view as well
+        return not getattr(record, 'in_use', True)
+
+    def __released_record(self):
+        values = list(self.__struct.unpack(bytes(self.record_size)))
+        for name in self.pointer_fields:
+            values[self.record_fields.index(name)] = NULL_POINTER
+
+        return self.__struct.pack(*values)
+
+    def __check_slot(self, offset):
+        if offset < 0 or offset % self.record_size or offset + self.record_size > self._size():
+            raise ValueError('Record at offset {0} does not exist'.format(offset))
+
+    def _invalidate(self, *offsets):
+        # cached records are dropped only once the new ones are flushed,
+        # otherwise reader could cache the previous record again
+        if self.__cache is not None:
+            self.__stale.extend(offsets)
+
+    def _encode(self, record):
+        return self.__struct.pack(*list(record))
+
+    def _append(self, buffer):
+        # end of file is tracked, so it also accounts for reserved records
+        offset = self.__end
+
+        self._write_at(offset, buffer)
+        self.__end += len(buffer)
+
+        return offset
+
+    def _reserve(self, record):
+        # allocates place for record written later with _apply,
+        # returns offset and encoded record
+        buffer = self._encode(record)
+
+        with self.__write_lock:
+            if self.__free_list:
+                offset = self.__free_list.pop()
+            else:
+                offset = self.__end
+                self.__end += len(buffer)
+
+        return offset, buffer
+
+    def _apply(self, offset, buffer, record):
+        with self.__write_lock:
+            commit = self.__begin()
+            # transaction has been logged already
+            self.__applying = True
+            try:
+                self._write_at(offset, buffer)
+                self._invalidate(offset)
+                self._record_applied(offset, record)
+                self._flush()
+            finally:
+                self.__applying = False
+                self.__complete(commit)
+
+            for listener in self.__listeners:
+                listener.record_written(offset, record)
+
+    def _record_applied(self, offset, record):
+        pass
+
+    def _release(self, offset, buffer):
+        # gives back reserved place which will not be applied
+        with self.__write_lock:
+            commit = self.__begin()
+            try:
+                # same image as deleted records, every free slot looks released
+                self._write_at(offset, self.__released)
+                self.__free_list.push(offset)
+                self._flush()
+            finally:
+                self.__complete(commit)
+
+    def __begin(self):
+        # every write operation is one commit for snapshots
+        if self.__versions is None:
+            return None
+
+        self.__commit = self.__versions.begin(self)
+        return self.__commit
+
+    def __complete(self, commit):
+        if commit is None:
+            return
+
+        self.__commit = None
+        self.__versions.complete(commit, self._size())
 
-        self._file.write(self.__struct.pack(*list(record)))
+    def _defer(self, function, *args):
+        # releases resource of replaced record once no snapshot can read it
+        if self.__commit is None:
+            function(*args)
+        else:
+            self.__versions.defer(self.__commit, function, *args)
+
+    def sync(self):
+        with self.__write_lock:
+            self._flush()
+            fsync(self._file.fileno())
+
+    def _replace_file(self, file_name, free_offsets=()):
+        # swaps store file for rewritten one, has to be called under the write
+        # lock; readers which already use the previous file can finish, it is
+        # closed with the store
+        self._flush()
+
+        if self.__buffer_pool is not None:
+            self.__buffer_pool.detach(self)
+
+        replace(file_name, self.store_file)
+
+        self.__retired.append(self._file)
+        self._file = open(os_open(self.store_file, O_RDWR), 'rb+')
+        self.__end = self._file.seek(0, SEEK_END)
+        self.__mapping = None
+
+        if self.__buffer_pool is not None:
+            self.__buffer_pool.attach(self)
+
+        if self.__versions is not None:
+            self.__versions.detach(self)
+            self.__versions.attach(self)
+
+        if self.__cache is not None:
+            self.__cache.clear()
+
+        self.__free_list.clear()
+        for offset in free_offsets:
+            self.__free_list.push(offset)
+
+    def _file_replaced(self):
+        # called without the write lock, listeners may read the whole store
+        for listener in list(self.__listeners):
+            store_replaced = getattr(listener, 'store_replaced', None)
+            if store_replaced is not None:
+                store_replaced()
+
+    def _flush(self):
+        # dirty pages of the store are written back at the end of every write
+        try:
+            if self.__buffer_pool is not None:
+                self.__buffer_pool.flush(self)
+
+            self._file.flush()
+        finally:
+            if self.__stale:
+                for offset in self.__stale:
+                    self.__cache.invalidate(offset)
+                self.__stale = []
+
+    def _write_at(self, offset, buffer):
+        commit = self.__commit
+        if commit is not None and commit.keep and offset < commit.end:
+            # replaced records are saved before they are overwritten
+            self.__versions.save(commit, offset, self._read_at(offset, min(len(buffer), commit.end - offset)))
+
+        if self.__metrics is not None:
+            self.__metrics.bytes_written += len(buffer)
+
+        if self.__log is not None and not self.__applying:
+            # logged before the file is written, so recovery does not replay
+            # older records of committed transactions over it
+            self.__log.log_write(self, offset, buffer)
+
+        if self.__buffer_pool is not None:
+            self.__buffer_pool.write(self, offset, buffer)
+            return
+
+        self._file.seek(offset)
+        self._file.write(buffer)
+
+    def _read_at(self, offset, size):
+        if self.__buffer_pool is not None:
+            buffer = self.__buffer_pool.read(self, offset, size)
+        elif pread is not None:
+            buffer = pread(self._file.fileno(), size, offset)
+        else:
+            with self.__write_lock:
+                self._file.seek(offset)
+                buffer = self._file.read(size)
+
+        if self.__metrics is not None:
+            self.__metrics.bytes_read += len(buffer)
+
+        return buffer
+
+    def _size(self):
+        return self._file.seek(0, SEEK_END)
+
+    def record_offset(self, record_id):
+        return self._offset(record_id)
+
+    def record_id_at(self, offset):
+        return self._record_id(offset)
+
+    def _offset(self, record_id):
+        if self.__dense_ids:
+            return record_id * self.__struct.size
 
         return record_id
 
+    def _record_id(self, offset):
+        if self.__dense_ids:
+            return offset // self.__struct.size
+
+        return offset
+
+    def scan(self):
+        if self.record_fields is None:
+            raise NotImplementedError('{0} does not support columnar scans'.format(type(self).__name__))
+
+        return scan_store(self)
+
     def read(self, record_id):
-        with self.__lock:
-            return self._read_record(record_id)
+        metrics = self.__metrics
+        if metrics is not None:
+            started = perf_counter()
+
+        offset = self._offset(record_id)
 
-    def _read_record(self, record_id):
-        self._file.seek(record_id)
+        cache = self.__cache
+        record = None
+        if cache is not None:
+            record = cache.get(offset)
+            generation = cache.generation(offset)
 
-        buffer = self._file.read(self.record_size)
+        if record is None:
+            if self.__memory_map:
+                record = self._read_mapped_record(offset)
+            else:
+                record = self._read_record(offset)
+
+            if cache is not None:
+                cache.put(offset, record, generation)
+
+        if metrics is not None:
+            metrics.record_read(self, record_id, 1, started)
+
+        return record
+
+    def _read_record(self, offset):
+        buffer = self._read_at(offset, self.record_size)
         record = self.record_factory(self.__struct.unpack(buffer))
 
         return record
+
+    def read_many(self, record_ids):
+        metrics = self.__metrics
+        if metrics is not None:
+            started = perf_counter()
+            # ids are passed to the tracer as well
+            record_ids = list(record_ids)
+
+        requested = [self._offset(record_id) for record_id in record_ids]
+        offsets = sorted(set(requested))
+
+        cache = self.__cache
+        records = {}
+        if cache is not None:
+            generations = {}
+            for offset in offsets:
+                record = cache.get(offset)
+                if record is not None:
+                    records[offset] = record
+                else:
+                    generations[offset] = cache.generation(offset)
+
+            offsets = [offset for offset in offsets if offset not in records]
+
+        if self.__memory_map:
+            missing = {offset: self._read_mapped_record(offset) for offset in offsets}
+        else:
+            missing = self._read_records(offsets)
+
+        if cache is not None:
+            for offset, record in missing.items():
+                cache.put(offset, record, generations[offset])
+
+        records.update(missing)
+
+        if metrics is not None:
+            metrics.record_read(self, record_ids, len(requested), started)
+
+        return [records[offset] for offset in requested]
+
+    def _read_records(self, offsets):
+        records = {}
+
+        for start, end, chunk in self.__coalesce(offsets):
+            buffer = self._read_at(start, end - start)
+
+            for offset in chunk:
+                values = self.__struct.unpack_from(buffer, offset - start)
+                records[offset] = self.record_factory(values)
+
+        return records
+
+    def __coalesce(self, offsets):
+        record_size = self.record_size
+        start = end = None
+        chunk = []
+
+        for offset in offsets:
+            if chunk and (offset - end > self.coalesce_gap
+                          or offset + record_size - start > self.coalesce_limit):
+                yield start, end, chunk
+                chunk = []
+
+            if not chunk:
+                start = offset
+
+            chunk.append(offset)
+            end = offset + record_size
+
+        if chunk:
+            yield start, end, chunk
+
+    def iter_records(self, start=0):
+        # sequential scan from record id start, yields (record id, record) pairs
+        record_size = self.record_size
+        chunk_size = max(1, self.coalesce_limit // record_size) * record_size
+        offset = self._offset(start)
+
+        while True:
+            buffer = self._read_at(offset, chunk_size)
+            usable = len(buffer) - len(buffer) % record_size
+            if not usable:
+                return
+
+            for index, values in enumerate(self.__struct.iter_unpack(memoryview(buffer)[:usable])):
+                yield self._record_id(offset + index * record_size), self.record_factory(values)
+
+            offset += usable
+
+    def iter_chain(self, record_id, next_pointer):
+        # yields (record id, record) pairs, next_pointer returns id of the following record;
+        # records around the visited one are read at once, but only visited ones are decoded
+        record_size = self.record_size
+        unpack_from = self.__struct.unpack_from
+        factory = self.record_factory
+        start = end = 0
+        buffer = b''
+        previous = None
+
+        while record_id != NULL_POINTER:
+            offset = self._offset(record_id)
+
+            if offset < start or offset + record_size > end:
+                # chains which were built by prepending point towards file start
+                backward = previous is not None and offset < previous
+                start, buffer = self.__read_span(offset, backward)
+                end = start + len(buffer)
+
+            record = factory(unpack_from(buffer, offset - start))
+            if self.released(record):
+                return
+
+            yield record_id, record
+
+            previous = offset
+            record_id = next_pointer(record)
+
+    def __read_span(self, offset, backward):
+        # reads read_ahead records around offset, returns (start, buffer)
+        record_size = self.record_size
+        size = fstat(self._file.fileno()).st_size
+
+        if backward:
+            start = max(0, offset - (self.read_ahead - 1) * record_size)
+        else:
+            start = offset
+
+        end = min(size - size % record_size, start + self.read_ahead * record_size)
+        end = max(end, offset + record_size)
+
+        return start, self._read_at(start, end - start)
+
+    @property
+    def view_type(self):
+        if self.record_fields is None:
+            raise NotImplementedError('{0} does not support record views'.format(type(self).__name__))
+
+        return view_type(self.record_format, self.record_fields)
+
+    def view(self, record_id, view=None):
+        # view is moved to the record, memory-mapped stores are read without copying
+        if view is None:
+            view = self.view_type()
+
+        offset = self._offset(record_id)
+
+        if self.__memory_map:
+            return view.move(self.__mapped(offset), offset)
+
+        return view.move(self._read_at(offset, self.record_size))
+
+    def iter_views(self, start=0, view=None):
+        # like iter_records, but the same view is yielded for every record
+        # and it is valid only until the next step
+        if view is None:
+            view = self.view_type()
+
+        record_size = self.record_size
+        chunk_size = max(1, self.coalesce_limit // record_size) * record_size
+        offset = self._offset(start)
+
+        while True:
+            buffer = self._read_at(offset, chunk_size)
+            usable = len(buffer) - len(buffer) % record_size
+
+            for position in range(0, usable, record_size):
+                yield self._record_id(offset + position), view.move(buffer, position)
+
+            if not usable:
+                return
+
+            offset += usable
+
+    def iter_chain_views(self, record_id, next_pointer, view=None):
+        # like iter_chain, next_pointer gets the view which is reused for every record
+        if view is None:
+            view = self.view_type()
+
+        record_size = self.record_size
+        start = end = 0
+        buffer = b''
+        previous = None
+
+        while record_id != NULL_POINTER:
+            offset = self._offset(record_id)
+
+            if self.__memory_map:
+                view.move(self.__mapped(offset), offset)
+            else:
+                if offset < start or offset + record_size > end:
+                    backward = previous is not None and offset < previous
+                    start, buffer = self.__read_span(offset, backward)
+                    end = start + len(buffer)
+
+                view.move(buffer, offset - start)
+
+            if self.released(view):
+                return
+
+            yield record_id, view
+
+            previous = offset
+            record_id = next_pointer(view)
+
+    def __mapped(self, offset):
+        mapping = self.__mapping
+        if mapping is None or offset + self.record_size > len(mapping):
+            mapping = self.__remap()
+
+        return mapping
+
+    def _read_mapped_record(self, offset):
+        if self.__metrics is not None:
+            self.__metrics.bytes_read += self.record_size
+
+        return self.record_factory(self.__struct.unpack_from(self.__mapped(offset), offset))
+
+    def __remap(self):
+        # mapping is replaced, not closed - readers holding the previous one
+        # can still finish, it is released when the last reference is gone
+        if fstat(self._file.fileno()).st_size == 0:
+            return b''
+
+        self.__mapping = mmap(self._file.fileno(), 0, access=ACCESS_READ)
+        return self.__mapping
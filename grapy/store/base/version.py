@@ -0,0 +1,275 @@
+from bisect import bisect_right
+from threading import Condition
+
+from grapy.store.base.record import NULL_POINTER
+
+
+class Commit:
+    # one write operation of a store, keep tells whether replaced records
+    # have to be saved for snapshots
+
+    __slots__ = ('version', 'store', 'end', 'keep', 'saved')
+
+    def __init__(self, version, store, end, keep):
+        self.version = version
+        self.store = store
+        self.end = end
+        self.keep = keep
+        self.saved = set()
+
+
+class VersionStatistics:
+    def __init__(self, snapshots=0, versions=0, deferred=0, visible=0):
+        self.snapshots = snapshots
+        self.versions = versions
+        self.deferred = deferred
+        self.visible = visible
+
+    def __repr__(self):
+        return 'VersionStatistics(snapshots={0}, versions={1}, deferred={2}, visible={3})'.format(
+            self.snapshots, self.versions, self.deferred, self.visible)
+
+
+class VersionStore:
+    # keeps previous contents of records overwritten while snapshots are open,
+    # shared by all stores which have to be read consistently
+    #
+    # every write operation of a store is a commit with its own version,
+    # snapshot sees all commits up to the newest version whose predecessors
+    # have all been completed; versions are kept in memory and dropped once
+    # no open snapshot is older than the commit which replaced them
+
+    def __init__(self):
+        self.__condition = Condition()
+        self.__last = 0
+        self.__visible = 0
+        # versions of commits in progress
+        self.__in_flight = set()
+        # commits in progress which do not save replaced records
+        self.__untracked = 0
+        self.__opening = 0
+        # snapshot -> version
+        self.__snapshots = {}
+        # store -> ([version, ...], [end, ...])
+        self.__ends = {}
+        # store -> {offset: ([replaced at version, ...], [record, ...])}
+        self.__versions = {}
+        # (version, function, args) run when no snapshot can see the version
+        self.__deferred = []
+
+    @property
+    def statistics(self):
+        with self.__condition:
+            versions = sum(len(replaced) for records in self.__versions.values()
+                           for replaced, _ in records.values())
+
+            return VersionStatistics(len(self.__snapshots), versions, len(self.__deferred), self.__visible)
+
+    def attach(self, store):
+        with self.__condition:
+            self.__ends[store] = ([self.__visible], [store._size()])
+            self.__versions[store] = {}
+
+    def detach(self, store):
+        with self.__condition:
+            self.__ends.pop(store, None)
+            self.__versions.pop(store, None)
+
+    def begin(self, store):
+        # called under write lock of the store
+        with self.__condition:
+            self.__last += 1
+            keep = bool(self.__snapshots) or self.__opening > 0
+
+            self.__in_flight.add(self.__last)
+            if not keep:
+                self.__untracked += 1
+
+            return Commit(self.__last, store, self.__ends[store][1][-1], keep)
+
+    def save(self, commit, offset, buffer):
+        # buffer holds records starting at offset before commit replaced them
+        record_size = commit.store.record_size
+
+        with self.__condition:
+            records = self.__versions[commit.store]
+
+            for position in range(0, len(buffer) - len(buffer) % record_size, record_size):
+                record_offset = offset + position
+                if record_offset in commit.saved:
+                    continue
+
+                commit.saved.add(record_offset)
+                replaced, contents = records.setdefault(record_offset, ([], []))
+                replaced.append(commit.version)
+                contents.append(bytes(buffer[position:position + record_size]))
+
+    def defer(self, commit, function, *args):
+        # function releases something which snapshots may still read
+        if not commit.keep:
+            function(*args)
+            return
+
+        with self.__condition:
+            self.__deferred.append((commit.version, function, args))
+
+    def complete(self, commit, end):
+        with self.__condition:
+            versions, ends = self.__ends[commit.store]
+            versions.append(commit.version)
+            ends.append(end)
+
+            self.__in_flight.discard(commit.version)
+            self.__visible = min(self.__in_flight) - 1 if self.__in_flight else self.__last
+
+            if not commit.keep:
+                self.__untracked -= 1
+
+            if not self.__snapshots:
+                self.__collect()
+
+            self.__condition.notify_all()
+
+    def snapshot(self):
+        # commits which do not save replaced records have to finish first
+        with self.__condition:
+            self.__opening += 1
+            try:
+                self.__condition.wait_for(lambda: not self.__untracked)
+
+                snapshot = Snapshot(self, self.__visible)
+                self.__snapshots[snapshot] = snapshot.version
+            finally:
+                self.__opening -= 1
+
+        return snapshot
+
+    def release(self, snapshot):
+        with self.__condition:
+            if self.__snapshots.pop(snapshot, None) is not None:
+                self.__collect()
+
+    def end(self, store, version):
+        # size of store file at version
+        with self.__condition:
+            versions, ends = self.__ends[store]
+            return ends[bisect_right(versions, version) - 1]
+
+    def version(self, store, offset, version):
+        # returns record at offset as it was at version, None when it has not
+        # been replaced since
+        with self.__condition:
+            saved = self.__versions[store].get(offset, None)
+            if saved is None:
+                return None
+
+            replaced, contents = saved
+            index = bisect_right(replaced, version)
+
+            return contents[index] if index < len(replaced) else None
+
+    def __collect(self):
+        # versions replaced at or before the oldest snapshot are not visible anymore
+        oldest = min(self.__snapshots.values()) if self.__snapshots else self.__visible
+
+        for records in self.__versions.values():
+            for offset in list(records):
+                replaced, contents = records[offset]
+                index = bisect_right(replaced, oldest)
+                if index == len(replaced):
+                    del records[offset]
+                elif index:
+                    del replaced[:index]
+                    del contents[:index]
+
+        for versions, ends in self.__ends.values():
+            index = bisect_right(versions, oldest) - 1
+            if index > 0:
+                del versions[:index]
+                del ends[:index]
+
+        if self.__deferred:
+            ready = [entry for entry in self.__deferred if entry[0] <= oldest]
+            self.__deferred = [entry for entry in self.__deferred if entry[0] > oldest]
+
+            for _, function, args in ready:
+                function(*args)
+
+
+class Snapshot:
+    # consistent read-only view of stores attached to version store
+
+    def __init__(self, versions, version):
+        self.__versions = versions
+        self.version = version
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.__versions.release(self)
+
+    def size(self, store):
+        return self.__versions.end(store, self.version)
+
+    def record_count(self, store):
+        return self.size(store) // store.record_size
+
+    def read(self, store, record_id):
+        return store.record_factory(store._struct.unpack(self.__read_record(store, store.record_offset(record_id))))
+
+    def read_many(self, store, record_ids):
+        return [self.read(store, record_id) for record_id in record_ids]
+
+    def __read_record(self, store, offset):
+        if self.closed:
+            raise ValueError('Snapshot has been closed')
+
+        record_size = store.record_size
+        if offset < 0 or offset % record_size or offset + record_size > self.size(store):
+            raise ValueError('Record at offset {0} does not exist in snapshot'.format(offset))
+
+        # file is read first, record replaced meanwhile is already saved
+        buffer = store._read_at(offset, record_size)
+        saved = self.__versions.version(store, offset, self.version)
+
+        return buffer if saved is None else saved
+
+    def iter_records(self, store, start=0):
+        # like RecordStore.iter_records, but stops at the end of store at snapshot
+        record_size = store.record_size
+        chunk_size = max(1, store.coalesce_limit // record_size) * record_size
+        factory = store.record_factory
+        offset = store.record_offset(start)
+        end = self.size(store)
+
+        while offset < end:
+            buffer = store._read_at(offset, min(chunk_size, end - offset))
+
+            for index, values in enumerate(store._struct.iter_unpack(buffer)):
+                record_offset = offset + index * record_size
+                saved = self.__versions.version(store, record_offset, self.version)
+                if saved is not None:
+                    values = store._struct.unpack(saved)
+
+                yield store.record_id_at(record_offset), factory(values)
+
+            offset += len(buffer)
+
+    def iter_chain(self, store, record_id, next_pointer):
+        # yields (record id, record) pairs, e.g. edges of node with
+        # snapshot.iter_chain(edges, node.first_edge, attrgetter('next_edge'))
+        while record_id != NULL_POINTER:
+            record = self.read(store, record_id)
+            if store.released(record):
+                return
+
+            yield record_id, record
+
+            record_id = next_pointer(record)
@@ -0,0 +1,82 @@
+from struct import Struct, calcsize
+
+from grapy.store.base.scan import FORMAT_ITEM
+
+VIEW_TYPES = {}
+
+
+class RecordView:
+    # decodes fields on access from buffer at offset, so the same view can be
+    # moved over many records without creating an object per record
+
+    __slots__ = ('buffer', 'offset')
+
+    fields = ()
+
+    def __init__(self, buffer=b'', offset=0):
+        self.buffer = buffer
+        self.offset = offset
+
+    def move(self, buffer, offset=0):
+        self.buffer = buffer
+        self.offset = offset
+
+        return self
+
+    def __iter__(self):
+        return iter([getattr(self, field) for field in self.fields])
+
+    def __repr__(self):
+        values = ', '.join('{0}={1!r}'.format(field, getattr(self, field)) for field in self.fields)
+        return '{0}({1})'.format(type(self).__name__, values)
+
+
+def field_layout(record_format, field_names):
+    # returns (name, struct, offset) for every field of record format
+    prefix = record_format[:1]
+    if prefix not in '<>!=':
+        raise ValueError('Record format {0} has no explicit byte order'.format(record_format))
+
+    layout = []
+    offset = 0
+
+    for count, code in FORMAT_ITEM.findall(record_format[1:]):
+        count = int(count) if count else 1
+
+        if code == 'x':
+            offset += count
+        elif code == 's':
+            layout.append((Struct(prefix + str(count) + code), offset))
+            offset += count
+        else:
+            size = calcsize(prefix + code)
+            for index in range(count):
+                layout.append((Struct(prefix + code), offset + index * size))
+            offset += count * size
+
+    if len(layout) != len(field_names):
+        raise ValueError('Record format {0} has {1} fields, {2} names given'.format(
+            record_format, len(layout), len(field_names)))
+
+    return [(name, struct, field_offset) for name, (struct, field_offset) in zip(field_names, layout)]
+
+
+def view_type(record_format, field_names):
+    key = (record_format, tuple(field_names))
+
+    view_class = VIEW_TYPES.get(key, None)
+    if view_class is None:
+        class_dict = {'__slots__': (), 'fields': tuple(field_names)}
+        for name, struct, field_offset in field_layout(record_format, field_names):
+            class_dict[name] = field_property(struct.unpack_from, field_offset)
+
+        view_class = VIEW_TYPES[key] = type('RecordView', (RecordView,), class_dict)
+
+    return view_class
+
+
+def field_property(unpack_from, field_offset):
+    def get(view):
+        return unpack_from(view.buffer, view.offset + field_offset)[0]
+
+    return property(get)
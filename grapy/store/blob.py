@@ -0,0 +1,149 @@
+from os import fsync, path, replace, O_CREAT, O_RDONLY, O_RDWR, SEEK_END
+from os import open as os_open, pread
+from struct import Struct
+from threading import Lock
+
+from grapy.store.base.freelist import FreeList, FREE_LIST_FILE_SUFFIX
+
+BLOB_HEADER_FORMAT = '<QQ'
+# little-endian
+# 8 bytes - capacity - bytes reserved for the blob including header (integer)
+# 8 bytes - length of blob data, FREE_BLOB when released (integer)
+# blob data follows the header
+
+FREE_BLOB = 0xFFFFFFFFFFFFFFFF
+
+# capacities are powers of two, so released blobs fit any later blob of the same class
+MIN_BLOB_CAPACITY = 64
+
+BLOB_STORE_FILE_NAME = 'grapy.blobs.db'
+
+
+class BlobStore:
+    # variable-length payloads kept apart from fixed-size records, blobs are
+    # addressed by offset of their header
+
+    def __init__(self, dir='.', store_file_name=BLOB_STORE_FILE_NAME):
+        self.__dir = dir
+        self.store_file_name = store_file_name
+        self.__header = Struct(BLOB_HEADER_FORMAT)
+        self.__lock = Lock()
+        self.__file = None
+        self.__end = 0
+        self.__free_list = FreeList(self.store_file + FREE_LIST_FILE_SUFFIX)
+        # capacity -> offsets of released blobs
+        self.__free = {}
+        # files replaced by compaction, readers may still use them
+        self.__retired = []
+
+    @property
+    def store_file(self):
+        return path.join(self.__dir, self.store_file_name)
+
+    @property
+    def header_size(self):
+        return self.__header.size
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def open(self, read_only=False):
+        if read_only:
+            # blobs are only read, free list is not needed
+            self.__file = open(os_open(self.store_file, O_RDONLY), 'rb')
+            return
+
+        self.__file = open(os_open(self.store_file, O_RDWR | O_CREAT), 'rb+')
+        self.__end = self.__file.seek(0, SEEK_END)
+
+        self.__free_list.open()
+        self.__free = {}
+        for offset in self.__free_list:
+            capacity, _ = self.__header.unpack(pread(self.__file.fileno(), self.__header.size, offset))
+            self.__free.setdefault(capacity, set()).add(offset)
+
+    def close(self):
+        if not self.__file:
+            return
+
+        self.__free_list.close()
+
+        for file in self.__retired:
+            file.close()
+        self.__retired = []
+
+        self.__file.close()
+        self.__file = None
+
+    def capacity_for(self, length):
+        capacity = MIN_BLOB_CAPACITY
+        while capacity < self.__header.size + length:
+            capacity <<= 1
+
+        return capacity
+
+    def write(self, data):
+        capacity = self.capacity_for(len(data))
+
+        with self.__lock:
+            released = self.__free.get(capacity, None)
+            appended = not released
+            if appended:
+                offset = self.__end
+                self.__end += capacity
+            else:
+                offset = released.pop()
+                self.__free_list.remove(offset)
+
+            self.__file.seek(offset)
+            self.__file.write(self.__header.pack(capacity, len(data)))
+            self.__file.write(data)
+
+            if appended:
+                # file covers whole capacity, so its size is the end of the last blob
+                self.__file.truncate(self.__end)
+
+            self.__file.flush()
+
+        return offset
+
+    def read(self, pointer, length=None):
+        if length is None:
+            _, length = self.__header.unpack(pread(self.__file.fileno(), self.__header.size, pointer))
+
+        return pread(self.__file.fileno(), length, pointer + self.__header.size)
+
+    def free(self, pointer):
+        with self.__lock:
+            capacity, length = self.__header.unpack(pread(self.__file.fileno(), self.__header.size, pointer))
+            if length == FREE_BLOB:
+                raise ValueError('Blob {0} has been already released'.format(pointer))
+
+            self.__file.seek(pointer)
+            self.__file.write(self.__header.pack(capacity, FREE_BLOB))
+            self.__file.flush()
+
+            self.__free_list.push(pointer)
+            self.__free.setdefault(capacity, set()).add(pointer)
+
+    def sync(self):
+        with self.__lock:
+            self.__file.flush()
+            fsync(self.__file.fileno())
+
+    def replace(self, file_name):
+        # swaps blob file for compacted one which has no released blobs
+        with self.__lock:
+            self.__file.flush()
+            replace(file_name, self.store_file)
+
+            self.__retired.append(self.__file)
+            self.__file = open(os_open(self.store_file, O_RDWR), 'rb+')
+            self.__end = self.__file.seek(0, SEEK_END)
+
+            self.__free_list.clear()
+            self.__free = {}
@@ -0,0 +1,419 @@
+from array import array
+from operator import attrgetter
+from os import path, remove
+from struct import Struct
+from threading import Event, Thread
+from time import monotonic, sleep
+
+from grapy.store.base.freelist import FREE_LIST_FILE_SUFFIX
+from grapy.store.base.record import NULL_POINTER
+from grapy.store.blob import BlobStore
+
+COMPACTED_FILE_SUFFIX = '.compact'
+
+# stores are rebuilt again when they have been written during compaction
+MAX_ATTEMPTS = 3
+
+next_edge = attrgetter('next_edge')
+next_property = attrgetter('next_property')
+
+
+class CompactionSummary:
+    # unreachable counts records kept although no live node leads to them
+    def __init__(self, edges=0, properties=0, blobs=0, reclaimed=0, unreachable=0):
+        self.edges = edges
+        self.properties = properties
+        self.blobs = blobs
+        self.reclaimed = reclaimed
+        self.unreachable = unreachable
+
+    def __repr__(self):
+        return 'CompactionSummary(edges={0}, properties={1}, blobs={2}, reclaimed={3}, unreachable={4})'.format(
+            self.edges, self.properties, self.blobs, self.reclaimed, self.unreachable)
+
+
+class IoThrottle:
+    # keeps average I/O rate under bytes_per_second by sleeping when ahead,
+    # None disables throttling
+
+    def __init__(self, bytes_per_second=None):
+        self.bytes_per_second = bytes_per_second
+        self.__started = None
+        self.__consumed = 0
+
+    def reset(self):
+        self.__started = None
+        self.__consumed = 0
+
+    def consume(self, size):
+        if not self.bytes_per_second:
+            return
+
+        now = monotonic()
+        if self.__started is None:
+            self.__started = now
+
+        self.__consumed += size
+        ahead = self.__consumed / self.bytes_per_second - (now - self.__started)
+        if ahead > 0:
+            sleep(ahead)
+
+
+class ChangeCounter:
+    # store listener, compaction starts over when stores have been written meanwhile
+
+    def __init__(self):
+        self.changes = 0
+
+    def record_written(self, offset, record):
+        self.changes += 1
+
+    def record_deleted(self, offset, record):
+        self.changes += 1
+
+
+class CompactedFile:
+    # appends fixed-size records in large throttled writes
+
+    def __init__(self, file_name, throttle, chunk_size):
+        self.file_name = file_name
+        self.count = 0
+        self.__throttle = throttle
+        self.__chunk_size = chunk_size
+        self.__buffer = bytearray()
+        self.__file = open(file_name, 'wb')
+
+    def append(self, buffer):
+        self.__buffer += buffer
+        self.count += 1
+
+        if len(self.__buffer) >= self.__chunk_size:
+            self.flush()
+
+    def flush(self):
+        self.__throttle.consume(len(self.__buffer))
+        self.__file.write(self.__buffer)
+        self.__buffer = bytearray()
+
+    def close(self):
+        self.flush()
+        self.__file.close()
+
+
+class Compactor:
+    # rewrites edge and property stores without released records and blobs;
+    # edges of every live node and properties of every entity are laid out
+    # contiguously in chain order, records in use which no live node leads
+    # to (e.g. edges of deleted nodes) are kept after them in file order
+    #
+    # nodes keep their ids, only first_edge and first_property pointers are
+    # rewritten; stores are rebuilt next to the original files while they are
+    # still served and swapped under their write locks, when they have been
+    # written in the meantime compaction starts over
+    #
+    # write-ahead log should be checkpointed first and it must not have
+    # transactions in flight, their reserved records would be lost
+
+    def __init__(self, nodes, edges, properties, bytes_per_second=None, max_attempts=MAX_ATTEMPTS):
+        self.nodes = nodes
+        self.edges = edges
+        self.properties = properties
+        self.max_attempts = max_attempts
+        self.__throttle = IoThrottle(bytes_per_second)
+        self.__stopped = Event()
+        self.__thread = None
+        self.__summary = None
+        self.__error = None
+
+        self.__node_struct = nodes._struct
+        self.__edge_struct = edges._struct
+        self.__property_struct = properties._struct
+        self.__blob_pointer = Struct('<Q8x')
+        self.__blob_count = 0
+        # new ids of copied records by their previous slot
+        self.__edge_ids = None
+        self.__property_ids = None
+
+    @property
+    def stores(self):
+        return [self.nodes, self.edges, self.properties]
+
+    def start(self):
+        # compacts in background thread, join returns the summary
+        self.__stopped.clear()
+        self.__summary = self.__error = None
+        self.__thread = Thread(target=self.__run_background, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        # interrupts background compaction, stores are left untouched
+        self.__stopped.set()
+        return self.join()
+
+    def join(self):
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+        if self.__error is not None:
+            raise self.__error
+
+        return self.__summary
+
+    def __run_background(self):
+        try:
+            self.__summary = self.run()
+        except Exception as error:
+            self.__error = error
+
+    def run(self):
+        counter = ChangeCounter()
+        for store in self.stores:
+            store.add_listener(counter)
+
+        try:
+            for _ in range(self.max_attempts):
+                changes = counter.changes
+                self.__throttle.reset()
+
+                summary, files = self.__rewrite()
+                if files is None:
+                    return None
+
+                if self.__swap(files, lambda: counter.changes == changes):
+                    break
+
+                self.__remove(files)
+            else:
+                raise RuntimeError('Stores have been modified during every compaction attempt')
+        finally:
+            for store in self.stores:
+                store.remove_listener(counter)
+
+        for store in self.stores:
+            store._file_replaced()
+
+        return summary
+
+    def __rewrite(self):
+        # returns summary and compacted files, files are None when stopped
+        nodes, edges, properties = self.stores
+        sizes = [nodes.size, edges.size, properties.size, path.getsize(properties.blobs.store_file)]
+
+        chunk_size = nodes.coalesce_limit
+        node_file = CompactedFile(nodes.store_file + COMPACTED_FILE_SUFFIX, self.__throttle, chunk_size)
+        edge_file = CompactedFile(edges.store_file + COMPACTED_FILE_SUFFIX, self.__throttle, chunk_size)
+        property_file = CompactedFile(properties.store_file + COMPACTED_FILE_SUFFIX, self.__throttle, chunk_size)
+        blobs = BlobStore(path.dirname(properties.store_file),
+                          properties.blobs.store_file_name + COMPACTED_FILE_SUFFIX)
+        blobs.open()
+
+        files = [node_file, edge_file, property_file, blobs]
+        self.__blob_count = 0
+        self.__edge_ids = array('Q', [NULL_POINTER]) * edges.record_count
+        self.__property_ids = array('Q', [NULL_POINTER]) * properties.record_count
+        stopped = False
+        try:
+            for _, node in nodes.iter_views():
+                if self.__stopped.is_set():
+                    stopped = True
+                    break
+
+                self.__throttle.consume(nodes.record_size)
+                values = list(node)
+
+                if node.in_use:
+                    values[1] = self.__copy_edges(node.first_edge, edge_file, property_file, blobs)
+                    values[2] = self.__copy_properties(node.first_property, property_file, blobs)
+
+                node_file.append(self.__node_struct.pack(*values))
+
+            reachable = edge_file.count + property_file.count
+            if not stopped:
+                stopped = not self.__copy_unreachable(edge_file, property_file, blobs)
+        finally:
+            for file in files:
+                file.close()
+
+            self.__edge_ids = self.__property_ids = None
+
+        if stopped:
+            self.__remove(files)
+            return None, None
+
+        reclaimed = sum(sizes) - sum(path.getsize(file.file_name) for file in files[:3]) \
+            - path.getsize(blobs.store_file)
+        unreachable = edge_file.count + property_file.count - reachable
+
+        return CompactionSummary(edge_file.count, property_file.count, self.__blob_count, reclaimed,
+                                 unreachable), files
+
+    def __copy_edges(self, first_edge, edge_file, property_file, blobs):
+        # chain is copied in its order into consecutive records
+        edges = self.edges
+        chain = []
+
+        for edge_id, edge in edges.iter_chain_views(first_edge, next_edge):
+            self.__throttle.consume(edges.record_size)
+
+            values = list(edge)
+            values[4] = self.__copy_properties(edge.first_property, property_file, blobs)
+            chain.append((edge_id, values))
+
+        return self.__append_chain(edges, self.__edge_struct, edge_file, chain, 3, self.__edge_ids)
+
+    def __copy_properties(self, first_property, property_file, blobs):
+        properties = self.properties
+        chain = []
+
+        # walk stops at released slots, deleted properties are not copied
+        for property_id, record in properties.iter_chain_views(first_property, next_property):
+            chain.append((property_id, self.__property_values(record, blobs)))
+
+        return self.__append_chain(properties, self.__property_struct, property_file, chain, 1,
+                                   self.__property_ids)
+
+    def __property_values(self, record, blobs):
+        properties = self.properties
+        self.__throttle.consume(properties.record_size)
+
+        values = list(record)
+
+        pointer = properties.record_factory.blob_pointer(record.buffer, record.offset)
+        if pointer is not None:
+            # stored bytes are copied, compressed values stay compressed
+            data = properties.blobs.read(pointer, record.length)
+            self.__throttle.consume(len(data))
+            values[5] = self.__blob_pointer.pack(blobs.write(data))
+            self.__blob_count += 1
+
+        return values
+
+    def __copy_unreachable(self, edge_file, property_file, blobs):
+        # appends records in use which have not been copied with chains of
+        # live nodes, returns False when stopped
+        edges, properties = self.edges, self.properties
+        unreachable = []
+
+        for edge_id, edge in edges.iter_views():
+            if self.__stopped.is_set():
+                return False
+
+            self.__throttle.consume(edges.record_size)
+            if not edge.in_use or self.__copied(edges, self.__edge_ids, edge_id) != NULL_POINTER:
+                continue
+
+            values = list(edge)
+            values[4] = self.__copied(properties, self.__property_ids, edge.first_property)
+            if values[4] == NULL_POINTER:
+                values[4] = self.__copy_properties(edge.first_property, property_file, blobs)
+
+            unreachable.append((edge_id, values))
+
+        self.__append_unreachable(edges, self.__edge_struct, edge_file, unreachable, 3, self.__edge_ids)
+
+        # property records have no in_use flag, released ones are in the free list
+        released = set(properties.free_list)
+        unreachable = []
+
+        for property_id, record in properties.iter_views():
+            if self.__stopped.is_set():
+                return False
+
+            offset = properties.record_offset(property_id)
+            if offset in released or self.__copied(properties, self.__property_ids, property_id) != NULL_POINTER:
+                self.__throttle.consume(properties.record_size)
+                continue
+
+            unreachable.append((property_id, self.__property_values(record, blobs)))
+
+        self.__append_unreachable(properties, self.__property_struct, property_file, unreachable, 1,
+                                  self.__property_ids)
+
+        return True
+
+    @staticmethod
+    def __copied(store, new_ids, record_id):
+        # returns new id of copied record, NULL_POINTER when it has not been copied
+        if record_id == NULL_POINTER:
+            return NULL_POINTER
+
+        slot = store.record_offset(record_id) // store.record_size
+        return new_ids[slot] if slot < len(new_ids) else NULL_POINTER
+
+    @staticmethod
+    def __map(store, new_ids, record_id, new_id):
+        # records appended during the rewrite are not mapped, the attempt is
+        # thrown away as the stores have changed
+        slot = store.record_offset(record_id) // store.record_size
+        if slot < len(new_ids):
+            new_ids[slot] = new_id
+
+    def __append_chain(self, store, struct, file, chain, next_field, new_ids):
+        # returns id of the first record, every record points to the following one
+        if not chain:
+            return NULL_POINTER
+
+        record_size = store.record_size
+        first_slot = file.count
+
+        for index, (record_id, values) in enumerate(chain):
+            slot = first_slot + index
+            self.__map(store, new_ids, record_id, store.record_id_at(slot * record_size))
+
+            last = index + 1 == len(chain)
+            values[next_field] = NULL_POINTER if last else store.record_id_at((slot + 1) * record_size)
+            file.append(struct.pack(*values))
+
+        return store.record_id_at(first_slot * record_size)
+
+    def __append_unreachable(self, store, struct, file, records, next_field, new_ids):
+        # records keep their order and links, pointers to released records end the chains
+        record_size = store.record_size
+        first_slot = file.count
+
+        for slot, (record_id, _) in enumerate(records, first_slot):
+            self.__map(store, new_ids, record_id, store.record_id_at(slot * record_size))
+
+        for _, values in records:
+            values[next_field] = self.__copied(store, new_ids, values[next_field])
+            file.append(struct.pack(*values))
+
+    def __swap(self, files, unchanged):
+        nodes, edges, properties = self.stores
+        node_file, edge_file, property_file, blobs = files
+
+        locks = [store._write_lock for store in self.stores]
+        for lock in locks:
+            lock.acquire()
+        try:
+            if not unchanged():
+                return False
+
+            if any(store.versions is not None and store.versions.statistics.snapshots for store in self.stores):
+                self.__remove(files)
+                raise RuntimeError('Stores can not be compacted while snapshots are open')
+
+            nodes._replace_file(node_file.file_name, list(nodes.free_list))
+            edges._replace_file(edge_file.file_name)
+            properties.blobs.replace(blobs.store_file)
+            properties._replace_file(property_file.file_name)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+        remove(blobs.store_file + FREE_LIST_FILE_SUFFIX)
+
+        return True
+
+    @staticmethod
+    def __remove(files):
+        for file in files:
+            if isinstance(file, BlobStore):
+                names = [file.store_file, file.store_file + FREE_LIST_FILE_SUFFIX]
+            else:
+                names = [file.file_name]
+
+            for name in names:
+                if path.exists(name):
+                    remove(name)
@@ -0,0 +1,207 @@
+from array import array
+from mmap import mmap, ACCESS_READ
+from os import fsync, path, replace
+from struct import Struct
+
+CSR_HEADER_FORMAT = '<8sQQQQ'
+# little-endian
+# 8 bytes - magic - char[]
+# 8 bytes - number of nodes (integer)
+# 8 bytes - number of neighbours (integer)
+# 8 bytes - edge store bytes covered by the snapshot (integer)
+# 8 bytes - edge store changes covered by the snapshot (integer)
+# header is followed by (nodes + 1) offsets and then by neighbours,
+# both are 8 byte integers in native byte order so they can be mapped
+
+CSR_MAGIC = b'GRAPYCSR'
+
+CSR_FILE_NAME = 'grapy.csr.db'
+
+
+class CsrIndex:
+    # snapshot of outgoing adjacency (first_node -> second_node) addressed by
+    # node slot, i.e. node offset divided by node record size (dense node id)
+
+    def __init__(self, dir='.'):
+        self.__dir = dir
+        self.__header = Struct(CSR_HEADER_FORMAT)
+        self.__mapping = None
+        self.__view = None
+        self.__offsets = array('Q', [0])
+        self.__neighbours = array('Q')
+        self.node_count = 0
+        self.edge_count = 0
+        self.edges_size = 0
+        self.edges_changes = 0
+
+    @property
+    def index_file(self):
+        return path.join(self.__dir, CSR_FILE_NAME)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def open(self):
+        if path.exists(self.index_file):
+            self.__map()
+
+    def close(self):
+        self.__unmap()
+
+    def degree(self, slot):
+        if slot >= self.node_count:
+            return 0
+
+        return self.__offsets[slot + 1] - self.__offsets[slot]
+
+    def neighbours(self, slot):
+        # slices of the mapping stay valid until the index is closed or refreshed
+        if slot >= self.node_count:
+            return self.__neighbours[0:0]
+
+        return self.__neighbours[self.__offsets[slot]:self.__offsets[slot + 1]]
+
+    def build(self, node_store, edge_store):
+        changes = edge_store.changes
+        sources = array('Q')
+        targets = array('Q')
+        edges_size = self.__collect(node_store, edge_store, 0, sources, targets)
+
+        node_count = max([node_store.record_count, self.__required_nodes(sources, targets)])
+        offsets, neighbours = self.__compress(node_count, sources, targets)
+
+        self.__save(node_count, edges_size, changes, offsets, neighbours)
+
+    def refresh(self, node_store, edge_store):
+        # picks up edges appended since the last build, snapshot is built
+        # again when edges have been deleted, written into released slots
+        # or compacted since then
+        if self.__mapping is None or edge_store.size < self.edges_size or edge_store.changes != self.edges_changes:
+            return self.build(node_store, edge_store)
+
+        changes = edge_store.changes
+        start = edge_store.record_id_at(self.edges_size)
+
+        sources = array('Q')
+        targets = array('Q')
+        edges_size = self.__collect(node_store, edge_store, start, sources, targets)
+
+        node_count = max([self.node_count, node_store.record_count, self.__required_nodes(sources, targets)])
+        added_offsets, added = self.__compress(node_count, sources, targets)
+
+        previous = self.__neighbours
+        appended = memoryview(added)
+
+        offsets = array('Q', [0])
+        neighbours = array('Q')
+        for slot in range(node_count):
+            if slot < self.node_count:
+                neighbours.frombytes(previous[self.__offsets[slot]:self.__offsets[slot + 1]].cast('B'))
+
+            neighbours.frombytes(appended[added_offsets[slot]:added_offsets[slot + 1]].cast('B'))
+            offsets.append(len(neighbours))
+
+        appended.release()
+
+        self.__save(node_count, edges_size, changes, offsets, neighbours)
+
+    @staticmethod
+    def __collect(node_store, edge_store, start, sources, targets):
+        edges_size = edge_store.record_count * edge_store.record_size
+        node_size = node_store.record_size
+
+        for record_id, edge in edge_store.iter_records(start):
+            if edge_store.record_offset(record_id) >= edges_size:
+                break
+
+            if not edge.in_use:
+                continue
+
+            sources.append(node_store.record_offset(edge.first_node) // node_size)
+            targets.append(node_store.record_offset(edge.second_node) // node_size)
+
+        return edges_size
+
+    @staticmethod
+    def __required_nodes(sources, targets):
+        if not sources:
+            return 0
+
+        return max(max(sources), max(targets)) + 1
+
+    @staticmethod
+    def __compress(node_count, sources, targets):
+        offsets = array('Q', bytes(8 * (node_count + 1)))
+        for source in sources:
+            offsets[source + 1] += 1
+
+        for slot in range(node_count):
+            offsets[slot + 1] += offsets[slot]
+
+        neighbours = array('Q', bytes(8 * len(targets)))
+        positions = offsets[:-1]
+        for source, target in zip(sources, targets):
+            neighbours[positions[source]] = target
+            positions[source] += 1
+
+        return offsets, neighbours
+
+    def __save(self, node_count, edges_size, edges_changes, offsets, neighbours):
+        temporary_file = self.index_file + '.tmp'
+
+        with open(temporary_file, 'wb') as file:
+            file.write(self.__header.pack(CSR_MAGIC, node_count, len(neighbours), edges_size, edges_changes))
+            file.write(offsets.tobytes())
+            file.write(neighbours.tobytes())
+            file.flush()
+            fsync(file.fileno())
+
+        self.__unmap()
+        replace(temporary_file, self.index_file)
+        self.__map()
+
+    def __map(self):
+        with open(self.index_file, 'rb') as file:
+            self.__mapping = mmap(file.fileno(), 0, access=ACCESS_READ)
+
+        self.__view = memoryview(self.__mapping)
+        magic, node_count, edge_count, edges_size, edges_changes = self.__header.unpack_from(self.__view)
+        if magic != CSR_MAGIC:
+            self.__unmap()
+            raise ValueError('{0} is not CSR index file'.format(self.index_file))
+
+        start = self.__header.size
+        middle = start + 8 * (node_count + 1)
+        end = middle + 8 * edge_count
+
+        self.__offsets = self.__view[start:middle].cast('Q')
+        self.__neighbours = self.__view[middle:end].cast('Q')
+        self.node_count = node_count
+        self.edge_count = edge_count
+        self.edges_size = edges_size
+        self.edges_changes = edges_changes
+
+    def __unmap(self):
+        if self.__mapping is None:
+            return
+
+        self.__offsets = array('Q', [0])
+        self.__neighbours = array('Q')
+        self.__view.release()
+        self.__view = None
+
+        try:
+            self.__mapping.close()
+        except BufferError:
+            # neighbour slices are still referenced, mapping goes with them
+            pass
+
+        self.__mapping = None
+        self.node_count = 0
+        self.edge_count = 0
+        self.edges_size = 0
+        self.edges_changes = 0
@@ -1,6 +1,8 @@
 from collections import namedtuple
+from operator import attrgetter
 
 from grapy.store.base.descryptor import ConstantLengthBytes
+from grapy.store.base.names import NameIndexMixin
 from grapy.store.base.record import Record, RecordFactory
 from grapy.store.base.store import RecordStore
 
@@ -45,16 +47,26 @@ class EdgeStore(RecordStore):
     record_format = EDGE_RECORD_FORMAT
     store_file_name = EDGE_STORE_FILE_NAME
     record_factory = EdgeRecord._make
+    record_fields = EdgeRecord._fields
+    pointer_fields = ('first_node', 'second_node', 'next_edge', 'first_property')
 
-    def __init__(self, dir='.'):
-        super().__init__(dir)
+    def __init__(self, dir='.', **kwargs):
+        super().__init__(dir, **kwargs)
 
+    def iter_edges(self, node):
+        return self.iter_chain(node.first_edge, attrgetter('next_edge'))
 
-class EdgeTypeStore(RecordStore):
+    def iter_edge_views(self, node, view=None):
+        return self.iter_chain_views(node.first_edge, attrgetter('next_edge'), view)
+
+
+class EdgeTypeStore(NameIndexMixin, RecordStore):
 
     record_format = EDGE_TYPE_RECORD_FORMAT
     store_file_name = EDGE_TYPE_STORE_FILE_NAME
     record_factory = RecordFactory(EdgeTypeRecord)
+    record_fields = ('value',)
+    cache_size = 1024
 
-    def __init__(self, dir='.'):
-        super().__init__(dir)
+    def __init__(self, dir='.', **kwargs):
+        super().__init__(dir, **kwargs)
@@ -0,0 +1,360 @@
+import csv
+import json
+from array import array
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+from os import path
+from struct import Struct
+
+from grapy.store.base.record import NULL_POINTER, NULL_SHORT_POINTER
+from grapy.store.base.view import field_layout
+from grapy.store.edge import EdgeRecord, EdgeStore, EdgeTypeStore
+from grapy.store.label import LabelStore
+from grapy.store.node import NodeRecord, NodeStore
+from grapy.store.property import PropertyHeader, PropertyNameStore, PropertyRecord, PropertyStore, PropertyType
+
+NODE_ID_COLUMN = 'id'
+NODE_LABELS_COLUMN = 'labels'
+EDGE_SOURCE_COLUMN = 'source'
+EDGE_TARGET_COLUMN = 'target'
+EDGE_TYPE_COLUMN = 'type'
+
+# separates labels in CSV labels column
+LABEL_SEPARATOR = ';'
+
+# node records have four label pointers
+MAX_LABELS = 4
+
+# CSV property columns can declare value type, e.g. age:int
+VALUE_CONVERTERS = {
+    'string': str,
+    'int': int,
+    'float': float,
+    'bool': lambda value: value.strip().lower() in ('true', '1', 'yes'),
+}
+
+
+class ImportSummary:
+    def __init__(self, nodes=0, edges=0, properties=0):
+        self.nodes = nodes
+        self.edges = edges
+        self.properties = properties
+
+    def __repr__(self):
+        return 'ImportSummary(nodes={0}, edges={1}, properties={2})'.format(self.nodes, self.edges, self.properties)
+
+
+class BulkImporter:
+    # offline import into empty stores; files are streamed in batches, names
+    # are resolved once per distinct value and every chain pointer is known
+    # before the record is written, so stores are only appended to
+    #
+    # node files: CSV with id and labels columns or JSONL objects with id,
+    # labels and properties; edge files: CSV with source, target and type
+    # columns or JSONL objects with source, target, type and properties;
+    # other CSV columns are properties
+    #
+    # properties of one entity form a forward chain, edges are prepended to
+    # chain of their source node, so it is walked from the last imported edge
+
+    def __init__(self, dir='.', dense_ids=False, batch_size=10000, processes=0, **property_store_options):
+        self.__dir = dir
+        self.__dense_ids = dense_ids
+        self.__batch_size = batch_size
+        self.__processes = processes
+        self.__property_store_options = property_store_options
+
+        self.__node_ids = {}
+        self.__last_edges = array('Q')
+        self.__names = {}
+        self.__summary = ImportSummary()
+
+        self.__nodes = None
+        self.__labels = None
+        self.__edge_types = None
+        self.__property_names = None
+
+    def run(self, node_files=(), edge_files=()):
+        nodes = NodeStore(self.__dir, dense_ids=self.__dense_ids)
+        edges = EdgeStore(self.__dir, dense_ids=self.__dense_ids)
+        properties = PropertyStore(self.__dir, dense_ids=self.__dense_ids, **self.__property_store_options)
+        labels = LabelStore(self.__dir)
+        edge_types = EdgeTypeStore(self.__dir)
+        property_names = PropertyNameStore(self.__dir)
+        stores = [nodes, edges, properties, labels, edge_types, property_names]
+
+        for store in stores:
+            store.open()
+
+        pool = Pool(self.__processes) if self.__processes else None
+        try:
+            for store in [nodes, edges, properties]:
+                if store.size:
+                    raise ValueError('{0} is not empty'.format(store.store_file_name))
+
+            self.__names = {labels: {}, edge_types: {}, property_names: {}}
+            self.__nodes = nodes
+            self.__labels = labels
+            self.__edge_types = edge_types
+            self.__property_names = property_names
+
+            for file_name in node_files:
+                for rows in self.__parse(pool, file_name, 'node'):
+                    self.__import_nodes(rows, nodes, properties)
+
+            for file_name in edge_files:
+                for rows in self.__parse(pool, file_name, 'edge'):
+                    self.__import_edges(rows, edges, properties)
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+            for store in stores:
+                store.close()
+
+        self.__link_first_edges(nodes)
+
+        return self.__summary
+
+    def __parse(self, pool, file_name, kind):
+        # yields lists of parsed rows in file order, at most processes * 2
+        # batches are parsed at once so memory use does not depend on file size
+        csv_file = path.splitext(file_name)[1].lower() == '.csv'
+
+        with open(file_name, newline='', encoding='utf-8') as file:
+            if csv_file:
+                records = csv_records(file)
+                header = next(csv.reader([next(records, '')]))
+            else:
+                records = file
+                header = None
+
+            batches = iter(lambda: list(islice(records, self.__batch_size)), [])
+
+            if pool is None:
+                for lines in batches:
+                    yield parse_lines(kind, header, lines)
+                return
+
+            pending = deque()
+            for lines in batches:
+                pending.append(pool.apply_async(parse_lines, (kind, header, lines)))
+
+                if len(pending) >= 2 * self.__processes:
+                    yield pending.popleft().get()
+
+            while pending:
+                yield pending.popleft().get()
+
+    def __import_nodes(self, rows, nodes, properties):
+        records = []
+        property_records = []
+
+        for node_id, labels, values in rows:
+            if node_id in self.__node_ids:
+                raise ValueError('Node {0} is imported more than once'.format(node_id))
+
+            if len(labels) > MAX_LABELS:
+                raise ValueError('Node {0} has more than {1} labels'.format(node_id, MAX_LABELS))
+
+            self.__node_ids[node_id] = self.__summary.nodes + len(records)
+            self.__last_edges.append(NULL_POINTER)
+
+            pointers = [self.__name(self.__labels, label) for label in labels]
+            pointers += [NULL_SHORT_POINTER] * (MAX_LABELS - len(pointers))
+
+            first_property = self.__chain_properties(values, properties, property_records)
+            records.append(NodeRecord(True, NULL_POINTER, first_property, *pointers))
+
+        self.__write(properties, property_records, self.__summary.properties)
+        self.__write(nodes, records, self.__summary.nodes)
+
+        self.__summary.properties += len(property_records)
+        self.__summary.nodes += len(records)
+
+    def __import_edges(self, rows, edges, properties):
+        records = []
+        property_records = []
+
+        for source, target, edge_type, values in rows:
+            try:
+                source_slot = self.__node_ids[source]
+                target_slot = self.__node_ids[target]
+            except KeyError as error:
+                raise ValueError('Edge refers to node {0} which is not imported'.format(error.args[0]))
+
+            edge_id = self.__id(edges, self.__summary.edges + len(records))
+            next_edge = self.__last_edges[source_slot]
+            self.__last_edges[source_slot] = edge_id
+
+            type_pointer = self.__name(self.__edge_types, edge_type) if edge_type else NULL_SHORT_POINTER
+            first_property = self.__chain_properties(values, properties, property_records)
+
+            first_node = self.__id(self.__nodes, source_slot)
+            second_node = self.__id(self.__nodes, target_slot)
+
+            records.append(EdgeRecord(True, first_node, second_node, next_edge, first_property, type_pointer))
+
+        self.__write(properties, property_records, self.__summary.properties)
+        self.__write(edges, records, self.__summary.edges)
+
+        self.__summary.properties += len(property_records)
+        self.__summary.edges += len(records)
+
+    def __chain_properties(self, values, properties, property_records):
+        # properties are appended in chain order, each one points to the next record
+        if not values:
+            return NULL_POINTER
+
+        step = self.__id(properties, 1)
+        first_property = self.__id(properties, self.__summary.properties + len(property_records))
+        next_property = first_property
+        names = self.__names[self.__property_names]
+
+        for name, value in values:
+            name_pointer = names.get(name, None)
+            if name_pointer is None:
+                name_pointer = self.__name(self.__property_names, name)
+
+            next_property += step
+
+            record = PropertyRecord(PropertyHeader(name_pointer, next_property, PropertyType.UNKNOWN, 0))
+            record.value = value
+            property_records.append(record)
+
+        record.header.next_property = NULL_POINTER
+
+        return first_property
+
+    def __name(self, store, name):
+        names = self.__names[store]
+
+        pointer = names.get(name, None)
+        if pointer is None:
+            pointer = names[name] = store.get_or_create(name)
+
+        return pointer
+
+    def __write(self, store, records, first_slot):
+        if not records:
+            return
+
+        record_ids = store.write_many(records)
+        if record_ids[0] != self.__id(store, first_slot):
+            raise RuntimeError('{0} has been modified during import'.format(store.store_file_name))
+
+    def __id(self, store, slot):
+        return slot if self.__dense_ids else slot * store.record_size
+
+    def __link_first_edges(self, nodes):
+        # node file is rewritten in place in large sequential chunks
+        record_size = nodes.record_size
+        first_edge_offset = [offset for name, _, offset in field_layout(nodes.record_format, nodes.record_fields)
+                             if name == 'first_edge'][0]
+        pointer = Struct('<Q')
+        chunk_records = max(1, nodes.coalesce_limit // record_size)
+
+        with open(nodes.store_file, 'rb+') as file:
+            for start in range(0, len(self.__last_edges), chunk_records):
+                last_edges = self.__last_edges[start:start + chunk_records]
+
+                file.seek(start * record_size)
+                buffer = bytearray(file.read(len(last_edges) * record_size))
+
+                for index, edge_id in enumerate(last_edges):
+                    pointer.pack_into(buffer, index * record_size + first_edge_offset, edge_id)
+
+                file.seek(start * record_size)
+                file.write(buffer)
+
+
+def csv_records(lines):
+    # yields CSV records, quoted values can contain line breaks, so record
+    # ends only at line break outside of quotes (escaped quotes are doubled)
+    record = []
+    quotes = 0
+
+    for line in lines:
+        record.append(line)
+        quotes += line.count('"')
+
+        if not quotes % 2:
+            yield ''.join(record)
+            record = []
+            quotes = 0
+
+    if record:
+        yield ''.join(record)
+
+
+def parse_lines(kind, header, lines):
+    # module level function, so batches can be parsed in worker processes
+    if header is None:
+        rows = [json.loads(line) for line in lines if line.strip()]
+        return [parse_json_node(row) if kind == 'node' else parse_json_edge(row) for row in rows]
+
+    columns = [parse_column(name) for name in header]
+    parsed = []
+
+    for values in csv.reader(lines):
+        if not values:
+            continue
+
+        row = {}
+        properties = []
+        for (name, converter), value in zip(columns, values):
+            if converter is None:
+                row[name] = value
+            elif value != '':
+                properties.append((name, converter(value)))
+
+        if kind == 'node':
+            labels = row.get(NODE_LABELS_COLUMN, '')
+            parsed.append((row[NODE_ID_COLUMN], [label for label in labels.split(LABEL_SEPARATOR) if label],
+                           properties))
+        else:
+            parsed.append((row[EDGE_SOURCE_COLUMN], row[EDGE_TARGET_COLUMN], row.get(EDGE_TYPE_COLUMN, ''),
+                           properties))
+
+    return parsed
+
+
+def parse_column(column):
+    # returns (name, converter), converter is None for structural columns
+    if column in (NODE_ID_COLUMN, NODE_LABELS_COLUMN, EDGE_SOURCE_COLUMN, EDGE_TARGET_COLUMN, EDGE_TYPE_COLUMN):
+        return column, None
+
+    name, _, value_type = column.partition(':')
+    if value_type and value_type not in VALUE_CONVERTERS:
+        raise ValueError('Column {0} has unknown value type {1}'.format(column, value_type))
+
+    return name, VALUE_CONVERTERS[value_type or 'string']
+
+
+def parse_json_node(row):
+    labels = row.get(NODE_LABELS_COLUMN, ())
+    if isinstance(labels, str):
+        # single label, it must not be split into characters
+        labels = [labels]
+
+    return str(row[NODE_ID_COLUMN]), list(labels), json_properties(row)
+
+
+def parse_json_edge(row):
+    return str(row[EDGE_SOURCE_COLUMN]), str(row[EDGE_TARGET_COLUMN]), row.get(EDGE_TYPE_COLUMN, ''), \
+        json_properties(row)
+
+
+def json_properties(row):
+    properties = []
+    for name, value in row.get('properties', {}).items():
+        if value is None:
+            continue
+
+        if isinstance(value, (list, dict)):
+            value = json.dumps(value, separators=(',', ':'))
+
+        properties.append((name, value))
+
+    return properties
@@ -0,0 +1,440 @@
+from bisect import bisect_left, bisect_right
+from os import fsync, path, replace
+from struct import Struct
+
+from grapy.store.base.bitmap import Bitmap
+from grapy.store.base.record import NULL_SHORT_POINTER
+from grapy.store.property import PropertyType
+
+INDEX_HEADER_FORMAT = '<8sQQ?Q'
+# little-endian
+# 8 bytes - magic - char[]
+# 8 bytes - store bytes covered by the index (integer)
+# 8 bytes - store changes covered by the index (integer)
+# 1 byte - clean - index has been closed properly (bool)
+# 8 bytes - number of entries (integer)
+
+POSTINGS_ENTRY_FORMAT = '<QQ'
+# little-endian
+# 8 bytes - key, e.g. label or edge type pointer (integer)
+# 8 bytes - length of zlib compressed bitmap which follows the entry (integer)
+
+VALUE_ENTRY_FORMAT = '<QHQ'
+# little-endian
+# 8 bytes - property record pointer (integer)
+# 2 bytes - property type (integer)
+# 8 bytes - length of encoded value which follows the entry (integer)
+
+POSTINGS_MAGIC = b'GRAPYPST'
+VALUE_INDEX_MAGIC = b'GRAPYVAL'
+
+LABEL_INDEX_FILE_NAME = 'grapy.nodes.labels.idx'
+EDGE_TYPE_INDEX_FILE_NAME = 'grapy.edges.types.idx'
+VALUE_INDEX_FILE_NAME = 'grapy.properties.{0}.{1}.idx'
+
+
+class StoreIndex:
+    # secondary index kept up to date as store listener, persisted on flush
+
+    index_file_name = None
+    index_magic = None
+
+    def __init__(self, store):
+        self.store = store
+        self.__header = Struct(INDEX_HEADER_FORMAT)
+        self.__dirty = False
+        # (size, changes) of the store in the index file
+        self.__covered = None
+
+    @property
+    def index_file(self):
+        return path.join(path.dirname(self.store.store_file), self.index_file_name)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def open(self):
+        if not self.__load():
+            self.rebuild()
+
+        self.store.add_listener(self)
+
+    def close(self):
+        self.store.remove_listener(self)
+        self.flush()
+
+    def record_written(self, offset, record):
+        if self._accepts(record):
+            self.__mark_dirty()
+            self._add(offset, record)
+
+    def record_deleted(self, offset, record):
+        if self._accepts(record):
+            self.__mark_dirty()
+            self._remove(offset, record)
+
+    def store_replaced(self):
+        # compaction moves records, so every offset has to be indexed again
+        self.rebuild()
+
+    def rebuild(self):
+        self._clear()
+
+        for record_id, record in self.store.iter_records():
+            if self._accepts(record):
+                self._add(self.store.record_offset(record_id), record)
+
+        self.__dirty = True
+        self.flush()
+
+    def flush(self):
+        # records not accepted by the index change the store as well
+        covered = (self.store.size, self.store.changes)
+        if not self.__dirty and covered == self.__covered:
+            return
+
+        entries = self._dump()
+
+        temporary_file = self.index_file + '.tmp'
+        with open(temporary_file, 'wb') as file:
+            file.write(self.__header.pack(self.index_magic, covered[0], covered[1], True, len(entries)))
+            for entry in entries:
+                file.write(entry)
+
+            file.flush()
+            fsync(file.fileno())
+
+        replace(temporary_file, self.index_file)
+        self.__dirty = False
+        self.__covered = covered
+
+    def _accepts(self, record):
+        raise NotImplementedError
+
+    def _add(self, offset, record):
+        raise NotImplementedError
+
+    def _remove(self, offset, record):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def _dump(self):
+        # returns list of encoded entries
+        raise NotImplementedError
+
+    def _load(self, data, position, count):
+        raise NotImplementedError
+
+    def __load(self):
+        if not path.exists(self.index_file):
+            return False
+
+        with open(self.index_file, 'rb') as file:
+            data = file.read()
+
+        if len(data) < self.__header.size:
+            return False
+
+        # deleted records and records written into released slots do not
+        # change the size, but they change the store
+        magic, size, changes, clean, count = self.__header.unpack_from(data)
+        covered = (size, changes)
+        if magic != self.index_magic or not clean or covered != (self.store.size, self.store.changes):
+            return False
+
+        self.__covered = covered
+
+        self._clear()
+        self._load(data, self.__header.size, count)
+
+        return True
+
+    def __mark_dirty(self):
+        if self.__dirty:
+            return
+
+        # crash before the next flush makes the index rebuild on open
+        with open(self.index_file, 'r+b') as file:
+            file.write(self.__header.pack(self.index_magic, 0, 0, False, 0))
+            file.flush()
+
+        self.__dirty = True
+
+
+class PostingsIndex(StoreIndex):
+    # maps keys to bitmaps of record slots
+
+    index_magic = POSTINGS_MAGIC
+
+    def __init__(self, store):
+        self.__entry = Struct(POSTINGS_ENTRY_FORMAT)
+        self.__postings = {}
+        super().__init__(store)
+
+    def keys_of(self, record):
+        raise NotImplementedError
+
+    def keys(self):
+        return [key for key, postings in self.__postings.items() if postings]
+
+    def postings(self, key):
+        postings = self.__postings.get(key, None)
+        return postings.copy() if postings is not None else Bitmap()
+
+    def all_of(self, *keys):
+        result = None
+        for key in keys:
+            postings = self.__postings.get(key, None)
+            if postings is None:
+                return Bitmap()
+
+            result = postings.copy() if result is None else result & postings
+
+        return result if result is not None else Bitmap()
+
+    def any_of(self, *keys):
+        result = Bitmap()
+        for key in keys:
+            postings = self.__postings.get(key, None)
+            if postings is not None:
+                result = result | postings
+
+        return result
+
+    def record_ids(self, bitmap):
+        record_size = self.store.record_size
+        return [self.store.record_id_at(slot * record_size) for slot in bitmap]
+
+    def _accepts(self, record):
+        return record.in_use
+
+    def _add(self, offset, record):
+        slot = offset // self.store.record_size
+        for key in self.keys_of(record):
+            postings = self.__postings.get(key, None)
+            if postings is None:
+                postings = self.__postings[key] = Bitmap()
+
+            postings.add(slot)
+
+    def _remove(self, offset, record):
+        slot = offset // self.store.record_size
+        for key in self.keys_of(record):
+            postings = self.__postings.get(key, None)
+            if postings is not None:
+                postings.discard(slot)
+
+    def _clear(self):
+        self.__postings = {}
+
+    def _dump(self):
+        entries = []
+        for key, postings in sorted(self.__postings.items()):
+            if postings:
+                data = postings.compress()
+                entries.append(self.__entry.pack(key, len(data)) + data)
+
+        return entries
+
+    def _load(self, data, position, count):
+        for _ in range(count):
+            key, length = self.__entry.unpack_from(data, position)
+            position += self.__entry.size
+
+            self.__postings[key] = Bitmap.decompress(data[position:position + length])
+            position += length
+
+
+class LabelIndex(PostingsIndex):
+
+    index_file_name = LABEL_INDEX_FILE_NAME
+
+    def keys_of(self, record):
+        labels = (record.label_1, record.label_2, record.label_3, record.label_4)
+        return {label for label in labels if label != NULL_SHORT_POINTER}
+
+
+class EdgeTypeIndex(PostingsIndex):
+
+    index_file_name = EDGE_TYPE_INDEX_FILE_NAME
+
+    def keys_of(self, record):
+        if record.edge_type == NULL_SHORT_POINTER:
+            return set()
+
+        return {record.edge_type}
+
+
+class ValueIndex(StoreIndex):
+    # opt-in index of values of one property name in PropertyStore,
+    # it resolves values to property record ids
+
+    index_magic = VALUE_INDEX_MAGIC
+    index_kind = None
+    supported_types = ()
+
+    def __init__(self, store, name_pointer):
+        self.name_pointer = name_pointer
+        self.__entry = Struct(VALUE_ENTRY_FORMAT)
+        self.__integer = Struct('<q')
+        self.__float = Struct('<d')
+        super().__init__(store)
+
+    @property
+    def index_file_name(self):
+        return VALUE_INDEX_FILE_NAME.format(self.name_pointer, self.index_kind)
+
+    def _accepts(self, record):
+        header = record.header
+        return header.name_pointer == self.name_pointer and header.type in self.supported_types
+
+    def _remove(self, offset, record):
+        self._discard(offset, record.value)
+
+    def _entries(self):
+        # returns (offset, value) pairs
+        raise NotImplementedError
+
+    def _dump(self):
+        entries = []
+        for offset, value in self._entries():
+            property_type, encoded = self.__encode(value)
+            entries.append(self.__entry.pack(offset, property_type, len(encoded)) + encoded)
+
+        return entries
+
+    def _load(self, data, position, count):
+        for _ in range(count):
+            offset, property_type, length = self.__entry.unpack_from(data, position)
+            position += self.__entry.size
+
+            value = self.__decode(property_type, data[position:position + length])
+            position += length
+
+            self._insert(offset, value)
+
+    def _add(self, offset, record):
+        self._insert(offset, record.value)
+
+    def _insert(self, offset, value):
+        raise NotImplementedError
+
+    def _discard(self, offset, value):
+        raise NotImplementedError
+
+    def __encode(self, value):
+        if isinstance(value, str):
+            return PropertyType.STRING, value.encode('utf-8')
+        elif isinstance(value, (bytes, bytearray)):
+            return PropertyType.BYTES, bytes(value)
+        elif isinstance(value, int):
+            return PropertyType.INTEGER, self.__integer.pack(value)
+        else:
+            return PropertyType.FLOAT, self.__float.pack(value)
+
+    def __decode(self, property_type, encoded):
+        if property_type == PropertyType.STRING:
+            return encoded.decode('utf-8')
+        elif property_type == PropertyType.BYTES:
+            return encoded
+        elif property_type == PropertyType.INTEGER:
+            return self.__integer.unpack(encoded)[0]
+        else:
+            return self.__float.unpack(encoded)[0]
+
+
+class HashValueIndex(ValueIndex):
+    # equality lookups
+
+    index_kind = 'hash'
+    supported_types = (PropertyType.STRING, PropertyType.BYTES, PropertyType.INTEGER)
+
+    def __init__(self, store, name_pointer):
+        self.__values = {}
+        super().__init__(store, name_pointer)
+
+    def find(self, value):
+        return [self.store.record_id_at(offset) for offset in self.__values.get(value, ())]
+
+    def _insert(self, offset, value):
+        offsets = self.__values.get(value, None)
+        if offsets is None:
+            offsets = self.__values[value] = []
+
+        offsets.append(offset)
+
+    def _discard(self, offset, value):
+        offsets = self.__values.get(value, None)
+        if offsets is not None and offset in offsets:
+            offsets.remove(offset)
+
+            if not offsets:
+                del self.__values[value]
+
+    def _clear(self):
+        self.__values = {}
+
+    def _entries(self):
+        return [(offset, value) for value, offsets in self.__values.items() for offset in offsets]
+
+
+class SortedValueIndex(ValueIndex):
+    # equality and range lookups over values kept in sorted order
+
+    index_kind = 'sorted'
+    supported_types = (PropertyType.INTEGER, PropertyType.FLOAT)
+
+    def __init__(self, store, name_pointer):
+        self.__values = []
+        self.__offsets = []
+        super().__init__(store, name_pointer)
+
+    def find(self, value):
+        return self.range(value, value)
+
+    def range(self, low=None, high=None, include_low=True, include_high=True):
+        if low is None:
+            start = 0
+        elif include_low:
+            start = bisect_left(self.__values, low)
+        else:
+            start = bisect_right(self.__values, low)
+
+        if high is None:
+            end = len(self.__values)
+        elif include_high:
+            end = bisect_right(self.__values, high)
+        else:
+            end = bisect_left(self.__values, high)
+
+        return [self.store.record_id_at(offset) for offset in self.__offsets[start:end]]
+
+    def _insert(self, offset, value):
+        # equal values stay in write order
+        position = bisect_right(self.__values, value)
+
+        self.__values.insert(position, value)
+        self.__offsets.insert(position, offset)
+
+    def _discard(self, offset, value):
+        start = bisect_left(self.__values, value)
+        end = bisect_right(self.__values, value)
+
+        for position in range(start, end):
+            if self.__offsets[position] == offset:
+                del self.__values[position]
+                del self.__offsets[position]
+                return
+
+    def _clear(self):
+        self.__values = []
+        self.__offsets = []
+
+    def _entries(self):
+        return list(zip(self.__offsets, self.__values))
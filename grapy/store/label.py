@@ -1,4 +1,5 @@
 from grapy.store.base.descryptor import ConstantLengthBytes
+from grapy.store.base.names import NameIndexMixin
 from grapy.store.base.record import Record, RecordFactory
 from grapy.store.base.store import RecordStore
 
@@ -25,11 +26,13 @@ class LabelRecord(Record):
         return iter([self.value])
 
 
-class LabelStore(RecordStore):
+class LabelStore(NameIndexMixin, RecordStore):
 
     record_format = LABEL_RECORD_FORMAT
     store_file_name = LABEL_STORE_FILE_NAME
     record_factory = RecordFactory(LabelRecord)
+    record_fields = ('value',)
+    cache_size = 1024
 
-    def __init__(self, dir='.'):
-        super().__init__(dir)
+    def __init__(self, dir='.', **kwargs):
+        super().__init__(dir, **kwargs)
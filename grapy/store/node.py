@@ -19,6 +19,8 @@ class NodeStore(RecordStore):
     record_format = NODE_RECORD_FORMAT
     store_file_name = NODE_STORE_FILE_NAME
     record_factory = NodeRecord._make
+    record_fields = NodeRecord._fields
+    pointer_fields = ('first_edge', 'first_property')
 
-    def __init__(self, dir='.'):
-        super().__init__(dir)
+    def __init__(self, dir='.', **kwargs):
+        super().__init__(dir, **kwargs)
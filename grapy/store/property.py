@@ -1,33 +1,51 @@
+import lzma
+import zlib
 from enum import IntEnum
+from operator import attrgetter
+from os import path
 from struct import Struct
 
 from grapy.store.base.descryptor import ConstantLengthBytes
-from grapy.store.base.record import Record, RecordFactory
+from grapy.store.base.names import NameIndexMixin
+from grapy.store.base.record import NULL_POINTER, Record, RecordFactory
 from grapy.store.base.store import RecordStore
+from grapy.store.blob import BlobStore
 
 
 PROPERTY_NAME_RECORD_FORMAT = '<80s'
 # little-endian
 # 80 bytes - name - char[]
 
-PROPERTY_HEADER_RECORD_FORMAT = '<QQHQ'
+PROPERTY_HEADER_RECORD_FORMAT = '<QQBBQ'
 # little-endian
-# property name pointer (integer)
-# next property pointer (integer)
-# property type (integer)
-# property length (integer)
-# property value is saved after header
+# 8 bytes - property name pointer (integer)
+# 8 bytes - next property pointer (integer)
+# 1 byte - property type (integer)
+# 1 byte - compression codec of stored value (integer)
+# 8 bytes - length of stored value (integer)
+
+PROPERTY_RECORD_FORMAT = PROPERTY_HEADER_RECORD_FORMAT + '16s'
+# header followed by
+# 16 bytes - value - inline value, or blob pointer when length exceeds INLINE_VALUE_SIZE
+
+INLINE_VALUE_SIZE = 16
+
+# strings and bytes at least that long are compressed by default
+COMPRESSION_THRESHOLD = 256
+
+COMPRESSION_DICTIONARY_SUFFIX = '.zdict'
 
 PROPERTY_NAME_STORE_FILE_NAME = 'grapy.propertynames.db'
 PROPERTY_STORE_FILE_NAME = 'grapy.properties.db'
 
 
 class PropertyHeader(Record):
-    def __init__(self, name_pointer, next_property, type, length):
+    def __init__(self, name_pointer, next_property, type, length, codec=0):
         self.name_pointer = name_pointer
         self.next_property = next_property
         self.type = type if isinstance(type, PropertyType) else PropertyType(type)
         self.length = length
+        self.codec = codec
 
     def __iter__(self):
         return iter([
@@ -59,6 +77,14 @@ class PropertyType(IntEnum):
     STRING = 5
 
 
+class PropertyCompression(IntEnum):
+    NONE = 0
+    ZLIB = 1
+    # zlib with dictionary of the store, suited for short values
+    ZLIB_DICTIONARY = 2
+    LZMA = 3
+
+
 class RecordType:
     def __init__(self, record):
         self.__record = record
@@ -131,57 +157,314 @@ class ValueDeserializer:
         return stored_value
 
 
-class PropertyStore(RecordStore):
+class PropertyCodec:
+    # encodes property record with value into fixed-size record, fixed-width
+    # values are packed together with the header by one struct, longer
+    # strings and bytes are optionally compressed and moved to blob store
+
+    # StoreMetrics counting lookups of fixed-width value structs
+    metrics = None
+
+    def __init__(self, blobs=None, compression=None, compression_threshold=COMPRESSION_THRESHOLD,
+                 dictionary=None):
+        if compression not in (None, PropertyCompression.ZLIB, PropertyCompression.LZMA):
+            raise ValueError('Compression {0} is not supported'.format(compression))
+
+        self.blobs = blobs
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.dictionary = dictionary
+        self.record_struct = Struct(PROPERTY_RECORD_FORMAT)
+        self.__header_struct = Struct(PROPERTY_HEADER_RECORD_FORMAT)
+        self.__blob_struct = Struct(PROPERTY_HEADER_RECORD_FORMAT + 'Q8x')
+        self.__blob_pointer = Struct('<Q')
+        self.__fixed_structs = {
+            property_type: Struct(PROPERTY_HEADER_RECORD_FORMAT + value_format[1:] + padding)
+            for property_type, (value_format, padding) in FIXED_VALUE_FORMATS.items()
+        }
+        self.__fixed_values = {
+            property_type: Struct(value_format)
+            for property_type, (value_format, _) in FIXED_VALUE_FORMATS.items()
+        }
+
+    def encode(self, record):
+        value = record.value
+        property_type = VALUE_TYPES.get(type(value), None)
+        if property_type is None:
+            # subclasses of supported types
+            property_type = RecordType(record).type
 
-    record_format = PROPERTY_HEADER_RECORD_FORMAT
-    store_file_name = PROPERTY_STORE_FILE_NAME
-    record_factory = RecordFactory(PropertyHeader)
+        header = record.header
+        header.type = property_type
+        header.codec = PropertyCompression.NONE
+
+        struct = self.__fixed_structs.get(property_type, None)
+
+        metrics = self.metrics
+        if metrics is not None:
+            if struct is None:
+                metrics.struct_misses += 1
+            else:
+                metrics.struct_hits += 1
+
+        if struct is not None:
+            header.length = self.__fixed_values[property_type].size
+            return struct.pack(header.name_pointer, header.next_property, property_type, header.codec, header.length,
+                               value)
+
+        raw = VALUE_ENCODERS[property_type](value)
+        if len(raw) > INLINE_VALUE_SIZE:
+            header.codec, raw = self.__compress(raw)
+
+        header.length = len(raw)
+
+        if header.length <= INLINE_VALUE_SIZE:
+            return self.record_struct.pack(header.name_pointer, header.next_property, property_type, header.codec,
+                                           header.length, raw)
+
+        if self.blobs is None:
+            raise ValueError('Value of {0} bytes requires blob store'.format(header.length))
+
+        pointer = self.blobs.write(raw)
+        return self.__blob_struct.pack(header.name_pointer, header.next_property, property_type, header.codec,
+                                       header.length, pointer)
+
+    def decode(self, buffer, offset=0):
+        return self(self.record_struct.unpack_from(buffer, offset))
 
-    def __init__(self, dir='.'):
-        super().__init__(dir)
-        self.__value_structs = dict()
-        self.__value_struct_factory = ValueStructFormatFactory()
+    def blob_pointer(self, buffer, offset=0):
+        # returns pointer to blob of encoded record or None for inline values
+        _, _, property_type, _, length = self.__header_struct.unpack_from(buffer, offset)
+        if property_type in self.__fixed_structs or length <= INLINE_VALUE_SIZE:
+            return None
 
-    def _read_record(self, record_id):
-        header = super()._read_record(record_id)
+        return self.__blob_pointer.unpack_from(buffer, offset + self.__header_struct.size)[0]
 
-        struct_format = self.__value_struct_factory.for_restore(header)
-        struct = self.__get_struct(struct_format)
+    def __call__(self, values):
+        name_pointer, next_property, property_type, codec, length, inline = values
+        property_type = PROPERTY_TYPES[property_type]
 
-        buffer = self._file.read(header.length)
-        stored_value_tuple = struct.unpack(buffer)
-        stored_value = stored_value_tuple[0]
+        fixed = self.__fixed_values.get(property_type, None)
 
-        value = ValueDeserializer(header).deserialize(stored_value)
+        metrics = self.metrics
+        if metrics is not None:
+            if fixed is None:
+                metrics.struct_misses += 1
+            else:
+                metrics.struct_hits += 1
 
-        record = PropertyRecord(header)
+        if fixed is not None:
+            value = fixed.unpack_from(inline)[0]
+        else:
+            if length <= INLINE_VALUE_SIZE:
+                raw = inline[:length]
+            elif self.blobs is None:
+                raise ValueError('Value of {0} bytes requires blob store'.format(length))
+            else:
+                raw = self.blobs.read(self.__blob_pointer.unpack_from(inline)[0], length)
+
+            if codec:
+                raw = self.__decompress(codec, raw)
+
+            value = VALUE_DECODERS[property_type](raw)
+
+        record = PropertyRecord(PropertyHeader(name_pointer, next_property, property_type, length, codec))
         record.value = value
 
         return record
 
-    def _write_record(self, record):
-        serializer = ValueSerializer(record)
-        serialized_value = serializer.serialize()
+    def __compress(self, raw):
+        # compressed value is kept only when it is shorter
+        if len(raw) >= self.compression_threshold and self.compression is not None:
+            codec = self.compression
+        elif self.dictionary is not None:
+            codec = PropertyCompression.ZLIB_DICTIONARY
+        else:
+            return PropertyCompression.NONE, raw
 
-        struct_format = self.__value_struct_factory.for_store(serialized_value)
-        struct = self.__get_struct(struct_format)
+        if codec == PropertyCompression.LZMA:
+            compressed = lzma.compress(raw, format=lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+        elif codec == PropertyCompression.ZLIB_DICTIONARY:
+            compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=self.dictionary)
+            compressed = compressor.compress(raw) + compressor.flush()
+        else:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+            compressed = compressor.compress(raw) + compressor.flush()
 
-        header = record.header
-        header.type = RecordType(record).type
-        header.length = struct.size
+        if len(compressed) >= len(raw):
+            return PropertyCompression.NONE, raw
+
+        return codec, compressed
+
+    def __decompress(self, codec, raw):
+        if codec == PropertyCompression.LZMA:
+            return lzma.decompress(bytes(raw), format=lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+
+        if codec == PropertyCompression.ZLIB_DICTIONARY:
+            if self.dictionary is None:
+                raise ValueError('Value is compressed with dictionary which is not available')
+
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=self.dictionary)
+        else:
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+
+        return decompressor.decompress(raw) + decompressor.flush()
+
+
+def build_dictionary(samples, size=32 * 1024):
+    # zlib prefers matches close to the end of dictionary,
+    # so the first samples end up there
+    dictionary = bytearray()
+    for sample in samples:
+        raw = VALUE_ENCODERS[PropertyType.STRING](sample) if isinstance(sample, str) else bytes(sample)
+        if len(dictionary) + len(raw) > size:
+            break
+
+        dictionary[0:0] = raw
+
+    return bytes(dictionary)
+
+
+LZMA_FILTERS = [{'id': lzma.FILTER_LZMA2, 'preset': 6}]
+
+FIXED_VALUE_FORMATS = {
+    # value format and padding up to INLINE_VALUE_SIZE
+    PropertyType.BOOL: ('<?', '15x'),
+    PropertyType.INTEGER: ('<q', '8x'),
+    PropertyType.FLOAT: ('<d', '8x'),
+}
+
+VALUE_TYPES = {
+    bool: PropertyType.BOOL,
+    int: PropertyType.INTEGER,
+    float: PropertyType.FLOAT,
+    bytes: PropertyType.BYTES,
+    bytearray: PropertyType.BYTES,
+    str: PropertyType.STRING,
+}
+
+VALUE_ENCODERS = {
+    PropertyType.BYTES: bytes,
+    PropertyType.STRING: lambda value: value.encode('utf-8'),
+}
+
+VALUE_DECODERS = {
+    PropertyType.UNKNOWN: bytes,
+    PropertyType.BYTES: bytes,
+    PropertyType.STRING: lambda raw: bytes(raw).decode('utf-8'),
+}
+
+PROPERTY_TYPES = {int(property_type): property_type for property_type in PropertyType}
+
+
+class PropertyStore(RecordStore):
+    # property chains stay in small fixed-size records, values longer than
+    # INLINE_VALUE_SIZE bytes are kept in blob store next to the store file
+
+    record_format = PROPERTY_RECORD_FORMAT
+    store_file_name = PROPERTY_STORE_FILE_NAME
+    record_factory = PropertyCodec()
+    record_fields = ('name_pointer', 'next_property', 'type', 'codec', 'length', 'value')
+    pointer_fields = ('name_pointer', 'next_property')
+
+    def __init__(self, dir='.', compression=None, compression_threshold=COMPRESSION_THRESHOLD,
+                 compression_dictionary=None, **kwargs):
+        super().__init__(dir, **kwargs)
+        self.__blobs = BlobStore(dir)
+        self.__dictionary = compression_dictionary
+        self.record_factory = PropertyCodec(self.__blobs, compression, compression_threshold)
+        self.record_factory.metrics = self.metrics
+
+    @property
+    def dictionary_file(self):
+        return self.store_file + COMPRESSION_DICTIONARY_SUFFIX
+
+    @property
+    def blobs(self):
+        return self.__blobs
+
+    def open(self):
+        self.record_factory.dictionary = self.__load_dictionary()
+        self.__blobs.open()
+        super().open()
+
+    def __load_dictionary(self):
+        # dictionary is saved with the store, values compressed with it
+        # can not be read without it
+        stored = None
+        if path.exists(self.dictionary_file):
+            with open(self.dictionary_file, 'rb') as file:
+                stored = file.read()
+
+        if self.__dictionary is None or self.__dictionary == stored:
+            return stored
+
+        if stored is not None:
+            raise ValueError('{0} has been already written with different dictionary'.format(self.store_file_name))
+
+        with open(self.dictionary_file, 'wb') as file:
+            file.write(self.__dictionary)
+
+        return self.__dictionary
+
+    def close(self):
+        super().close()
+        self.__blobs.close()
+
+    def _open_values(self):
+        self.record_factory.dictionary = self.__load_dictionary()
+        self.__blobs.open(read_only=True)
+
+    def _close_values(self):
+        self.__blobs.close()
+
+    def sync(self):
+        self.__blobs.sync()
+        super().sync()
+
+    def released(self, record):
+        # property records have no in_use flag, released slots have no name
+        header = getattr(record, 'header', record)
+        return header.name_pointer == NULL_POINTER
+
+    def iter_properties(self, entity):
+        # entity is any record with first_property pointer, e.g. node or edge
+        return self.iter_chain(entity.first_property, next_property)
+
+    def iter_property_views(self, entity, view=None):
+        return self.iter_chain_views(entity.first_property, attrgetter('next_property'), view)
+
+    def _encode(self, record):
+        return self.record_factory.encode(record)
+
+    def _reserve(self, record):
+        offset, buffer = super()._reserve(record)
+
+        if self.record_factory.blob_pointer(buffer) is not None:
+            # blob is not logged, it has to be durable before the record is
+            self.__blobs.sync()
+
+        return offset, buffer
+
+    def _release(self, offset, buffer):
+        pointer = self.record_factory.blob_pointer(buffer)
+        if pointer is not None:
+            self.__blobs.free(pointer)
+
+        super()._release(offset, buffer)
 
-        record_id = super()._write_record(header)
-        self._file.write(struct.pack(serialized_value))
+    def _delete_record(self, offset):
+        buffer = self._read_at(offset, self.record_size)
+        pointer = self.record_factory.blob_pointer(buffer) if len(buffer) == self.record_size else None
+        super()._delete_record(offset)
 
-        return record_id
+        if pointer is not None:
+            # snapshots may still read the deleted value
+            self._defer(self.__blobs.free, pointer)
 
-    def __get_struct(self, struct_format):
-        struct = self.__value_structs.get(struct_format, None)
-        if not struct:
-            struct = Struct(struct_format)
-            self.__value_structs[struct_format] = struct
 
-        return struct
+def next_property(record):
+    return record.header.next_property
 
 
 class PropertyNameRecord(Record):
@@ -200,11 +483,13 @@ class PropertyNameRecord(Record):
         return iter([self.value])
 
 
-class PropertyNameStore(RecordStore):
+class PropertyNameStore(NameIndexMixin, RecordStore):
 
     record_format = PROPERTY_NAME_RECORD_FORMAT
     store_file_name = PROPERTY_NAME_STORE_FILE_NAME
     record_factory = RecordFactory(PropertyNameRecord)
+    record_fields = ('value',)
+    cache_size = 1024
 
-    def __init__(self, dir='.'):
-        super().__init__(dir)
+    def __init__(self, dir='.', **kwargs):
+        super().__init__(dir, **kwargs)
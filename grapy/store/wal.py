@@ -0,0 +1,352 @@
+from os import fsync, path, O_CREAT, O_RDWR
+from os import open as os_open, close as os_close, pwrite
+from struct import Struct
+from threading import Condition, Event, Lock, Thread
+from time import monotonic, sleep
+from zlib import crc32
+
+LOG_ENTRY_HEADER_FORMAT = '<II'
+# little-endian
+# 4 bytes - length of entry body (integer)
+# 4 bytes - crc32 of entry body (integer)
+
+LOG_TRANSACTION_FORMAT = '<QI'
+# little-endian
+# 8 bytes - transaction id (integer)
+# 4 bytes - number of writes (integer)
+
+LOG_WRITE_FORMAT = '<HQI'
+# little-endian
+# 2 bytes - length of store file name (integer)
+# 8 bytes - offset in store file (integer)
+# 4 bytes - length of written data (integer)
+# store file name and data follow the write header
+
+WAL_FILE_NAME = 'grapy.wal'
+
+
+class Transaction:
+    def __init__(self, log):
+        self.__log = log
+        self.__writes = []
+        self.__finished = False
+
+    @property
+    def writes(self):
+        return list(self.__writes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.__finished:
+            return
+
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def write(self, store, record):
+        # place is reserved at once, so returned id can be used in other records
+        if self.__finished:
+            raise ValueError('Transaction has been already finished')
+
+        offset, buffer = store._reserve(record)
+        self.__writes.append((store, offset, buffer, record))
+
+        return store.record_id_at(offset)
+
+    def commit(self):
+        self.__finish()
+        self.__log.commit(self)
+
+    def rollback(self):
+        self.__finish()
+
+        for store, offset, buffer, _ in self.__writes:
+            store._release(offset, buffer)
+
+    def __finish(self):
+        if self.__finished:
+            raise ValueError('Transaction has been already finished')
+
+        self.__finished = True
+
+
+class WriteAheadLog:
+    # shared log of all stores; it has to be opened before the stores,
+    # so recovery can replay committed writes into their files
+    #
+    # writes and deletes outside of transactions are logged as well, recovery
+    # would replay older records over them otherwise; like the writes
+    # themselves they are not waited for and become durable with checkpoint
+
+    def __init__(self, dir='.', stores=(), commit_delay=0.0, checkpoint_interval=None, checkpoint_size=None):
+        self.__dir = dir
+        self.__stores = {store.store_file_name: store for store in stores}
+        self.__commit_delay = commit_delay
+        self.__checkpoint_interval = checkpoint_interval
+        self.__checkpoint_size = checkpoint_size
+
+        self.__entry_header = Struct(LOG_ENTRY_HEADER_FORMAT)
+        self.__transaction_header = Struct(LOG_TRANSACTION_FORMAT)
+        self.__write_header = Struct(LOG_WRITE_FORMAT)
+
+        self.__file = None
+        self.__condition = Condition()
+        # entries are appended under the lock, stores log their writes under
+        # their own write locks, so they must not wait for the condition
+        self.__append_lock = Lock()
+        self.__transaction_id = 0
+        # log sequence numbers are byte positions since the log has been opened
+        self.__base = 0
+        self.__written = 0
+        self.__durable = 0
+        self.__flushing = False
+        self.__in_flight = 0
+        self.__checkpointing = False
+
+        self.__checkpointer = None
+        self.__stopped = Event()
+
+        self.fsync_count = 0
+        self.commit_count = 0
+
+    @property
+    def log_file(self):
+        return path.join(self.__dir, WAL_FILE_NAME)
+
+    @property
+    def log_size(self):
+        return self.__written - self.__base
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def open(self):
+        self.__file = open(os_open(self.log_file, O_RDWR | O_CREAT), 'rb+')
+
+        self.recover()
+
+        for store in self.__stores.values():
+            store._attach_log(self)
+
+        if self.__checkpoint_interval or self.__checkpoint_size:
+            self.__stopped.clear()
+            self.__checkpointer = Thread(target=self.__run_checkpointer, daemon=True)
+            self.__checkpointer.start()
+
+    def close(self):
+        if not self.__file:
+            return
+
+        if self.__checkpointer is not None:
+            self.__stopped.set()
+            self.__checkpointer.join()
+            self.__checkpointer = None
+
+        if all(store._file and not store._file.closed for store in self.__stores.values()):
+            self.checkpoint()
+
+        for store in self.__stores.values():
+            store._detach_log(self)
+
+        self.__file.close()
+        self.__file = None
+
+    def transaction(self):
+        return Transaction(self)
+
+    def commit(self, transaction):
+        writes = transaction.writes
+        for store, _, _, _ in writes:
+            if self.__stores.get(store.store_file_name, None) is not store:
+                raise ValueError('Store {0} is not attached to the log'.format(store.store_file_name))
+
+        with self.__condition:
+            while self.__checkpointing:
+                self.__condition.wait()
+
+            position = self.__append(writes)
+            self.__in_flight += 1
+
+            try:
+                self.__wait_durable(position)
+            except BaseException:
+                self.__in_flight -= 1
+                self.__condition.notify_all()
+                raise
+
+            self.commit_count += 1
+
+        try:
+            for store, offset, buffer, record in writes:
+                store._apply(offset, buffer, record)
+        finally:
+            with self.__condition:
+                self.__in_flight -= 1
+                self.__condition.notify_all()
+
+    def log_write(self, store, offset, buffer):
+        # called by attached store before it writes outside of transaction,
+        # entry reaches the file first, so it survives a crash of the process
+        self.__append([(store, offset, buffer, None)], flush=True)
+
+    def __append(self, writes, flush=False):
+        # returns log position after the entry
+        with self.__append_lock:
+            self.__transaction_id += 1
+            entry = self.__encode(self.__transaction_id, writes)
+
+            self.__file.write(entry)
+            if flush:
+                self.__file.flush()
+
+            self.__written += len(entry)
+            return self.__written
+
+    def checkpoint(self):
+        # store files are made durable, then the log is not needed anymore
+        with self.__condition:
+            self.__checkpointing = True
+            try:
+                while self.__in_flight:
+                    self.__condition.wait()
+
+                for store in self.__stores.values():
+                    store.sync()
+
+                # writes logged after the sync are already written to the
+                # store files, like any write they are durable with next sync
+                with self.__append_lock:
+                    self.__file.seek(0)
+                    self.__file.truncate()
+                    self.__file.flush()
+                    fsync(self.__file.fileno())
+
+                    self.__base = self.__written
+                    self.__durable = self.__written
+            finally:
+                self.__checkpointing = False
+                self.__condition.notify_all()
+
+    def recover(self):
+        # replays every complete entry, a torn entry at the end has never
+        # been acknowledged as committed and it is dropped with the log
+        self.__file.seek(0)
+        data = self.__file.read()
+
+        replayed = 0
+        descriptors = {}
+        try:
+            for writes in self.__decode(data):
+                for file_name, offset, buffer in writes:
+                    descriptor = descriptors.get(file_name, None)
+                    if descriptor is None:
+                        descriptor = os_open(path.join(self.__dir, file_name), O_RDWR | O_CREAT)
+                        descriptors[file_name] = descriptor
+
+                    pwrite(descriptor, buffer, offset)
+
+                replayed += 1
+
+            for descriptor in descriptors.values():
+                fsync(descriptor)
+        finally:
+            for descriptor in descriptors.values():
+                os_close(descriptor)
+
+        self.__file.seek(0)
+        self.__file.truncate()
+        self.__file.flush()
+        fsync(self.__file.fileno())
+
+        return replayed
+
+    def __wait_durable(self, position):
+        # group commit - the first waiting committer flushes the log for everyone
+        # who has written an entry so far, the others wait for its fsync
+        while self.__durable < position:
+            if self.__flushing:
+                self.__condition.wait()
+                continue
+
+            self.__flushing = True
+            try:
+                if self.__commit_delay:
+                    self.__condition.release()
+                    try:
+                        sleep(self.__commit_delay)
+                    finally:
+                        self.__condition.acquire()
+
+                target = self.__written
+                self.__file.flush()
+
+                self.__condition.release()
+                try:
+                    fsync(self.__file.fileno())
+                finally:
+                    self.__condition.acquire()
+
+                self.fsync_count += 1
+                self.__durable = max(self.__durable, target)
+            finally:
+                self.__flushing = False
+                self.__condition.notify_all()
+
+    def __encode(self, transaction_id, writes):
+        body = bytearray(self.__transaction_header.pack(transaction_id, len(writes)))
+
+        for store, offset, buffer, _ in writes:
+            file_name = store.store_file_name.encode('utf-8')
+            body += self.__write_header.pack(len(file_name), offset, len(buffer))
+            body += file_name
+            body += buffer
+
+        return self.__entry_header.pack(len(body), crc32(body)) + body
+
+    def __decode(self, data):
+        position = 0
+
+        while position + self.__entry_header.size <= len(data):
+            length, checksum = self.__entry_header.unpack_from(data, position)
+            start = position + self.__entry_header.size
+            end = start + length
+
+            if end > len(data) or crc32(data[start:end]) != checksum:
+                return
+
+            _, count = self.__transaction_header.unpack_from(data, start)
+            cursor = start + self.__transaction_header.size
+
+            writes = []
+            for _ in range(count):
+                name_length, offset, buffer_length = self.__write_header.unpack_from(data, cursor)
+                cursor += self.__write_header.size
+
+                file_name = data[cursor:cursor + name_length].decode('utf-8')
+                cursor += name_length
+
+                writes.append((file_name, offset, data[cursor:cursor + buffer_length]))
+                cursor += buffer_length
+
+            yield writes
+            position = end
+
+    def __run_checkpointer(self):
+        last = monotonic()
+        poll = min(value for value in [self.__checkpoint_interval, 0.1] if value)
+
+        while not self.__stopped.wait(poll):
+            due = self.__checkpoint_interval and monotonic() - last >= self.__checkpoint_interval
+            full = self.__checkpoint_size and self.log_size >= self.__checkpoint_size
+
+            if due or full:
+                self.checkpoint()
+                last = monotonic()
@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+from grapy.store.base.bitmap import Bitmap
+
+
+class BitmapTestCase(TestCase):
+    def test_add_and_discard(self):
+        bitmap = Bitmap.from_slots([0, 9, 100])
+        bitmap.discard(9)
+        bitmap.discard(1000)
+
+        self.assertListEqual([0, 100], list(bitmap), 'Slots are iterated in order')
+        self.assertIn(100, bitmap, 'Added slot is a member')
+        self.assertNotIn(9, bitmap, 'Discarded slot is not a member')
+        self.assertEqual(2, len(bitmap), 'Set slots are counted')
+
+    def test_set_operations(self):
+        first = Bitmap.from_slots([1, 2, 3, 64])
+        second = Bitmap.from_slots([2, 64, 65])
+
+        self.assertListEqual([2, 64], list(first & second), 'Intersection')
+        self.assertListEqual([1, 2, 3, 64, 65], list(first | second), 'Union')
+        self.assertListEqual([1, 3], list(first - second), 'Difference')
+
+    def test_compression_round_trip(self):
+        bitmap = Bitmap.from_slots(range(0, 100000, 7))
+
+        restored = Bitmap.decompress(bitmap.compress())
+
+        self.assertEqual(bitmap, restored, 'Bitmap is restored')
+        self.assertLess(len(bitmap.compress()), 100000 // 8, 'Bitmap is compressed')
+
+    def test_empty(self):
+        self.assertFalse(Bitmap(), 'Empty bitmap is false')
+        self.assertFalse(Bitmap(bytes(10)), 'Bitmap without bits set is false')
+        self.assertListEqual([], list(Bitmap() & Bitmap.from_slots([1])), 'Intersection with empty is empty')
@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from grapy.store.base.cache import RecordCache
+
+
+class RecordCacheTestCase(TestCase):
+    def test_counts_hits_and_misses(self):
+        cache = RecordCache(2)
+        cache.put(1, 'a')
+
+        self.assertEqual('a', cache.get(1), 'Cached record is returned')
+        self.assertIsNone(cache.get(2), 'Missing record is not returned')
+
+        self.assertEqual(1, cache.hits, 'Hit is counted')
+        self.assertEqual(1, cache.misses, 'Miss is counted')
+
+    def test_evicts_least_recently_used(self):
+        cache = RecordCache(2)
+        cache.put(1, 'a')
+        cache.put(2, 'b')
+        cache.get(1)
+        cache.put(3, 'c')
+
+        self.assertIn(1, cache, 'Recently used record is kept')
+        self.assertNotIn(2, cache, 'Least recently used record is evicted')
+        self.assertIn(3, cache, 'New record is kept')
+        self.assertEqual(1, cache.evictions, 'Eviction is counted')
+
+    def test_invalidate(self):
+        cache = RecordCache(2)
+        cache.put(1, 'a')
+        cache.invalidate(1)
+        cache.invalidate(2)
+
+        self.assertEqual(0, len(cache), 'Record is removed')
+
+    def test_stale_record_is_not_cached(self):
+        cache = RecordCache(2)
+        generation = cache.generation(1)
+        cache.invalidate(1)
+        cache.put(1, 'a', generation)
+
+        self.assertNotIn(1, cache, 'Record read before invalidation is not cached')
+
+        cache.put(1, 'b', cache.generation(1))
+        self.assertEqual('b', cache.get(1), 'Record read after invalidation is cached')
+
+    def test_capacity_has_to_be_positive(self):
+        with self.assertRaises(ValueError):
+            RecordCache(0)
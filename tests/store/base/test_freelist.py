@@ -0,0 +1,70 @@
+from os import path
+from struct import calcsize
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from grapy.store.base.freelist import FREE_LIST_HEADER_FORMAT, FreeList
+
+
+class FreeListTestCase(TestCase):
+    def test_push_pop(self):
+        with TemporaryDirectory() as temp_dir:
+            free_list = FreeList(path.join(temp_dir, 'store.free'))
+            free_list.open()
+            free_list.push(8)
+            free_list.push(16)
+
+            with self.assertRaises(ValueError):
+                free_list.push(8)
+
+            self.assertEqual(16, free_list.pop(), 'Last released offset is reused first')
+            self.assertNotIn(16, free_list, 'Popped offset is not free')
+            free_list.close()
+
+    def test_remove(self):
+        with TemporaryDirectory() as temp_dir:
+            file_name = path.join(temp_dir, 'store.free')
+
+            free_list = FreeList(file_name)
+            free_list.open()
+            for offset in [8, 16, 24]:
+                free_list.push(offset)
+
+            free_list.remove(8)
+            free_list.remove(16)
+            free_list.close()
+
+            free_list.open()
+            self.assertListEqual([24], list(free_list), 'Removed offsets are not persisted')
+            self.assertEqual(calcsize(FREE_LIST_HEADER_FORMAT) + 8, path.getsize(file_name), 'File is truncated')
+            free_list.close()
+
+    def test_changes_are_persisted(self):
+        with TemporaryDirectory() as temp_dir:
+            file_name = path.join(temp_dir, 'store.free')
+
+            free_list = FreeList(file_name)
+            free_list.open()
+            free_list.push(8)
+            free_list.pop()
+            free_list.close()
+
+            free_list.open()
+            self.assertEqual(0, len(free_list), 'Free list is empty')
+            self.assertEqual(2, free_list.changes, 'Released and reused slot is counted')
+            free_list.close()
+
+    def test_file_without_header(self):
+        with TemporaryDirectory() as temp_dir:
+            file_name = path.join(temp_dir, 'store.free')
+            with open(file_name, 'wb') as file:
+                file.write(bytes([8, 0, 0, 0, 0, 0, 0, 0]))
+
+            free_list = FreeList(file_name)
+            free_list.open()
+            free_list.push(16)
+            free_list.close()
+
+            free_list.open()
+            self.assertListEqual([8, 16], list(free_list), 'Released offsets are kept')
+            free_list.close()
@@ -0,0 +1,97 @@
+from os import listdir, path, remove
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from grapy.store.base.metrics import LatencyHistogram, collect, disable_metrics, enable_metrics
+from grapy.store.base.record import NULL_POINTER
+from grapy.store.node import NodeRecord, NodeStore
+from grapy.store.property import PropertyHeader, PropertyRecord, PropertyStore
+
+
+def node(label=0):
+    return NodeRecord(True, NULL_POINTER, NULL_POINTER, label, 0, 0, 0)
+
+
+class LatencyHistogramTestCase(TestCase):
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for _ in range(98):
+            histogram.record(0.000003)
+        histogram.record(0.001)
+        histogram.record(0.002)
+
+        self.assertEqual(100, histogram.count, 'Calls are counted')
+        self.assertEqual(0.000004, histogram.percentile(0.5), 'Median is upper bound of its bucket')
+        self.assertEqual(0.002, histogram.percentile(1.0), 'Percentile does not exceed maximum')
+        self.assertEqual(0.0, LatencyHistogram().percentile(0.5), 'Empty histogram has no latency')
+
+
+class StoreMetricsTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def tearDown(self):
+        disable_metrics(NodeStore)
+        disable_metrics(PropertyStore)
+
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def test_reads_and_writes_are_measured(self):
+        calls = []
+        metrics = enable_metrics(NodeStore, tracer=lambda *call: calls.append(call))
+        metrics.reset()
+
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            record_id = store.write(node())
+            record_ids = store.write_many([node(1), node(2)])
+            store.read(record_id)
+            store.read_many(record_ids)
+            store.delete(record_id)
+
+        self.assertEqual((3, 3, 1), (metrics.writes, metrics.reads, metrics.deletes), 'Records are counted')
+        self.assertEqual(3, metrics.write_latency.count, 'Write calls are timed')
+        self.assertEqual(2, metrics.read_latency.count, 'Read calls are timed')
+        self.assertEqual(4 * store.record_size, metrics.bytes_written, 'Written bytes are counted')
+        self.assertEqual(3 * store.record_size, metrics.bytes_read, 'Read bytes are counted')
+        self.assertEqual(metrics.lock_wait.count, metrics.lock_hold.count, 'Every held lock is measured')
+        self.assertGreaterEqual(metrics.lock_hold.count, 3, 'Write lock is measured')
+
+        self.assertListEqual(['write', 'write', 'read', 'read', 'delete'], [call[1] for call in calls],
+                             'Tracer gets every call')
+        self.assertListEqual(record_ids, calls[3][2], 'Tracer gets ids of batch')
+        self.assertIn('NodeStore', collect(), 'Metrics are exported by store class')
+        self.assertEqual(3, collect()['NodeStore']['reads'], 'Exported counters are current')
+
+    def test_disabled_metrics(self):
+        metrics = enable_metrics(NodeStore)
+        metrics.reset()
+        disable_metrics(NodeStore)
+
+        with NodeStore(dir=self.temp_dir.name) as store:
+            store.read(store.write(node()))
+
+        self.assertEqual(0, metrics.reads + metrics.writes, 'Stores created after disabling are not measured')
+
+    def test_property_struct_lookups(self):
+        metrics = enable_metrics(PropertyStore)
+        metrics.reset()
+
+        with PropertyStore(dir=self.temp_dir.name) as store:
+            record_ids = []
+            for value in [1, 2.5, 'text']:
+                record = PropertyRecord(PropertyHeader(0, NULL_POINTER, 0, 0))
+                record.value = value
+                record_ids.append(store.write(record))
+
+            store.read_many(record_ids)
+
+        self.assertEqual(4, metrics.struct_hits, 'Fixed-width values use value structs')
+        self.assertEqual(2, metrics.struct_misses, 'Strings are encoded without value struct')
@@ -0,0 +1,69 @@
+from os import listdir, path, remove
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from grapy.store.label import LabelRecord, LabelStore
+
+
+class NameIndexTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def tearDown(self):
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def test_get_or_create_interns_names(self):
+        with LabelStore(dir=self.temp_dir.name) as store:
+            person = store.get_or_create('Person')
+            city = store.get_or_create('City')
+
+            self.assertEqual(person, store.get_or_create('Person'), 'Existing name is not written again')
+            self.assertNotEqual(person, city, 'Different names have different ids')
+            self.assertEqual(city, store.lookup('City'), 'Name is found')
+            self.assertIsNone(store.lookup('Country'), 'Missing name is not found')
+            self.assertEqual(2, store.record_count, 'Only distinct names are stored')
+            self.assertEqual('Person', store.read(person).name, 'Id points to name record')
+
+    def test_index_is_persisted(self):
+        with LabelStore(dir=self.temp_dir.name) as store:
+            person = store.get_or_create('Person')
+            record_ids = store.write_many([LabelRecord('City'), LabelRecord('Country')])
+
+        with LabelStore(dir=self.temp_dir.name) as store:
+            self.assertDictEqual({'Person': person, 'City': record_ids[0], 'Country': record_ids[1]}, store.names(),
+                                 'Index is loaded at open')
+
+    def test_index_is_rebuilt_when_behind_store(self):
+        with LabelStore(dir=self.temp_dir.name) as store:
+            store.get_or_create('Person')
+            city = store.get_or_create('City')
+            index_file = store.index_file
+
+        # lose the last index entry
+        with open(index_file, 'rb+') as file:
+            file.truncate(path.getsize(index_file) // 2)
+
+        with LabelStore(dir=self.temp_dir.name) as store:
+            self.assertEqual(city, store.lookup('City'), 'Missing entry is recovered from store')
+
+    def test_deleted_name_is_forgotten(self):
+        with LabelStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            person = store.get_or_create('Person')
+            store.get_or_create('City')
+            store.delete(person)
+
+            self.assertIsNone(store.lookup('Person'), 'Deleted name is not found')
+
+            country = store.get_or_create('Country')
+            self.assertEqual(person, country, 'Released slot is reused')
+
+        with LabelStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            self.assertDictEqual({'City': 1, 'Country': 0}, store.names(), 'Index follows deletes')
@@ -0,0 +1,110 @@
+from os import listdir, path, remove, stat
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from grapy.store.base.parallel import ParallelScan, parallel_filter, parallel_map
+from grapy.store.base.record import NULL_POINTER
+from grapy.store.label import LabelStore
+from grapy.store.node import NodeRecord, NodeStore
+from grapy.store.property import PropertyHeader, PropertyRecord, PropertyStore
+
+
+# functions run in worker processes, so they are defined at module level
+def has_label(node):
+    return node.label_1 == 7
+
+
+def first_edge(node):
+    return node.first_edge
+
+
+def long_value(record):
+    return len(record.value) > 20
+
+
+def is_person(label):
+    return label.name == 'Person'
+
+
+class ParallelScanTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def tearDown(self):
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def test_ranges_are_record_aligned(self):
+        with NodeStore(dir=self.temp_dir.name) as store:
+            ranges = ParallelScan(store, workers=3).ranges(100)
+
+        self.assertEqual(0, ranges[0][0], 'First range starts at first record')
+        self.assertEqual(100, ranges[-1][1], 'Last range ends at last record')
+        self.assertTrue(all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:])), 'Ranges are contiguous')
+
+    def test_filter(self):
+        # records are not aligned to pages, so most ranges start inside a page
+        nodes = [NodeRecord(True, i, NULL_POINTER, i % 10, 0, 0, 0) for i in range(3000)]
+
+        for dense_ids in (False, True):
+            with NodeStore(dir=self.temp_dir.name, dense_ids=dense_ids) as store:
+                ids = store.write_many(nodes)
+                expected = [record_id for record_id, node in zip(ids, nodes) if has_label(node)]
+
+                self.assertListEqual(expected, list(parallel_filter(store, has_label, workers=2)),
+                                     'Ids of matching records are returned in file order')
+                self.assertListEqual(expected, list(parallel_filter(store, has_label, workers=2, views=True)),
+                                     'Views are filtered like records')
+
+            self.tearDown()
+
+    def test_map(self):
+        with NodeStore(dir=self.temp_dir.name) as store:
+            store.write_many([NodeRecord(True, i * 3, NULL_POINTER, 0, 0, 0, 0) for i in range(1000)])
+
+            with ParallelScan(store, workers=2, views=True) as scan:
+                values = scan.map(first_edge, 'Q')
+                self.assertListEqual(list(range(0, 3000, 3)), list(values), 'Every record is mapped')
+                self.assertListEqual(list(values), list(scan.map(first_edge, 'Q')), 'Workers are reused')
+
+    def test_map_empty_store(self):
+        with NodeStore(dir=self.temp_dir.name) as store:
+            self.assertEqual(0, len(parallel_map(store, first_edge, 'Q', workers=2)), 'Empty store has no results')
+
+    def test_filter_reads_blob_values(self):
+        with PropertyStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            records = []
+            for i in range(200):
+                record = PropertyRecord(PropertyHeader(0, NULL_POINTER, 0, 0))
+                record.value = 'value {0}'.format(i) * (i % 4)
+                records.append(record)
+
+            store.write_many(records)
+            expected = [i for i, record in enumerate(records) if long_value(record)]
+
+            self.assertListEqual(expected, list(parallel_filter(store, long_value, workers=2)),
+                                 'Workers read values kept in blob store')
+
+    def test_workers_do_not_write_store_files(self):
+        with LabelStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            for name in ['Person', 'Admin', 'Person 2']:
+                store.get_or_create(name)
+            store.delete(store.lookup('Admin'))
+            store.sync()
+            # opening the store in workers would create a new index
+            remove(store.index_file)
+
+            def files():
+                return {file_name: stat(path.join(self.temp_dir.name, file_name)).st_mtime_ns
+                        for file_name in listdir(self.temp_dir.name)}
+
+            before = files()
+            self.assertListEqual([0], list(parallel_filter(store, is_person, workers=2)), 'Labels are scanned')
+            self.assertDictEqual(before, files(), 'Workers only read the store file')
@@ -0,0 +1,151 @@
+from os import listdir, path, remove
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from grapy.store.base.pool import BufferPool
+from grapy.store.edge import EdgeRecord, EdgeStore
+from grapy.store.node import NodeRecord, NodeStore
+from grapy.store.property import PropertyHeader, PropertyRecord, PropertyStore
+
+
+class BufferPoolTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def tearDown(self):
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def test_store_reads_and_writes_through_pool(self):
+        pool = BufferPool(4 * 64, page_size=64)
+        records = [NodeRecord(True, i, i, i, i, i, i) for i in range(20)]
+
+        with NodeStore(dir=self.temp_dir.name, buffer_pool=pool, dense_ids=True) as store:
+            record_ids = store.write_many(records)
+            store.delete(record_ids[3])
+
+            for record_id in record_ids:
+                if record_id != 3:
+                    self.assertListEqual(list(records[record_id]), list(store.read(record_id)),
+                                         'Record is read through pool')
+
+            self.assertFalse(store.read(3).in_use, 'Deleted record is read through pool')
+            self.assertLessEqual(len(pool), 4, 'Pool does not exceed its capacity')
+
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            self.assertListEqual(list(records[19]), list(store.read(19)), 'Pages are written back to the file')
+
+    def test_records_spanning_pages(self):
+        pool = BufferPool(2 * 16, page_size=16)
+
+        with PropertyStore(dir=self.temp_dir.name, buffer_pool=pool) as store:
+            record = PropertyRecord(PropertyHeader(1, 2, 0, 0))
+            record.value = 42
+            record_id = store.write(record)
+
+            self.assertEqual(42, store.read(record_id).value, 'Record spans pages')
+
+    def test_hit_ratio_per_store(self):
+        pool = BufferPool(8 * 128, page_size=128)
+
+        with NodeStore(dir=self.temp_dir.name, buffer_pool=pool) as nodes, \
+                EdgeStore(dir=self.temp_dir.name, buffer_pool=pool) as edges:
+            node_id = nodes.write(NodeRecord(True, 1, 1, 1, 1, 1, 1))
+            edge_id = edges.write(EdgeRecord(True, 1, 2, 3, 4, 5))
+
+            node_statistics = pool.statistics(nodes)
+            hits = node_statistics.hits
+            misses = node_statistics.misses
+
+            for _ in range(3):
+                nodes.read(node_id)
+            edges.read(edge_id)
+
+            self.assertEqual(hits + 3, node_statistics.hits, 'Node pages stay in pool')
+            self.assertEqual(misses, node_statistics.misses, 'Node reads do not miss')
+            self.assertEqual(1, pool.statistics(edges).misses, 'Edge misses are counted separately')
+            self.assertGreater(pool.hit_ratio(nodes), pool.hit_ratio(edges), 'Hit ratio is kept per store')
+
+    def test_clock_skips_pinned_pages(self):
+        pool = BufferPool(2 * 64, page_size=64)
+
+        with NodeStore(dir=self.temp_dir.name, buffer_pool=pool) as store:
+            store.write_many([NodeRecord(True, i, i, i, i, i, i) for i in range(20)])
+
+            statistics = pool.statistics(store)
+
+            pinned = pool.pin(store, 0)
+            pool.read(store, 64, 1)
+            pool.read(store, 128, 1)
+            pool.read(store, 192, 1)
+
+            hits = statistics.hits
+            self.assertIs(pinned, pool.pin(store, 0), 'Pinned page is not evicted')
+            self.assertEqual(hits + 1, statistics.hits, 'Pinned page is still in pool')
+
+            last = pool.pin(store, 3)
+            with self.assertRaises(RuntimeError):
+                pool.read(store, 64, 1)
+
+            pool.unpin(pinned)
+            pool.unpin(pinned)
+            pool.read(store, 64, 1)
+
+            with self.assertRaises(ValueError):
+                pool.unpin(pinned)
+
+            pool.unpin(last)
+
+    def test_dirty_page_is_written_back_on_eviction(self):
+        pool = BufferPool(64, page_size=64)
+
+        with NodeStore(dir=self.temp_dir.name, buffer_pool=pool) as store:
+            store.write_many([NodeRecord(True, i, i, i, i, i, i) for i in range(10)])
+
+            statistics = pool.statistics(store)
+            write_backs = statistics.write_backs
+
+            frame = pool.pin(store, 0)
+            frame.data[0:1] = b'\x00'
+            pool.unpin(frame, dirty=True)
+            pool.read(store, 64, 1)
+
+            self.assertEqual(write_backs + 1, statistics.write_backs, 'Dirty page is written back')
+
+        with NodeStore(dir=self.temp_dir.name) as store:
+            self.assertFalse(store.read(0).in_use, 'Written back page is persisted')
+
+    def test_flush_writes_back_dirty_pages_of_store(self):
+        pool = BufferPool(16 * 64, page_size=64)
+
+        with NodeStore(dir=self.temp_dir.name, buffer_pool=pool) as nodes, \
+                EdgeStore(dir=self.temp_dir.name, buffer_pool=pool) as edges:
+            nodes.write_many([NodeRecord(True, i, i, i, i, i, i) for i in range(20)])
+            edges.write(EdgeRecord(True, 1, 2, 3, 4, 5))
+
+            frame = pool.pin(edges, 0)
+            pool.unpin(frame, dirty=True)
+
+            node_statistics = pool.statistics(nodes)
+            edge_statistics = pool.statistics(edges)
+            node_write_backs = node_statistics.write_backs
+
+            nodes.write(NodeRecord(True, 1, 1, 1, 1, 1, 1))
+            self.assertEqual(node_write_backs + 1, node_statistics.write_backs, 'Only written page is written back')
+            self.assertTrue(frame.dirty, 'Pages of other stores are left dirty')
+
+            write_backs = edge_statistics.write_backs
+            pool.flush()
+            self.assertEqual(write_backs + 1, edge_statistics.write_backs, 'All dirty pages are written back')
+            self.assertFalse(frame.dirty, 'Written back page is clean')
+
+    def test_capacity_has_to_hold_page(self):
+        with self.assertRaises(ValueError):
+            BufferPool(100, page_size=4096)
@@ -0,0 +1,77 @@
+from os import path, remove
+from tempfile import TemporaryDirectory
+from unittest import TestCase, skipIf
+
+from grapy.store.base.scan import numpy, record_layout
+from grapy.store.edge import EDGE_RECORD_FORMAT, EdgeRecord
+from grapy.store.node import NODE_RECORD_FORMAT, NODE_STORE_FILE_NAME, NodeRecord, NodeStore
+
+
+class RecordLayoutTestCase(TestCase):
+    def test_node_record_layout(self):
+        layout = record_layout(NODE_RECORD_FORMAT, NodeRecord._fields)
+
+        expected = [
+            ('in_use', '<?', 0),
+            ('first_edge', '<u8', 1),
+            ('first_property', '<u8', 9),
+            ('label_1', '<u4', 17),
+            ('label_2', '<u4', 21),
+            ('label_3', '<u4', 25),
+            ('label_4', '<u4', 29),
+        ]
+        self.assertListEqual(expected, layout, 'Fields are not aligned')
+
+    def test_edge_record_layout(self):
+        layout = record_layout(EDGE_RECORD_FORMAT, EdgeRecord._fields)
+
+        self.assertEqual(('edge_type', '<u4', 33), layout[-1], 'Last field follows packed fields')
+
+    def test_bytes_and_padding(self):
+        layout = record_layout('<2x40s', ['value'])
+
+        self.assertListEqual([('value', 'S40', 2)], layout, 'Padding is skipped')
+
+    def test_native_alignment_is_rejected(self):
+        with self.assertRaises(ValueError):
+            record_layout('?Q', ['a', 'b'])
+
+    def test_field_names_have_to_match(self):
+        with self.assertRaises(ValueError):
+            record_layout('<?Q', ['a'])
+
+
+@skipIf(numpy is None, 'numpy is not installed')
+class StoreScanTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def tearDown(self):
+        file_name = path.join(self.temp_dir.name, NODE_STORE_FILE_NAME)
+        if path.exists(file_name):
+            remove(file_name)
+
+    def test_scan_columns(self):
+        records = [NodeRecord(i % 2 == 0, i, i * 10, i, 0, 0, 7) for i in range(20)]
+
+        with NodeStore(dir=self.temp_dir.name) as store:
+            store.write_many(records)
+
+            scan = store.scan()
+
+            self.assertEqual(len(records), len(scan), 'Every record is scanned')
+            self.assertEqual(NodeRecord._fields, scan.fields, 'Columns are named after record fields')
+            self.assertListEqual([r.first_property for r in records], scan['first_property'].tolist(),
+                                 'Column holds field values')
+            self.assertEqual(10, int(scan['in_use'].sum()), 'Columns can be aggregated')
+
+    def test_scan_empty_store(self):
+        with NodeStore(dir=self.temp_dir.name) as store:
+            self.assertEqual(0, len(store.scan()), 'Empty store has no records')
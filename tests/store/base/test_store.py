@@ -1,8 +1,11 @@
 from os import path, remove
 from random import randint
+from sys import getswitchinterval, setswitchinterval
 from tempfile import TemporaryDirectory
+from threading import Event, Thread
 from unittest import TestCase
 
+from grapy.store.base.freelist import FREE_LIST_FILE_SUFFIX
 from grapy.store.node import NODE_STORE_FILE_NAME, NodeStore, NodeRecord
 
 
@@ -20,8 +23,9 @@ class StoreTestCase(TestCase):
 
     def tearDown(self):
         file_name = path.join(self.temp_dir.name, NODE_STORE_FILE_NAME)
-        if path.exists(file_name):
-            remove(file_name)
+        for name in [file_name, file_name + FREE_LIST_FILE_SUFFIX]:
+            if path.exists(name):
+                remove(name)
 
     def test_write_to_file(self):
         records = 10
@@ -68,3 +72,205 @@ class StoreTestCase(TestCase):
                 record = store.read(record_id)
 
                 self.assertListEqual(record_values, list(record), 'Record is properly read from file')
+
+    def test_read_memory_mapped_record(self):
+        with NodeStore(dir=self.temp_dir.name, memory_map=True) as store:
+            first = NodeRecord(True, 1, 2, 3, 4, 5, 6)
+            first_id = store.write(first)
+
+            self.assertListEqual(list(first), list(store.read(first_id)), 'Record is read from mapping')
+
+            # file grows after mapping has been created
+            second = NodeRecord(False, 6, 5, 4, 3, 2, 1)
+            second_id = store.write(second)
+
+            self.assertListEqual(list(second), list(store.read(second_id)), 'Mapping follows appended records')
+            self.assertListEqual(list(first), list(store.read(first_id)), 'Previous records are still readable')
+
+    def test_write_many(self):
+        records = [NodeRecord(True, i, i, i, i, i, i) for i in range(10)]
+
+        with NodeStore(dir=self.temp_dir.name) as store:
+            store.write(NodeRecord(False, 0, 0, 0, 0, 0, 0))
+            record_ids = store.write_many(records)
+
+            self.assertEqual(len(records), len(record_ids), 'Id is returned for every record')
+
+            for record_id, record in zip(record_ids, records):
+                self.assertListEqual(list(record), list(store.read(record_id)), 'Record is properly read from file')
+
+        file_name = path.join(self.temp_dir.name, NODE_STORE_FILE_NAME)
+        self.assertEqual(store.record_size * (len(records) + 1), path.getsize(file_name), 'File has expected size')
+
+    def test_read_many(self):
+        with NodeStore(dir=self.temp_dir.name) as store:
+            records = [NodeRecord(i % 2, i, i, i, i, i, i) for i in range(100)]
+            record_ids = store.write_many(records)
+
+        # scattered, unordered and repeated ids
+        order = [57, 3, 99, 3, 58, 0, 42, 99, 1]
+
+        for memory_map in [False, True]:
+            with NodeStore(dir=self.temp_dir.name, memory_map=memory_map) as store:
+                store.coalesce_gap = store.record_size * 4
+
+                actual = store.read_many([record_ids[i] for i in order])
+
+                expected = [list(records[i]) for i in order]
+                self.assertListEqual(expected, [list(record) for record in actual], 'Records are returned in order')
+
+    def test_read_cached_record(self):
+        with NodeStore(dir=self.temp_dir.name, cache_size=2) as store:
+            record = NodeRecord(True, 1, 2, 3, 4, 5, 6)
+            record_id = store.write(record)
+
+            first = store.read(record_id)
+            second = store.read(record_id)
+
+            self.assertIs(first, second, 'Record is served from cache')
+            self.assertEqual(1, store.cache.misses, 'First read misses cache')
+            self.assertEqual(1, store.cache.hits, 'Second read hits cache')
+
+            store.read_many([record_id])
+            self.assertEqual(2, store.cache.hits, 'Batched read hits cache')
+
+    def test_cache_disabled_by_default(self):
+        with NodeStore(dir=self.temp_dir.name) as store:
+            self.assertIsNone(store.cache, 'Node store has no cache by default')
+
+    def test_delete_record(self):
+        with NodeStore(dir=self.temp_dir.name) as store:
+            record_ids = store.write_many([NodeRecord(True, i, i, i, i, i, i) for i in range(3)])
+
+            store.delete(record_ids[1])
+
+            self.assertFalse(store.read(record_ids[1]).in_use, 'Deleted record is not in use')
+
+            with self.assertRaises(ValueError):
+                store.delete(record_ids[1])
+
+    def test_deleted_slots_are_reused(self):
+        with NodeStore(dir=self.temp_dir.name) as store:
+            record_ids = store.write_many([NodeRecord(True, i, i, i, i, i, i) for i in range(5)])
+
+            store.delete(record_ids[1])
+            store.delete(record_ids[3])
+
+        # free list survives reopening the store
+        with NodeStore(dir=self.temp_dir.name) as store:
+            self.assertEqual(2, len(store.free_list), 'Free slots are restored')
+
+            record = NodeRecord(True, 9, 9, 9, 9, 9, 9)
+            reused_ids = store.write_many([record, record, record])
+            reused_ids.append(store.write(record))
+
+            self.assertSetEqual({record_ids[1], record_ids[3]}, set(reused_ids[:2]), 'Free slots are filled first')
+            self.assertListEqual(list(record), list(store.read(record_ids[3])), 'Reused slot holds new record')
+            self.assertEqual(0, len(store.free_list), 'Free list is drained')
+
+        file_name = path.join(self.temp_dir.name, NODE_STORE_FILE_NAME)
+        self.assertEqual(store.record_size * 7, path.getsize(file_name), 'File grows only by missing slots')
+
+    def test_dense_record_ids(self):
+        records = [NodeRecord(True, i, i, i, i, i, i) for i in range(5)]
+
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            first_id = store.write(records[0])
+            record_ids = [first_id] + store.write_many(records[1:])
+
+            self.assertListEqual(list(range(5)), record_ids, 'Ids are slot numbers')
+            self.assertEqual(3 * store.record_size, store.record_offset(3), 'Offset is computed from id')
+            self.assertEqual(3, store.record_id_at(3 * store.record_size), 'Id is computed from offset')
+
+            self.assertListEqual(list(records[2]), list(store.read(2)), 'Record is read by slot number')
+            self.assertListEqual([list(records[4]), list(records[0])], [list(r) for r in store.read_many([4, 0])],
+                                 'Records are read by slot numbers')
+
+            store.delete(1)
+            self.assertEqual(1, store.write(records[1]), 'Reused slot is returned as slot number')
+
+        with NodeStore(dir=self.temp_dir.name) as store:
+            self.assertListEqual(list(records[2]), list(store.read(2 * store.record_size)), 'File format is unchanged')
+
+    def test_iter_views(self):
+        records = [NodeRecord(True, i, i + 1, i, i, i, i) for i in range(10)]
+
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            store.write_many(records)
+
+            views = list(store.iter_views(start=2))
+            first_edges = [view.first_edge for _, view in store.iter_views(start=2)]
+
+        self.assertListEqual(list(range(2, 10)), [record_id for record_id, _ in views], 'Records are scanned')
+        self.assertEqual(1, len({id(view) for _, view in views}), 'Single view is reused')
+        self.assertListEqual(list(range(2, 10)), first_edges, 'Fields are decoded')
+
+    def test_view(self):
+        record = NodeRecord(True, 1, 2, 3, 4, 5, 6)
+
+        for memory_map in [False, True]:
+            with NodeStore(dir=self.temp_dir.name, memory_map=memory_map) as store:
+                record_id = store.write(record)
+
+                view = store.view(record_id)
+                self.assertListEqual(list(record), list(view), 'View decodes record')
+                self.assertIs(view, store.view(record_id, view), 'View is reused')
+
+    def test_concurrent_reads_and_writes(self):
+        errors = []
+
+        with NodeStore(dir=self.temp_dir.name) as store:
+            record_ids = store.write_many([NodeRecord(True, i, i, i, i, i, i) for i in range(100)])
+
+            def reader():
+                for _ in range(20):
+                    for index, record in zip(range(100), store.read_many(record_ids)):
+                        if record.first_edge != index:
+                            errors.append(record)
+
+            def writer():
+                for i in range(200):
+                    store.write(NodeRecord(True, i, i, i, i, i, i))
+
+            threads = [Thread(target=reader) for _ in range(4)] + [Thread(target=writer)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertListEqual([], errors, 'Readers see consistent records')
+            self.assertEqual(300, store.record_count, 'All appends are stored')
+
+    def test_cache_is_not_stale_after_concurrent_reads(self):
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True, cache_size=10) as store:
+            record_id = store.write(NodeRecord(True, 0, 0, 0, 0, 0, 0))
+            stopped = Event()
+
+            def reader():
+                while not stopped.is_set():
+                    store.read(record_id)
+
+            # threads are switched often, so reads interleave with writes
+            interval = getswitchinterval()
+            setswitchinterval(0.000001)
+
+            threads = [Thread(target=reader) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+
+            stale = []
+            try:
+                for i in range(1, 2000):
+                    store.delete(record_id)
+                    store.write(NodeRecord(True, i, i, i, i, i, i))
+
+                    record = store.read(record_id)
+                    if record.first_edge != i:
+                        stale.append((i, record))
+            finally:
+                stopped.set()
+                for thread in threads:
+                    thread.join()
+                setswitchinterval(interval)
+
+            self.assertListEqual([], stale, 'Written record is read after write returns')
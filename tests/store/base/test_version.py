@@ -0,0 +1,170 @@
+from operator import attrgetter
+from os import listdir, path, remove
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
+from unittest import TestCase
+
+from grapy.store.base.record import NULL_POINTER
+from grapy.store.base.version import VersionStore
+from grapy.store.edge import EdgeRecord, EdgeStore
+from grapy.store.node import NodeRecord, NodeStore
+from grapy.store.property import PropertyHeader, PropertyRecord, PropertyStore
+
+
+def node(first_edge=NULL_POINTER, label=0):
+    return NodeRecord(True, first_edge, NULL_POINTER, label, 0, 0, 0)
+
+
+def update(store, record_id, record):
+    # released slot is taken again by the next write
+    store.delete(record_id)
+    assert store.write(record) == record_id
+
+
+class VersionStoreTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def tearDown(self):
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def test_snapshot_does_not_see_later_writes(self):
+        versions = VersionStore()
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True, versions=versions) as store:
+            record_ids = store.write_many([node(label=i) for i in range(3)])
+
+            with versions.snapshot() as snapshot:
+                update(store, record_ids[1], node(label=10))
+                store.delete(record_ids[2])
+                store.write(node(label=20))
+
+                self.assertEqual(1, snapshot.read(store, record_ids[1]).label_1, 'Replaced record is read')
+                self.assertTrue(snapshot.read(store, record_ids[2]).in_use, 'Deleted record is read')
+                self.assertListEqual([0, 1, 2], [record.label_1 for _, record in snapshot.iter_records(store)],
+                                     'Scan sees records at snapshot')
+                self.assertEqual(3, snapshot.record_count(store), 'Appended record is not counted')
+
+                with self.assertRaises(ValueError):
+                    snapshot.read(store, 3)
+
+                self.assertListEqual([0, 10, 20], [record.label_1 for record in store.read_many(record_ids)],
+                                     'Store reads see latest records')
+
+            with versions.snapshot() as snapshot:
+                self.assertEqual(20, snapshot.read(store, record_ids[2]).label_1, 'New snapshot sees all commits')
+
+        self.assertEqual(0, versions.statistics.versions, 'Versions are collected')
+
+    def test_versions_are_kept_only_for_open_snapshots(self):
+        versions = VersionStore()
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True, versions=versions) as store:
+            record_id = store.write(node(label=1))
+            update(store, record_id, node(label=2))
+            self.assertEqual(0, versions.statistics.versions, 'Nothing is saved without snapshots')
+
+            first = versions.snapshot()
+            update(store, record_id, node(label=3))
+            second = versions.snapshot()
+            update(store, record_id, node(label=4))
+
+            self.assertEqual(4, versions.statistics.versions, 'Replaced records are saved')
+            self.assertEqual(2, first.read(store, record_id).label_1, 'First snapshot sees its version')
+            self.assertEqual(3, second.read(store, record_id).label_1, 'Second snapshot sees its version')
+
+            first.close()
+            self.assertEqual(2, versions.statistics.versions, 'Versions of closed snapshot are collected')
+            self.assertEqual(3, second.read(store, record_id).label_1, 'Open snapshot is not affected')
+
+            second.close()
+            self.assertEqual(0, versions.statistics.versions, 'All versions are collected')
+
+            with self.assertRaises(ValueError):
+                second.read(store, record_id)
+
+    def test_traversal_over_stores(self):
+        versions = VersionStore()
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True, versions=versions) as nodes, \
+                EdgeStore(dir=self.temp_dir.name, dense_ids=True, versions=versions) as edges:
+            node_id = nodes.write(node())
+            first_edge = NULL_POINTER
+            for i in range(3):
+                first_edge = edges.write(EdgeRecord(True, node_id, i, first_edge, NULL_POINTER, 0))
+            update(nodes, node_id, node(first_edge))
+
+            with versions.snapshot() as snapshot:
+                # edge is prepended to the chain by another writer
+                first_edge = edges.write(EdgeRecord(True, node_id, 3, first_edge, NULL_POINTER, 0))
+                update(nodes, node_id, node(first_edge))
+
+                chain = snapshot.iter_chain(edges, snapshot.read(nodes, node_id).first_edge,
+                                            attrgetter('next_edge'))
+                self.assertListEqual([2, 1, 0], [edge.second_node for _, edge in chain], 'Chain is stable')
+
+                latest = edges.iter_edges(nodes.read(node_id))
+                self.assertListEqual([3, 2, 1, 0], [edge.second_node for _, edge in latest],
+                                     'Latest chain has new edge')
+
+    def test_concurrent_writer_is_not_blocked(self):
+        versions = VersionStore()
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True, versions=versions) as store:
+            record_ids = store.write_many([node(label=i) for i in range(100)])
+            stopped = Event()
+            writes = []
+
+            def write():
+                label = 1000
+                while not stopped.is_set():
+                    update(store, record_ids[label % 100], node(label=label))
+                    writes.append(label)
+                    label += 1
+
+            with versions.snapshot() as snapshot:
+                writer = Thread(target=write)
+                writer.start()
+                try:
+                    for _ in range(20):
+                        labels = [record.label_1 for _, record in snapshot.iter_records(store)]
+                        self.assertListEqual(list(range(100)), labels, 'Scan is not torn by writer')
+                finally:
+                    stopped.set()
+                    writer.join()
+
+            self.assertTrue(writes, 'Writer has been running during scans')
+            self.assertEqual(0, versions.statistics.versions, 'Versions are collected')
+
+    def test_blob_is_released_after_snapshot(self):
+        versions = VersionStore()
+        with PropertyStore(dir=self.temp_dir.name, dense_ids=True, versions=versions) as store:
+            record = PropertyRecord(PropertyHeader(0, NULL_POINTER, 0, 0))
+            record.value = 'long value ' * 10
+            record_id = store.write(record)
+
+            with versions.snapshot() as snapshot:
+                store.delete(record_id)
+                self.assertEqual(1, versions.statistics.deferred, 'Blob is not released while it can be read')
+                self.assertEqual('long value ' * 10, snapshot.read(store, record_id).value, 'Blob value is read')
+
+            self.assertEqual(0, versions.statistics.deferred, 'Blob is released with the snapshot')
+
+    def test_snapshot_chain_ends_at_deleted_property(self):
+        versions = VersionStore()
+        with PropertyStore(dir=self.temp_dir.name, dense_ids=True, versions=versions) as store:
+            next_property = NULL_POINTER
+            for name_pointer in [2, 1]:
+                record = PropertyRecord(PropertyHeader(name_pointer, next_property, 0, 0))
+                record.value = name_pointer
+                next_property = store.write(record)
+
+            store.delete(0)
+
+            with versions.snapshot() as snapshot:
+                chain = snapshot.iter_chain(store, next_property, attrgetter('header.next_property'))
+                self.assertListEqual([1], [record.value for _, record in chain], 'Deleted property is not read')
@@ -0,0 +1,34 @@
+from struct import pack
+from unittest import TestCase
+
+from grapy.store.base.view import RecordView, field_layout, view_type
+
+
+class RecordViewTestCase(TestCase):
+    def test_field_layout(self):
+        layout = field_layout('<?Q2I8s', ['flag', 'pointer', 'first', 'second', 'name'])
+
+        self.assertListEqual([('flag', 0), ('pointer', 1), ('first', 9), ('second', 13), ('name', 17)],
+                             [(name, offset) for name, _, offset in layout], 'Fields have expected offsets')
+
+    def test_field_layout_requires_names_for_all_fields(self):
+        with self.assertRaises(ValueError):
+            field_layout('<QQ', ['pointer'])
+
+    def test_view_decodes_fields_at_offset(self):
+        view_class = view_type('<?Q', ['in_use', 'next'])
+        buffer = pack('<?Q', False, 1) + pack('<?Q', True, 2)
+
+        view = view_class(buffer)
+        self.assertEqual(1, view.next, 'First record is decoded')
+
+        view.move(buffer, 9)
+        self.assertTrue(view.in_use, 'Moved view decodes second record')
+        self.assertListEqual([True, 2], list(view), 'View is iterable like record')
+
+    def test_view_types_are_shared(self):
+        view_class = view_type('<?Q', ['in_use', 'next'])
+
+        self.assertIs(view_class, view_type('<?Q', ('in_use', 'next')), 'View type is created once')
+        self.assertTrue(issubclass(view_class, RecordView), 'View type extends RecordView')
+        self.assertFalse(hasattr(view_class(b''), '__dict__'), 'View has no instance dictionary')
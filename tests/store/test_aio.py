@@ -0,0 +1,161 @@
+import asyncio
+from os import listdir, path, remove
+from tempfile import TemporaryDirectory
+from threading import Event
+from unittest import TestCase
+
+from grapy.store.aio import AsyncPropertyStore, AsyncRecordStore
+from grapy.store.node import NodeRecord, NodeStore
+from grapy.store.property import PropertyHeader, PropertyRecord, PropertyStore
+
+
+class AsyncRecordStoreTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def test_write_and_read(self):
+        async def scenario():
+            async with AsyncRecordStore(NodeStore(dir=self.temp_dir.name)) as store:
+                record = NodeRecord(True, 1, 2, 3, 4, 5, 6)
+                record_id = await store.write(record)
+                record_ids = await store.write_many([record, record])
+
+                read = await store.read(record_id)
+                many = await store.read_many(record_ids + [record_id])
+
+                return record, read, many
+
+        record, read, many = self.loop.run_until_complete(scenario())
+
+        self.assertListEqual(list(record), list(read), 'Record is read back')
+        self.assertListEqual([list(record)] * 3, [list(r) for r in many], 'Records are read back in order')
+
+    def test_concurrent_reads_are_coalesced(self):
+        with NodeStore(dir=self.temp_dir.name) as store:
+            record_id = store.write(NodeRecord(True, 1, 2, 3, 4, 5, 6))
+
+        node_store = NodeStore(dir=self.temp_dir.name)
+        read = node_store.read
+        release = Event()
+        calls = []
+
+        def slow_read(record_id):
+            calls.append(record_id)
+            release.wait(5)
+            return read(record_id)
+
+        node_store.read = slow_read
+
+        async def scenario():
+            async with AsyncRecordStore(node_store) as store:
+                pending = [asyncio.ensure_future(store.read(record_id)) for _ in range(10)]
+                await asyncio.sleep(0.05)
+                release.set()
+
+                return await asyncio.gather(*pending)
+
+        records = self.loop.run_until_complete(scenario())
+
+        self.assertEqual(1, len(calls), 'Store is read once')
+        self.assertEqual(10, len(records), 'Every caller gets the record')
+        self.assertTrue(all(record is records[0] for record in records), 'Callers share the result')
+
+    def test_read_after_write_is_not_joined(self):
+        with NodeStore(dir=self.temp_dir.name) as store:
+            record_id = store.write(NodeRecord(True, 1, 2, 3, 4, 5, 6))
+
+        node_store = NodeStore(dir=self.temp_dir.name)
+        read = node_store.read
+        release = Event()
+        calls = []
+
+        def slow_read(record_id):
+            # record is read before the write, but returned after it
+            record = read(record_id)
+            if not calls:
+                release.wait(5)
+            calls.append(record_id)
+            return record
+
+        node_store.read = slow_read
+
+        async def scenario():
+            async with AsyncRecordStore(node_store) as store:
+                pending = asyncio.ensure_future(store.read(record_id))
+                await asyncio.sleep(0.05)
+
+                await store.delete(record_id)
+                written = await store.write(NodeRecord(True, 7, 8, 9, 10, 11, 12))
+                assert written == record_id
+
+                latest = asyncio.ensure_future(store.read(record_id))
+                await asyncio.sleep(0.05)
+                release.set()
+
+                return await pending, await latest
+
+        previous, latest = self.loop.run_until_complete(scenario())
+
+        self.assertEqual(1, previous.first_edge, 'Read in flight returns previous record')
+        self.assertEqual(7, latest.first_edge, 'Read after write returns new record')
+        self.assertEqual(2, len(calls), 'Store is read again after write')
+
+    def test_write_backpressure(self):
+        node_store = NodeStore(dir=self.temp_dir.name)
+        write = node_store.write
+        release = Event()
+        calls = []
+
+        def slow_write(record):
+            calls.append(record)
+            release.wait(5)
+            return write(record)
+
+        node_store.write = slow_write
+
+        async def scenario():
+            async with AsyncRecordStore(node_store, max_workers=8, max_pending_writes=2) as store:
+                record = NodeRecord(True, 1, 2, 3, 4, 5, 6)
+                pending = [asyncio.ensure_future(store.write(record)) for _ in range(5)]
+                await asyncio.sleep(0.05)
+                started = len(calls)
+                release.set()
+
+                await asyncio.gather(*pending)
+                return started
+
+        started = self.loop.run_until_complete(scenario())
+
+        self.assertEqual(2, started, 'Only allowed number of writes is dispatched')
+        self.assertEqual(5, len(calls), 'Waiting writes are dispatched later')
+
+    def test_property_store(self):
+        async def scenario():
+            async with AsyncPropertyStore(PropertyStore(dir=self.temp_dir.name)) as store:
+                record = PropertyRecord(PropertyHeader(0, 0, 0, 0))
+                record.value = 'async value'
+                record_id = await store.write(record)
+
+                return (await store.read(record_id)).value
+
+        self.assertEqual('async value', self.loop.run_until_complete(scenario()), 'Property is read back')
+
+    def test_wrapped_store_type_is_checked(self):
+        with self.assertRaises(TypeError):
+            AsyncPropertyStore(NodeStore(dir=self.temp_dir.name))
@@ -0,0 +1,50 @@
+from os import listdir, path, remove
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from grapy.store.blob import BlobStore, MIN_BLOB_CAPACITY
+
+
+class BlobStoreTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def tearDown(self):
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def test_write_read(self):
+        with BlobStore(dir=self.temp_dir.name) as store:
+            first = store.write(b'first')
+            second = store.write(b'x' * 1000)
+
+            self.assertEqual(b'first', store.read(first), 'Blob is read')
+            self.assertEqual(b'x' * 1000, store.read(second, 1000), 'Blob is read with known length')
+            self.assertEqual(MIN_BLOB_CAPACITY, second - first, 'Blobs are aligned to capacity')
+            self.assertEqual(MIN_BLOB_CAPACITY + 1024, path.getsize(store.store_file), 'File covers capacity')
+
+    def test_capacity_classes(self):
+        with BlobStore(dir=self.temp_dir.name) as store:
+            self.assertEqual(MIN_BLOB_CAPACITY, store.capacity_for(0), 'Smallest class is used')
+            self.assertEqual(128, store.capacity_for(MIN_BLOB_CAPACITY - store.header_size + 1), 'Class is doubled')
+
+    def test_released_blob_is_reused(self):
+        with BlobStore(dir=self.temp_dir.name) as store:
+            first = store.write(b'a' * 100)
+            store.write(b'b' * 100)
+            store.free(first)
+
+            with self.assertRaises(ValueError):
+                store.free(first)
+
+        with BlobStore(dir=self.temp_dir.name) as store:
+            self.assertEqual(first, store.write(b'c' * 90), 'Released blob of the same class is reused')
+            self.assertNotEqual(first, store.write(b'd' * 90), 'Reused blob is allocated again')
+            self.assertEqual(b'c' * 90, store.read(first), 'Reused blob is overwritten')
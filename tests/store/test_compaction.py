@@ -0,0 +1,343 @@
+from os import listdir, path, remove
+from tempfile import TemporaryDirectory
+from time import monotonic
+from unittest import TestCase
+
+from grapy.store.base.record import NULL_POINTER
+from grapy.store.base.version import VersionStore
+from grapy.store.compaction import Compactor, IoThrottle
+from grapy.store.edge import EdgeRecord, EdgeStore
+from grapy.store.index import HashValueIndex
+from grapy.store.node import NodeRecord, NodeStore
+from grapy.store.property import PropertyHeader, PropertyRecord, PropertyStore
+
+
+class ReplacedListener:
+    def __init__(self):
+        self.replaced = 0
+
+    def record_written(self, offset, record):
+        pass
+
+    def record_deleted(self, offset, record):
+        pass
+
+    def store_replaced(self):
+        self.replaced += 1
+
+
+class CompactorTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def tearDown(self):
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def __open(self, dense_ids=True, versions=None):
+        return [NodeStore(dir=self.temp_dir.name, dense_ids=dense_ids, versions=versions),
+                EdgeStore(dir=self.temp_dir.name, dense_ids=dense_ids, versions=versions),
+                PropertyStore(dir=self.temp_dir.name, dense_ids=dense_ids, versions=versions)]
+
+    @staticmethod
+    def __property_chain(properties, values):
+        next_property = NULL_POINTER
+        for value in reversed(values):
+            record = PropertyRecord(PropertyHeader(0, next_property, 0, 0))
+            record.value = value
+            next_property = properties.write(record)
+
+        return next_property
+
+    def __build(self, nodes, edges, properties, count=6):
+        # edges are written round-robin, so chains of nodes interleave in the file
+        node_ids = [nodes.write(NodeRecord(True, NULL_POINTER, NULL_POINTER, 0, 0, 0, 0)) for _ in range(count)]
+        last_edges = [NULL_POINTER] * count
+
+        for i in range(4):
+            for slot, node_id in enumerate(node_ids):
+                first_property = self.__property_chain(properties, [i, 'edge {0} of {1} '.format(i, slot) * 3])
+                last_edges[slot] = edges.write(EdgeRecord(True, node_id, node_ids[(slot + 1) % count],
+                                                          last_edges[slot], first_property, 0))
+
+        for slot, node_id in enumerate(node_ids):
+            first_property = self.__property_chain(properties, ['node {0}'.format(slot), slot * 1.5])
+            self.__update_node(nodes, node_id, last_edges[slot], first_property)
+
+        return node_ids
+
+    @staticmethod
+    def __update_node(nodes, node_id, first_edge, first_property):
+        # slot is released and taken again by the updated record
+        nodes.delete(node_id)
+        assert nodes.write(NodeRecord(True, first_edge, first_property, 0, 0, 0, 0)) == node_id
+
+    @staticmethod
+    def __delete_properties(properties, entity):
+        for property_id in [property_id for property_id, _ in properties.iter_properties(entity)]:
+            properties.delete(property_id)
+
+    def __delete_node(self, nodes, edges, properties, node_id):
+        node = nodes.read(node_id)
+
+        for edge_id, edge in list(edges.iter_edges(node)):
+            self.__delete_properties(properties, edge)
+            edges.delete(edge_id)
+
+        self.__delete_properties(properties, node)
+        nodes.delete(node_id)
+
+    @staticmethod
+    def __graph(nodes, edges, properties, node_ids):
+        graph = {}
+        for node_id in node_ids:
+            node = nodes.read(node_id)
+            if not node.in_use:
+                continue
+
+            graph[node_id] = (
+                [record.value for _, record in properties.iter_properties(node)],
+                [(edge.second_node, [record.value for _, record in properties.iter_properties(edge)])
+                 for _, edge in edges.iter_edges(node)]
+            )
+
+        return graph
+
+    def test_compaction_keeps_live_graph(self):
+        for dense_ids in (False, True):
+            nodes, edges, properties = stores = self.__open(dense_ids)
+            for store in stores:
+                store.open()
+
+            try:
+                node_ids = self.__build(nodes, edges, properties)
+                self.__delete_node(nodes, edges, properties, node_ids[2])
+                self.__delete_node(nodes, edges, properties, node_ids[4])
+
+                expected = self.__graph(nodes, edges, properties, node_ids)
+                edges_size = edges.size
+                blobs_size = path.getsize(properties.blobs.store_file)
+
+                listener = ReplacedListener()
+                edges.add_listener(listener)
+
+                summary = Compactor(nodes, edges, properties).run()
+
+                self.assertEqual(16, summary.edges, 'Deleted edges are dropped')
+                self.assertEqual(16 * 2 + 4 * 2, summary.properties, 'Deleted properties are dropped')
+                self.assertEqual(16, summary.blobs, 'Released blobs are dropped')
+                self.assertEqual(0, summary.unreachable, 'Every record is reachable')
+                self.assertGreater(summary.reclaimed, 0, 'Space is reclaimed')
+                self.assertEqual(16 * edges.record_size, edges.size, 'Edge store holds live edges only')
+                self.assertLess(edges.size, edges_size, 'Edge store shrinks')
+                self.assertLess(path.getsize(properties.blobs.store_file), blobs_size, 'Blob store shrinks')
+                self.assertEqual(1, listener.replaced, 'Listeners are notified')
+
+                self.assertDictEqual(expected, self.__graph(nodes, edges, properties, node_ids),
+                                     'Compacted stores hold the same graph')
+                self.assertFalse(nodes.read(node_ids[2]).in_use, 'Deleted node stays deleted')
+
+                chain = [edges.record_offset(edge_id) for edge_id, _ in edges.iter_edges(nodes.read(node_ids[1]))]
+                self.assertListEqual(list(range(chain[0], chain[0] + 4 * edges.record_size, edges.record_size)),
+                                     chain, 'Edge chain is contiguous')
+
+                self.assertEqual(2, len(nodes.free_list), 'Node slots are still released')
+                self.assertEqual(0, len(edges.free_list), 'Compacted store has no released slots')
+                self.assertFalse([name for name in listdir(self.temp_dir.name) if name.endswith('.compact')],
+                                 'Compacted files have been moved')
+            finally:
+                for store in stores:
+                    store.close()
+
+            self.tearDown()
+
+    def test_compacted_stores_can_be_reopened_and_written(self):
+        nodes, edges, properties = stores = self.__open()
+        for store in stores:
+            store.open()
+
+        node_ids = self.__build(nodes, edges, properties)
+        self.__delete_node(nodes, edges, properties, node_ids[0])
+        compactor = Compactor(nodes, edges, properties)
+        compactor.start()
+        self.assertIsNotNone(compactor.join(), 'Background compaction returns summary')
+
+        edge_id = edges.write(EdgeRecord(True, node_ids[1], node_ids[1], NULL_POINTER, NULL_POINTER, 0))
+        self.assertEqual(20, edge_id, 'Edge is appended after compacted records')
+
+        expected = self.__graph(nodes, edges, properties, node_ids)
+        for store in stores:
+            store.close()
+
+        nodes, edges, properties = stores = self.__open()
+        for store in stores:
+            store.open()
+        try:
+            self.assertDictEqual(expected, self.__graph(nodes, edges, properties, node_ids),
+                                 'Compacted stores are persisted')
+        finally:
+            for store in stores:
+                store.close()
+
+    def test_indexes_are_rebuilt(self):
+        nodes, edges, properties = stores = self.__open()
+        for store in stores:
+            store.open()
+
+        try:
+            node_ids = self.__build(nodes, edges, properties)
+
+            with HashValueIndex(properties, 0) as index:
+                self.__delete_node(nodes, edges, properties, node_ids[0])
+                Compactor(nodes, edges, properties).run()
+
+                record_ids = index.find('node 3')
+                self.assertEqual(1, len(record_ids), 'Compacted property is indexed once')
+                self.assertEqual('node 3', properties.read(record_ids[0]).value, 'Index points to new offset')
+                self.assertListEqual([], index.find('node 0'), 'Deleted property is not indexed')
+        finally:
+            for store in stores:
+                store.close()
+
+    def test_modified_stores_are_compacted_again(self):
+        nodes, edges, properties = stores = self.__open()
+        for store in stores:
+            store.open()
+
+        try:
+            node_ids = self.__build(nodes, edges, properties)
+            compactor = Compactor(nodes, edges, properties, max_attempts=2)
+
+            # write lands during the rewrite of the first attempt
+            original = nodes.iter_views
+            calls = []
+
+            def iter_views(*args):
+                calls.append(1)
+                if len(calls) == 1:
+                    edges.write(EdgeRecord(False, 0, 0, NULL_POINTER, NULL_POINTER, 0))
+                return original(*args)
+
+            nodes.iter_views = iter_views
+            summary = compactor.run()
+
+            self.assertEqual(2, len(calls), 'Stores are rewritten again')
+            self.assertEqual(24, summary.edges, 'Edge written meanwhile is dropped as it is not in use')
+
+            calls.clear()
+            compactor.max_attempts = 1
+            with self.assertRaises(RuntimeError):
+                compactor.run()
+            self.assertEqual(25 * edges.record_size, edges.size, 'Stores are not replaced')
+            self.assertFalse([name for name in listdir(self.temp_dir.name) if name.endswith('.compact')],
+                             'Compacted files are removed')
+        finally:
+            for store in stores:
+                store.close()
+
+    def test_unreachable_records_are_kept(self):
+        nodes, edges, properties = stores = self.__open()
+        for store in stores:
+            store.open()
+
+        try:
+            node_ids = self.__build(nodes, edges, properties)
+
+            # edge is written, but never linked to its node
+            first_property = self.__property_chain(properties, ['unlinked', 'unlinked edge ' * 3])
+            edges.write(EdgeRecord(True, node_ids[0], node_ids[5], NULL_POINTER, first_property, 7))
+
+            # chain of node 1 ends at its deleted edge, edges after it can not be reached
+            chain = [edge_id for edge_id, _ in edges.iter_edges(nodes.read(node_ids[1]))]
+            edges.delete(chain[1])
+
+            # property written, but never linked
+            self.__property_chain(properties, [42])
+
+            expected = self.__graph(nodes, edges, properties, node_ids)
+            summary = Compactor(nodes, edges, properties).run()
+
+            self.assertEqual(24, summary.edges, 'Only deleted edge is dropped')
+            # three edges with their properties, properties of the deleted edge and the unlinked property
+            self.assertEqual(3 + 3 * 2 + 2 + 1, summary.unreachable, 'Unreachable records are reported')
+            self.assertDictEqual(expected, self.__graph(nodes, edges, properties, node_ids),
+                                 'Reachable graph is kept')
+
+            kept = {edge.edge_type: (edge_id, edge) for edge_id, edge in edges.iter_records() if edge.edge_type}
+            self.assertListEqual(['unlinked', 'unlinked edge ' * 3],
+                                 [record.value for _, record in properties.iter_properties(kept[7][1])],
+                                 'Unlinked edge keeps its properties')
+
+            reachable = [edge_id for edge_id, _ in edges.iter_edges(nodes.read(node_ids[1]))]
+            tail = {edge_id: edge for edge_id, edge in edges.iter_records()
+                    if edge.first_node == node_ids[1] and edge_id not in reachable}
+            self.assertEqual(2, len(tail), 'Edges after deleted edge are kept')
+            self.assertTrue(any(edge.next_edge in tail for edge in tail.values()), 'Kept edges stay linked')
+            self.assertIn(42, [record.value for _, record in properties.iter_records()], 'Unlinked property is kept')
+        finally:
+            for store in stores:
+                store.close()
+
+    def test_deleted_properties_are_dropped(self):
+        nodes, edges, properties = stores = self.__open()
+        for store in stores:
+            store.open()
+
+        try:
+            first_property = self.__property_chain(properties, ['kept', 'deleted'])
+            node_id = nodes.write(NodeRecord(True, NULL_POINTER, first_property, 0, 0, 0, 0))
+            properties.delete(properties.read(first_property).header.next_property)
+
+            summary = Compactor(nodes, edges, properties).run()
+
+            self.assertEqual((1, 0), (summary.properties, summary.unreachable), 'Deleted property is not copied')
+            chain = properties.iter_properties(nodes.read(node_id))
+            self.assertListEqual(['kept'], [record.value for _, record in chain],
+                                 'Chain ends at the live property')
+            self.assertEqual(properties.record_size, properties.size, 'Released slot is reclaimed')
+        finally:
+            for store in stores:
+                store.close()
+
+    def test_compaction_fails_with_open_snapshot(self):
+        versions = VersionStore()
+        nodes, edges, properties = stores = self.__open(versions=versions)
+        for store in stores:
+            store.open()
+
+        try:
+            node_ids = self.__build(nodes, edges, properties)
+            self.__delete_node(nodes, edges, properties, node_ids[0])
+            edges_size = edges.size
+
+            with versions.snapshot():
+                with self.assertRaises(RuntimeError):
+                    Compactor(nodes, edges, properties).run()
+
+            self.assertEqual(edges_size, edges.size, 'Stores are not replaced')
+            self.assertFalse([name for name in listdir(self.temp_dir.name) if name.endswith('.compact')],
+                             'Compacted files are removed')
+        finally:
+            for store in stores:
+                store.close()
+
+    def test_throttle(self):
+        throttle = IoThrottle(100000)
+
+        started = monotonic()
+        for _ in range(10):
+            throttle.consume(2000)
+
+        self.assertGreaterEqual(monotonic() - started, 0.15, 'I/O rate is limited')
+
+        started = monotonic()
+        unlimited = IoThrottle()
+        unlimited.consume(10 ** 9)
+        self.assertLess(monotonic() - started, 0.1, 'Throttling can be disabled')
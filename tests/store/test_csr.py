@@ -0,0 +1,100 @@
+from os import listdir, path, remove
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from grapy.store.base.record import NULL_POINTER
+from grapy.store.csr import CsrIndex
+from grapy.store.edge import EdgeRecord, EdgeStore
+from grapy.store.node import NodeRecord, NodeStore
+
+
+def edge(first_node, second_node, in_use=True):
+    return EdgeRecord(in_use, first_node, second_node, NULL_POINTER, NULL_POINTER, 0)
+
+
+class CsrIndexTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def setUp(self):
+        self.node_store = NodeStore(dir=self.temp_dir.name, dense_ids=True)
+        self.edge_store = EdgeStore(dir=self.temp_dir.name, dense_ids=True)
+        self.node_store.open()
+        self.edge_store.open()
+
+        node = NodeRecord(True, NULL_POINTER, NULL_POINTER, 0, 0, 0, 0)
+        self.node_store.write_many([node] * 5)
+
+    def tearDown(self):
+        self.node_store.close()
+        self.edge_store.close()
+
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def test_build(self):
+        self.edge_store.write_many([edge(0, 1), edge(2, 3), edge(0, 4), edge(0, 2, in_use=False), edge(3, 0)])
+
+        with CsrIndex(dir=self.temp_dir.name) as index:
+            index.build(self.node_store, self.edge_store)
+
+            self.__assert_adjacency(index, {0: [1, 4], 2: [3], 3: [0]})
+            self.assertEqual(4, index.edge_count, 'Deleted edges are skipped')
+
+        with CsrIndex(dir=self.temp_dir.name) as index:
+            self.__assert_adjacency(index, {0: [1, 4], 2: [3], 3: [0]})
+
+    def test_refresh_adds_appended_edges(self):
+        self.edge_store.write_many([edge(0, 1), edge(2, 3)])
+
+        with CsrIndex(dir=self.temp_dir.name) as index:
+            index.build(self.node_store, self.edge_store)
+
+            self.node_store.write(NodeRecord(True, NULL_POINTER, NULL_POINTER, 0, 0, 0, 0))
+            self.edge_store.write_many([edge(0, 5), edge(5, 2)])
+
+            index.refresh(self.node_store, self.edge_store)
+
+            self.__assert_adjacency(index, {0: [1, 5], 2: [3], 5: [2]})
+            self.assertEqual(6, index.node_count, 'New node is added')
+
+    def test_refresh_after_released_slot_is_reused(self):
+        self.edge_store.write_many([edge(0, 1), edge(2, 3)])
+
+        with CsrIndex(dir=self.temp_dir.name) as index:
+            index.build(self.node_store, self.edge_store)
+
+            self.edge_store.delete(0)
+            self.assertEqual(0, self.edge_store.write(edge(4, 1)), 'Released slot is reused')
+
+            index.refresh(self.node_store, self.edge_store)
+
+            self.__assert_adjacency(index, {2: [3], 4: [1]})
+
+        with CsrIndex(dir=self.temp_dir.name) as index:
+            self.edge_store.delete(1)
+            index.refresh(self.node_store, self.edge_store)
+
+            self.__assert_adjacency(index, {4: [1]})
+
+    def test_refresh_without_snapshot_builds_it(self):
+        self.edge_store.write(edge(1, 2))
+
+        with CsrIndex(dir=self.temp_dir.name) as index:
+            index.refresh(self.node_store, self.edge_store)
+
+            self.__assert_adjacency(index, {1: [2]})
+
+    def __assert_adjacency(self, index, expected):
+        for slot in range(index.node_count):
+            neighbours = expected.get(slot, [])
+
+            self.assertListEqual(neighbours, list(index.neighbours(slot)), 'Node has expected neighbours')
+            self.assertEqual(len(neighbours), index.degree(slot), 'Node has expected degree')
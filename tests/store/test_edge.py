@@ -1,8 +1,100 @@
+from os import listdir, path, remove
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
-from grapy.store.edge import EdgeTypeRecord
+from grapy.store.base.record import NULL_POINTER
+from grapy.store.edge import EdgeRecord, EdgeStore, EdgeTypeRecord
+from grapy.store.node import NodeRecord
 from tests.store.common.record import NamedRecordTestCaseMixin
 
 
 class EdgeTypeRecordTestCase(TestCase, NamedRecordTestCaseMixin):
     record_type = EdgeTypeRecord
+
+
+class EdgeStoreTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def tearDown(self):
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def test_iter_edges_forward_chain(self):
+        with EdgeStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            edges = [EdgeRecord(True, 0, i, i + 1, NULL_POINTER, 0) for i in range(39)]
+            edges.append(EdgeRecord(True, 0, 39, NULL_POINTER, NULL_POINTER, 0))
+            store.write_many(edges)
+
+            node = NodeRecord(True, 0, NULL_POINTER, 0, 0, 0, 0)
+            self.__assert_chain(store, node, list(range(40)), edges)
+
+    def test_iter_edges_backward_chain(self):
+        with EdgeStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            edges = [EdgeRecord(True, 0, 0, NULL_POINTER, NULL_POINTER, 0)]
+            edges += [EdgeRecord(True, 0, i, i - 1, NULL_POINTER, 0) for i in range(1, 40)]
+            store.write_many(edges)
+
+            node = NodeRecord(True, 39, NULL_POINTER, 0, 0, 0, 0)
+            self.__assert_chain(store, node, list(reversed(range(40))), edges)
+
+    def test_iter_edge_views(self):
+        with EdgeStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            edges = [EdgeRecord(True, 0, 0, NULL_POINTER, NULL_POINTER, 0)]
+            edges += [EdgeRecord(True, 0, i, i - 1, NULL_POINTER, 0) for i in range(1, 40)]
+            store.write_many(edges)
+
+            node = NodeRecord(True, 39, NULL_POINTER, 0, 0, 0, 0)
+            views = set()
+            second_nodes = []
+            for _, view in store.iter_edge_views(node):
+                views.add(id(view))
+                second_nodes.append(view.second_node)
+
+            self.assertListEqual(list(reversed(range(40))), second_nodes, 'Chain is walked through views')
+            self.assertEqual(1, len(views), 'Single view is reused')
+
+    def test_chain_ends_at_deleted_edge(self):
+        with EdgeStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            store.write_many([EdgeRecord(True, 0, i, i + 1, NULL_POINTER, 0) for i in range(2)] +
+                             [EdgeRecord(True, 0, 2, NULL_POINTER, NULL_POINTER, 0)])
+            store.delete(1)
+
+            node = NodeRecord(True, 0, NULL_POINTER, 0, 0, 0, 0)
+            self.assertListEqual([0], [edge_id for edge_id, _ in store.iter_edges(node)],
+                                 'Chain is not walked past deleted edge')
+            self.assertListEqual([0], [edge_id for edge_id, _ in store.iter_edge_views(node)],
+                                 'Chain of views is not walked past deleted edge')
+
+            released = store.read(1)
+            self.assertFalse(released.in_use, 'Deleted edge is not in use')
+            self.assertEqual(NULL_POINTER, released.next_edge, 'Released slot does not point to other edges')
+
+    def test_iter_edges_of_node_without_edges(self):
+        with EdgeStore(dir=self.temp_dir.name) as store:
+            node = NodeRecord(True, NULL_POINTER, NULL_POINTER, 0, 0, 0, 0)
+
+            self.assertListEqual([], list(store.iter_edges(node)), 'Node has no edges')
+
+    def __assert_chain(self, store, node, expected_ids, edges):
+        reads = []
+        read_at = store._read_at
+
+        def counting_read_at(offset, size):
+            reads.append(offset)
+            return read_at(offset, size)
+
+        store._read_at = counting_read_at
+
+        chain = list(store.iter_edges(node))
+
+        self.assertListEqual(expected_ids, [record_id for record_id, _ in chain], 'Chain is walked in order')
+        self.assertListEqual([edges[i] for i in expected_ids], [edge for _, edge in chain], 'Edges are read')
+        self.assertLessEqual(len(reads), 4, 'Edges are read ahead in batches')
@@ -0,0 +1,146 @@
+import json
+from os import listdir, path, remove
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from grapy.store.base.record import NULL_SHORT_POINTER
+from grapy.store.edge import EdgeStore, EdgeTypeStore
+from grapy.store.importer import BulkImporter
+from grapy.store.label import LabelStore
+from grapy.store.node import NodeStore
+from grapy.store.property import PropertyNameStore, PropertyStore
+
+NODES_CSV = '''id,labels,name,age:int,score:float,active:bool
+a,Person;Admin,Alice,30,1.5,true
+b,Person,Bob,,2.5,false
+c,,Carol,41,,
+'''
+
+EDGES = [
+    {'source': 'a', 'target': 'b', 'type': 'KNOWS', 'properties': {'since': 2010}},
+    {'source': 'a', 'target': 'c', 'type': 'KNOWS', 'properties': {'tags': ['x', 'y'], 'note': None}},
+    {'source': 'b', 'target': 'c', 'type': 'LIKES'},
+    {'source': 'a', 'target': 'a', 'type': 'LIKES', 'properties': {'text': 'long text ' * 10}},
+]
+
+
+class BulkImporterTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def setUp(self):
+        self.input_dir = TemporaryDirectory()
+        self.nodes_file = path.join(self.input_dir.name, 'nodes.csv')
+        self.edges_file = path.join(self.input_dir.name, 'edges.jsonl')
+
+        with open(self.nodes_file, 'w', encoding='utf-8') as file:
+            file.write(NODES_CSV)
+
+        with open(self.edges_file, 'w', encoding='utf-8') as file:
+            for edge in EDGES:
+                file.write(json.dumps(edge) + '\n')
+
+    def tearDown(self):
+        self.input_dir.cleanup()
+
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def test_import(self):
+        summary = BulkImporter(self.temp_dir.name, batch_size=2).run([self.nodes_file], [self.edges_file])
+
+        self.assertEqual((3, 4, 12), (summary.nodes, summary.edges, summary.properties), 'Records are counted')
+        self.__assert_graph(dense_ids=False)
+
+    def test_import_with_process_pool(self):
+        BulkImporter(self.temp_dir.name, dense_ids=True, batch_size=1, processes=2).run(
+            [self.nodes_file], [self.edges_file])
+
+        self.__assert_graph(dense_ids=True)
+
+    def test_quoted_line_breaks_span_batches(self):
+        with open(self.nodes_file, 'w', encoding='utf-8') as file:
+            file.write('id,labels,note\na,Person,"line one\nline two"\nb,Person,"say ""hi""\n"\n')
+
+        for processes in [0, 2]:
+            summary = BulkImporter(self.temp_dir.name, dense_ids=True, batch_size=1, processes=processes).run(
+                [self.nodes_file])
+            self.assertEqual(2, summary.nodes, 'Quoted line break does not split record')
+
+            with PropertyStore(self.temp_dir.name, dense_ids=True) as properties:
+                values = [record.value for _, record in properties.iter_records()]
+
+            self.assertListEqual(['line one\nline two', 'say "hi"\n'], values, 'Line breaks are kept in values')
+
+            for file_name in listdir(self.temp_dir.name):
+                remove(path.join(self.temp_dir.name, file_name))
+
+    def test_json_nodes(self):
+        nodes_file = path.join(self.input_dir.name, 'nodes.jsonl')
+        with open(nodes_file, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({'id': 'a', 'labels': 'Person', 'name': 'Alice'}) + '\n')
+            file.write(json.dumps({'id': 'b', 'labels': ['Person', 'Admin']}) + '\n')
+
+        summary = BulkImporter(self.temp_dir.name, dense_ids=True).run([nodes_file])
+        self.assertEqual(2, summary.nodes, 'JSON nodes are imported')
+
+        with NodeStore(self.temp_dir.name, dense_ids=True) as nodes, LabelStore(self.temp_dir.name) as labels:
+            alice, bob = nodes.read(0), nodes.read(1)
+
+            self.assertListEqual(['Admin', 'Person'], sorted(labels.names()), 'Single label is not split into characters')
+            self.assertEqual((labels.lookup('Person'), NULL_SHORT_POINTER), (alice.label_1, alice.label_2),
+                             'Single label is resolved')
+            self.assertEqual(labels.lookup('Admin'), bob.label_2, 'Label lists are resolved')
+
+    def test_unknown_node(self):
+        with open(self.edges_file, 'a', encoding='utf-8') as file:
+            file.write(json.dumps({'source': 'a', 'target': 'x'}) + '\n')
+
+        with self.assertRaises(ValueError):
+            BulkImporter(self.temp_dir.name).run([self.nodes_file], [self.edges_file])
+
+    def test_stores_have_to_be_empty(self):
+        BulkImporter(self.temp_dir.name).run([self.nodes_file])
+
+        with self.assertRaises(ValueError):
+            BulkImporter(self.temp_dir.name).run([self.nodes_file])
+
+    def __assert_graph(self, dense_ids):
+        directory = self.temp_dir.name
+
+        with NodeStore(directory, dense_ids=dense_ids) as nodes, EdgeStore(directory, dense_ids=dense_ids) as edges, \
+                PropertyStore(directory, dense_ids=dense_ids) as properties, LabelStore(directory) as labels, \
+                EdgeTypeStore(directory) as edge_types, PropertyNameStore(directory) as property_names:
+            names = {pointer: name for name, pointer in property_names.names().items()}
+            type_names = {pointer: name for name, pointer in edge_types.names().items()}
+            node_ids = [record_id for record_id, _ in nodes.iter_records()]
+
+            def values_of(entity):
+                return {names[record.header.name_pointer]: record.value
+                        for _, record in properties.iter_properties(entity)}
+
+            alice, bob, carol = [nodes.read(record_id) for record_id in node_ids]
+
+            self.assertEqual({'name': 'Alice', 'age': 30, 'score': 1.5, 'active': True}, values_of(alice),
+                             'Typed CSV properties are imported')
+            self.assertEqual({'name': 'Bob', 'score': 2.5, 'active': False}, values_of(bob),
+                             'Empty values are skipped')
+            self.assertEqual(labels.lookup('Admin'), alice.label_2, 'Labels are resolved')
+            self.assertEqual(NULL_SHORT_POINTER, carol.label_1, 'Missing labels are empty')
+
+            chain = [edge for _, edge in edges.iter_edges(alice)]
+            self.assertListEqual([node_ids[0], node_ids[2], node_ids[1]], [edge.second_node for edge in chain],
+                                 'Edges of source node are chained from the last one')
+            self.assertListEqual(['LIKES', 'KNOWS', 'KNOWS'], [type_names[edge.edge_type] for edge in chain],
+                                 'Edge types are resolved')
+            self.assertEqual({'tags': '["x","y"]'}, values_of(chain[1]), 'Nested JSON values are serialized')
+            self.assertEqual('long text ' * 10, values_of(chain[0])['text'], 'Long values are imported')
+            self.assertEqual(1, len(list(edges.iter_edges(bob))), 'Each node has its own chain')
+            self.assertEqual([], list(edges.iter_edges(carol)), 'Node without edges has empty chain')
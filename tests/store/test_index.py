@@ -0,0 +1,190 @@
+from os import listdir, path, remove
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from grapy.store.base.record import NULL_POINTER, NULL_SHORT_POINTER
+from grapy.store.edge import EdgeRecord, EdgeStore
+from grapy.store.index import EdgeTypeIndex, HashValueIndex, LabelIndex, SortedValueIndex
+from grapy.store.node import NodeRecord, NodeStore
+from grapy.store.property import PropertyHeader, PropertyRecord, PropertyStore
+
+
+def node(*labels):
+    labels = list(labels) + [NULL_SHORT_POINTER] * (4 - len(labels))
+    return NodeRecord(True, NULL_POINTER, NULL_POINTER, *labels)
+
+
+class LabelIndexTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def tearDown(self):
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def test_index_follows_writes_and_deletes(self):
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True) as store, LabelIndex(store) as index:
+            store.write_many([node(1), node(1, 2), node(2), node(3)])
+            store.write(node(1, 2, 3))
+
+            self.assertListEqual([0, 1, 4], index.record_ids(index.postings(1)), 'Nodes with label are found')
+            self.assertListEqual([1, 4], index.record_ids(index.all_of(1, 2)), 'Labels are intersected')
+            self.assertListEqual([1, 2, 3, 4], index.record_ids(index.any_of(2, 3)), 'Labels are united')
+            self.assertListEqual([], index.record_ids(index.all_of(1, 7)), 'Unknown label matches nothing')
+
+            store.delete(1)
+            self.assertListEqual([0, 4], index.record_ids(index.postings(1)), 'Deleted node is removed')
+
+    def test_index_is_persisted(self):
+        with NodeStore(dir=self.temp_dir.name) as store, LabelIndex(store) as index:
+            record_ids = store.write_many([node(1), node(2), node(1)])
+
+        with NodeStore(dir=self.temp_dir.name) as store:
+            index = LabelIndex(store)
+            index.rebuild = None  # must not be needed
+
+            with index:
+                self.assertListEqual([record_ids[0], record_ids[2]], index.record_ids(index.postings(1)),
+                                     'Postings are loaded')
+
+    def test_stale_index_is_rebuilt(self):
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            with LabelIndex(store):
+                store.write(node(1))
+
+            # written while index is closed
+            store.write(node(1))
+
+            with LabelIndex(store) as index:
+                self.assertListEqual([0, 1], index.record_ids(index.postings(1)), 'Index is rebuilt')
+
+    def test_index_is_rebuilt_after_slot_reuse(self):
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            with LabelIndex(store):
+                store.write_many([node(7), node(7), node(7)])
+
+            # deleted and written again while index is closed, size stays the same
+            store.delete(1)
+            store.write(node(9))
+
+            with LabelIndex(store) as index:
+                self.assertListEqual([0, 2], index.record_ids(index.postings(7)), 'Deleted node is not found')
+                self.assertListEqual([1], index.record_ids(index.postings(9)), 'Node in reused slot is found')
+
+    def test_unclean_index_is_rebuilt(self):
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            index = LabelIndex(store)
+            index.open()
+            store.write(node(1))
+            # process dies without closing the index
+
+        with NodeStore(dir=self.temp_dir.name, dense_ids=True) as store, LabelIndex(store) as index:
+            self.assertListEqual([0], index.record_ids(index.postings(1)), 'Index is rebuilt')
+
+
+class EdgeTypeIndexTestCase(TestCase):
+    def test_edges_by_type(self):
+        with TemporaryDirectory() as temp_dir:
+            with EdgeStore(dir=temp_dir, dense_ids=True) as store, EdgeTypeIndex(store) as index:
+                store.write_many([EdgeRecord(True, 0, 1, NULL_POINTER, NULL_POINTER, edge_type)
+                                  for edge_type in [5, 6, 5, NULL_SHORT_POINTER]])
+
+                self.assertListEqual([0, 2], index.record_ids(index.postings(5)), 'Edges of type are found')
+                self.assertListEqual([5, 6], sorted(index.keys()), 'Edge types are indexed')
+
+
+def property_record(name_pointer, value):
+    record = PropertyRecord(PropertyHeader(name_pointer, NULL_POINTER, 0, 0))
+    record.value = value
+    return record
+
+
+class ValueIndexTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def tearDown(self):
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def test_hash_index(self):
+        with PropertyStore(dir=self.temp_dir.name) as store, HashValueIndex(store, 1) as index:
+            email = store.write(property_record(1, 'a@example.com'))
+            store.write(property_record(1, 'b@example.com'))
+            store.write(property_record(2, 'a@example.com'))
+            raw = store.write(property_record(1, b'a@example.com'))
+            store.write(property_record(1, 3.5))
+
+            self.assertListEqual([email], index.find('a@example.com'), 'Only values of indexed name are found')
+            self.assertListEqual([raw], index.find(b'a@example.com'), 'Bytes are not mixed with strings')
+            self.assertListEqual([], index.find(3.5), 'Floats are not hashed')
+
+        with PropertyStore(dir=self.temp_dir.name) as store, HashValueIndex(store, 1) as index:
+            self.assertListEqual([email], index.find('a@example.com'), 'Index is persisted')
+
+    def test_sorted_index(self):
+        with PropertyStore(dir=self.temp_dir.name) as store, SortedValueIndex(store, 7) as index:
+            ages = [40, 18, 30, 30.5, 65, 30]
+            record_ids = store.write_many([property_record(7, age) for age in ages])
+            store.write(property_record(7, 'thirty'))
+
+            by_age = dict(zip(record_ids, ages))
+
+            self.assertListEqual([40, 65], [by_age[i] for i in index.range(low=30.5, include_low=False)],
+                                 'Values above bound are found in order')
+            self.assertListEqual([18, 30, 30], [by_age[i] for i in index.range(high=30)], 'Upper bound is inclusive')
+            self.assertListEqual([30, 30], [by_age[i] for i in index.find(30)], 'Equal values are found')
+
+    def test_deleted_properties_are_removed(self):
+        with PropertyStore(dir=self.temp_dir.name) as store, \
+                HashValueIndex(store, 1) as hashed, SortedValueIndex(store, 1) as ordered:
+            record_ids = store.write_many([property_record(1, value) for value in [5, 1, 5]])
+            store.delete(record_ids[0])
+
+            self.assertListEqual([record_ids[2]], hashed.find(5), 'Deleted value is not hashed')
+            self.assertListEqual([record_ids[1], record_ids[2]], ordered.range(), 'Deleted value is not sorted')
+
+    def test_index_is_rebuilt_after_slot_reuse(self):
+        with PropertyStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            with HashValueIndex(store, 1):
+                store.write_many([property_record(1, value) for value in [5, 1, 3]])
+
+            store.delete(1)
+            store.write(property_record(1, 4))
+
+            with HashValueIndex(store, 1) as index:
+                self.assertListEqual([], index.find(1), 'Deleted value is not found')
+                self.assertListEqual([1], index.find(4), 'Value in reused slot is found')
+
+    def test_index_is_persisted_when_other_records_change(self):
+        with PropertyStore(dir=self.temp_dir.name) as store:
+            with HashValueIndex(store, 1):
+                store.write(property_record(1, 5))
+                store.delete(store.write(property_record(2, 5)))
+
+            index = HashValueIndex(store, 1)
+            index.rebuild = None  # must not be needed
+
+            with index:
+                self.assertEqual(1, len(index.find(5)), 'Index is loaded')
+
+    def test_index_is_rebuilt_from_store(self):
+        with PropertyStore(dir=self.temp_dir.name) as store:
+            store.write_many([property_record(1, value) for value in [5, 1, 3]])
+
+            with SortedValueIndex(store, 1) as index:
+                self.assertEqual(3, len(index.range(1, 5)), 'Existing properties are indexed')
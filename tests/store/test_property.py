@@ -1,10 +1,13 @@
-from os import path, remove
+from os import listdir, path, remove
 from random import randint, random
 from tempfile import TemporaryDirectory
 from unittest import TestCase
 
 from grapy.store.property import PropertyNameRecord, PropertyRecord, PropertyType, RecordType, ValueSerializer, \
-    PropertyHeader, ValueDeserializer, ValueStructFormatFactory, PROPERTY_STORE_FILE_NAME, PropertyStore
+    PropertyHeader, ValueDeserializer, ValueStructFormatFactory, PROPERTY_STORE_FILE_NAME, PropertyStore, \
+    PropertyCodec, INLINE_VALUE_SIZE, PropertyCompression, build_dictionary
+from grapy.store.base.record import NULL_POINTER
+from grapy.store.node import NodeRecord
 from tests.store.common.record import NamedRecordTestCaseMixin
 
 
@@ -139,6 +142,64 @@ class ValueStructFormatFactoryTestCase(TestCase):
             self.assertEqual(expected, actual, 'Should be valid format')
 
 
+class PropertyCodecTestCase(TestCase):
+    def test_encode_decode(self):
+        codec = PropertyCodec()
+        values = [
+            (3, PropertyType.INTEGER),
+            (-3.5, PropertyType.FLOAT),
+            (True, PropertyType.BOOL),
+            (b'test_bytes', PropertyType.BYTES),
+            (bytearray(b'test_bytes'), PropertyType.BYTES),
+            ('test_ąśż', PropertyType.STRING),
+            ('', PropertyType.STRING),
+            (PropertyType.STRING, PropertyType.INTEGER),
+        ]
+
+        for value, property_type in values:
+            record = PropertyRecord(PropertyHeader(1, 2, 0, 0))
+            record.value = value
+
+            buffer = codec.encode(record)
+            decoded = codec.decode(b'prefix' + buffer, len(b'prefix'))
+
+            self.assertEqual(property_type, record.header.type, 'Type is set on encode')
+            self.assertEqual(codec.record_struct.size, len(buffer), 'Record has fixed size')
+            self.assertIsNone(codec.blob_pointer(buffer), 'Value is inline')
+            self.assertListEqual([1, 2, property_type, record.header.length, value], list(decoded),
+                                 'Record is decoded')
+
+    def test_long_value_requires_blob_store(self):
+        record = PropertyRecord(PropertyHeader(1, 2, 0, 0))
+        record.value = 'a' * (INLINE_VALUE_SIZE + 1)
+
+        with self.assertRaises(ValueError):
+            PropertyCodec().encode(record)
+
+    def test_unsupported_type(self):
+        record = PropertyRecord(PropertyHeader(1, 2, 0, 0))
+        record.value = None
+
+        with self.assertRaises(ValueError):
+            PropertyCodec().encode(record)
+
+    def test_compression_fits_value_inline(self):
+        codec = PropertyCodec(compression=PropertyCompression.ZLIB, compression_threshold=32)
+        record = PropertyRecord(PropertyHeader(1, 2, 0, 0))
+        record.value = 'a' * 100
+
+        decoded = codec.decode(codec.encode(record))
+
+        self.assertEqual(PropertyCompression.ZLIB, decoded.header.codec, 'Codec is recorded in header')
+        self.assertLessEqual(decoded.header.length, INLINE_VALUE_SIZE, 'Compressed value is inline')
+        self.assertEqual(record.value, decoded.value, 'Value is decompressed')
+
+    def test_build_dictionary(self):
+        dictionary = build_dictionary(['first', b'second', 'third'], size=12)
+
+        self.assertEqual(b'secondfirst', dictionary, 'Samples fitting the size are used, first at the end')
+
+
 def integer_value_factory():
     return randint(0, 1000)
 
@@ -172,9 +233,8 @@ class PropertyStoreTestCase(TestCase):
         cls.temp_dir.cleanup()
 
     def tearDown(self):
-        file_name = path.join(self.temp_dir.name, PROPERTY_STORE_FILE_NAME)
-        if path.exists(file_name):
-            remove(file_name)
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
 
     def test_store_file_is_created(self):
         header = PropertyHeader(0, 0, 0, 0)
@@ -188,6 +248,131 @@ class PropertyStoreTestCase(TestCase):
 
         self.assertTrue(path.exists(file_name), 'File has been created')
 
+    def test_delete_releases_blob(self):
+        with PropertyStore(dir=self.temp_dir.name) as store:
+            record = PropertyRecord(PropertyHeader(0, NULL_POINTER, 0, 0))
+            record.value = 'long' * 100
+            first_id = store.write(record)
+            blob_size = path.getsize(store.blobs.store_file)
+
+            store.delete(first_id)
+            second_id = store.write(record)
+
+            self.assertEqual(first_id, second_id, 'Property slot is reused')
+            self.assertEqual(blob_size, path.getsize(store.blobs.store_file), 'Blob is reused')
+            self.assertEqual(record.value, store.read(second_id).value, 'Value is read from reused blob')
+
+    def test_iter_properties(self):
+        values = [1, 'name', b'\x00\x01', 2.5, True] * 20
+
+        with PropertyStore(dir=self.temp_dir.name) as store:
+            # chain is linked from the last written record towards the first one
+            next_property = NULL_POINTER
+            for value in values:
+                record = PropertyRecord(PropertyHeader(0, next_property, 0, 0))
+                record.value = value
+                next_property = store.write(record)
+
+            node = NodeRecord(True, NULL_POINTER, next_property, 0, 0, 0, 0)
+            chain = [record.value for _, record in store.iter_properties(node)]
+
+        self.assertListEqual(list(reversed(values)), chain, 'Properties are read in chain order')
+
+    def test_chain_ends_at_deleted_property(self):
+        with PropertyStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            next_property = NULL_POINTER
+            for value in [2, 1]:
+                record = PropertyRecord(PropertyHeader(value, next_property, 0, 0))
+                record.value = value
+                next_property = store.write(record)
+
+            store.delete(0)
+
+            node = NodeRecord(True, NULL_POINTER, next_property, 0, 0, 0, 0)
+            self.assertListEqual([1], [record.value for _, record in store.iter_properties(node)],
+                                 'Chain is not walked past deleted property')
+            self.assertListEqual([1], [property_id for property_id, _ in store.iter_property_views(node)],
+                                 'Chain of views is not walked past deleted property')
+            self.assertTrue(store.released(store.read(0)), 'Deleted property is released')
+
+    def test_chain_read_ahead_does_not_read_blobs(self):
+        with PropertyStore(dir=self.temp_dir.name, dense_ids=True) as store:
+            for i in range(16):
+                record = PropertyRecord(PropertyHeader(0, NULL_POINTER, 0, 0))
+                record.value = 'long value {0} '.format(i) * 10
+                store.write(record)
+
+            reads = []
+            read = store.blobs.read
+
+            def counting_read(pointer, length):
+                reads.append(pointer)
+                return read(pointer, length)
+
+            store.blobs.read = counting_read
+
+            node = NodeRecord(True, NULL_POINTER, 3, 0, 0, 0, 0)
+            chain = [record.value for _, record in store.iter_properties(node)]
+
+        self.assertListEqual(['long value 3 ' * 10], chain, 'Single property is read')
+        self.assertEqual(1, len(reads), 'Only blob of visited property is read')
+
+    def test_compressed_values(self):
+        json_like = '{{"name": "user {0}", "email": "user{0}@example.com", "active": true}}'
+        values = [json_like.format(i) for i in range(20)] + [b'\x00\x01' * 300, 'x' * 1000]
+
+        for compression in [PropertyCompression.ZLIB, PropertyCompression.LZMA]:
+            with PropertyStore(dir=self.temp_dir.name, compression=compression, compression_threshold=200,
+                               compression_dictionary=build_dictionary(values[:5])) as store:
+                record_ids = []
+                for value in values:
+                    record = PropertyRecord(PropertyHeader(0, NULL_POINTER, 0, 0))
+                    record.value = value
+                    record_ids.append(store.write(record))
+
+            with PropertyStore(dir=self.temp_dir.name) as store:
+                records = [store.read(record_id) for record_id in record_ids]
+
+                self.assertListEqual(values, [record.value for record in records], 'Values are decompressed')
+                self.assertEqual(PropertyCompression.ZLIB_DICTIONARY, records[10].header.codec,
+                                 'Short values are compressed with dictionary')
+                self.assertEqual(compression, records[-1].header.codec, 'Long values use store compression')
+
+            self.tearDown()
+
+    def test_compression_dictionary_can_not_change(self):
+        with PropertyStore(dir=self.temp_dir.name, compression_dictionary=b'first'):
+            pass
+
+        with self.assertRaises(ValueError):
+            PropertyStore(dir=self.temp_dir.name, compression_dictionary=b'second').open()
+
+    def test_single_read_per_inline_property(self):
+        values = ['short', 'long' * 100]
+
+        with PropertyStore(dir=self.temp_dir.name) as store:
+            record_ids = []
+            for value in values:
+                record = PropertyRecord(PropertyHeader(0, NULL_POINTER, 0, 0))
+                record.value = value
+                record_ids.append(store.write(record))
+
+            reads = []
+            read_at = store._read_at
+
+            def counting_read_at(offset, size):
+                reads.append(offset)
+                return read_at(offset, size)
+
+            store._read_at = counting_read_at
+
+            self.assertEqual(values[0], store.read(record_ids[0]).value, 'Short value is read')
+            self.assertEqual(1, len(reads), 'Short value is read inline')
+
+            self.assertEqual(values[1], store.read(record_ids[1]).value, 'Long value is read')
+            self.assertEqual(2, len(reads), 'Long value is read from blob store')
+            self.assertEqual(store.record_size, path.getsize(store.store_file) // 2, 'Records have fixed size')
+
     def test_integer_write_read(self):
         self.__test_write_read(integer_value_factory)
 
@@ -218,6 +403,34 @@ class PropertyStoreTestCase(TestCase):
 
         self.__test_write_read(value_factory, 1000)
 
+    def test_write_many(self):
+        factories = [
+            integer_value_factory,
+            float_value_factory,
+            bool_value_factory,
+            bytes_value_factory,
+            string_value_factory
+        ]
+
+        records = []
+        for i in range(50):
+            record = PropertyRecord(PropertyHeader(i, 0, 0, 0))
+            record.value = factories[i % len(factories)]()
+            records.append(record)
+
+        with PropertyStore(dir=self.temp_dir.name) as store:
+            record_ids = store.write_many(records)
+
+        with PropertyStore(dir=self.temp_dir.name) as store:
+            for record_id, record in zip(record_ids, records):
+                self.assertListEqual(list(record), list(store.read(record_id)), 'Record is properly read from file')
+
+            order = [49, 0, 12, 0, 7]
+            actual = store.read_many([record_ids[i] for i in order])
+
+            expected = [list(records[i]) for i in order]
+            self.assertListEqual(expected, [list(record) for record in actual], 'Records are returned in order')
+
     def __test_write_read(self, value_factory, iterations=10):
         records = []
 
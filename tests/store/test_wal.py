@@ -0,0 +1,170 @@
+from os import listdir, path, remove
+from tempfile import TemporaryDirectory
+from threading import Thread
+from time import sleep
+from unittest import TestCase
+
+from grapy.store.base.record import NULL_POINTER
+from grapy.store.edge import EdgeRecord, EdgeStore
+from grapy.store.node import NodeRecord, NodeStore
+from grapy.store.property import PropertyHeader, PropertyRecord, PropertyStore
+from grapy.store.wal import WriteAheadLog
+
+
+class WriteAheadLogTestCase(TestCase):
+    temp_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def setUp(self):
+        self.node_store = NodeStore(dir=self.temp_dir.name, dense_ids=True)
+        self.edge_store = EdgeStore(dir=self.temp_dir.name, dense_ids=True)
+        self.property_store = PropertyStore(dir=self.temp_dir.name)
+        self.stores = [self.node_store, self.edge_store, self.property_store]
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+
+        for file_name in listdir(self.temp_dir.name):
+            remove(path.join(self.temp_dir.name, file_name))
+
+    def __open(self, **kwargs):
+        log = WriteAheadLog(dir=self.temp_dir.name, stores=self.stores, **kwargs)
+        log.open()
+
+        for store in self.stores:
+            store.open()
+
+        return log
+
+    def test_transaction_writes_all_stores(self):
+        log = self.__open()
+
+        with log.transaction() as transaction:
+            name = PropertyRecord(PropertyHeader(0, NULL_POINTER, 0, 0))
+            name.value = 'Alice'
+            property_id = transaction.write(self.property_store, name)
+
+            first = transaction.write(self.node_store, NodeRecord(True, 1, property_id, 0, 0, 0, 0))
+            second = transaction.write(self.node_store, NodeRecord(True, NULL_POINTER, NULL_POINTER, 0, 0, 0, 0))
+            transaction.write(self.edge_store, EdgeRecord(True, first, second, NULL_POINTER, NULL_POINTER, 0))
+
+        self.assertEqual([0, 1], [first, second], 'Ids are reserved within transaction')
+        self.assertEqual(property_id, self.node_store.read(first).first_property, 'Node is applied')
+        self.assertEqual('Alice', self.property_store.read(property_id).value, 'Property is applied')
+        self.assertEqual(second, self.edge_store.read(0).second_node, 'Edge is applied')
+
+        log.close()
+        self.assertEqual(0, path.getsize(log.log_file), 'Log is truncated by checkpoint')
+
+    def test_rollback_releases_reserved_records(self):
+        log = self.__open()
+
+        with self.assertRaises(RuntimeError):
+            with log.transaction() as transaction:
+                transaction.write(self.node_store, NodeRecord(True, 1, 1, 1, 1, 1, 1))
+                raise RuntimeError()
+
+        self.assertEqual(0, log.commit_count, 'Nothing is committed')
+        self.assertEqual(1, len(self.node_store.free_list), 'Reserved slot is released')
+        released = self.node_store.read(0)
+        self.assertEqual((False, NULL_POINTER, NULL_POINTER),
+                         (released.in_use, released.first_edge, released.first_property),
+                         'Released slot looks like deleted record')
+        self.assertEqual(0, self.node_store.write(NodeRecord(True, 2, 2, 2, 2, 2, 2)), 'Released slot is reused')
+
+        log.close()
+
+    def test_recovery_replays_committed_transactions(self):
+        log = self.__open()
+
+        record = NodeRecord(True, 7, 7, 7, 7, 7, 7)
+        with log.transaction() as transaction:
+            record_id = transaction.write(self.node_store, record)
+
+        # crash - committed log is kept, store file lost its unsynced data
+        with open(log.log_file, 'rb') as file:
+            log_data = file.read()
+        for store in self.stores:
+            store.close()
+        log.close()
+
+        with open(self.node_store.store_file, 'wb'):
+            pass
+        with open(log.log_file, 'wb') as file:
+            file.write(log_data + b'\x05\x00\x00\x00torn')
+
+        log = self.__open()
+
+        self.assertListEqual(list(record), list(self.node_store.read(record_id)), 'Committed record is replayed')
+        self.assertEqual(0, path.getsize(log.log_file), 'Replayed log is cleared')
+
+        log.close()
+
+    def test_recovery_keeps_deleted_records(self):
+        log = self.__open()
+
+        with log.transaction() as transaction:
+            record_id = transaction.write(self.node_store, NodeRecord(True, 7, 7, 7, 7, 7, 7))
+        self.node_store.delete(record_id)
+
+        # crash before checkpoint - log still holds the committed record
+        with open(log.log_file, 'rb') as file:
+            log_data = file.read()
+        for store in self.stores:
+            store.close()
+        log.close()
+
+        with open(log.log_file, 'wb') as file:
+            file.write(log_data)
+
+        log = self.__open()
+
+        self.assertFalse(self.node_store.read(record_id).in_use, 'Deleted record is not revived')
+        self.assertEqual([record_id], list(self.node_store.free_list), 'Slot is free once')
+        self.assertEqual(record_id, self.node_store.write(NodeRecord(True, 1, 1, 1, 1, 1, 1)), 'Slot is reused')
+        self.assertEqual(record_id + 1, self.node_store.write(NodeRecord(True, 2, 2, 2, 2, 2, 2)),
+                         'Slot is not handed out twice')
+
+        log.close()
+
+    def test_group_commit(self):
+        log = self.__open(commit_delay=0.02)
+
+        def commit(i):
+            with log.transaction() as transaction:
+                transaction.write(self.node_store, NodeRecord(True, i, i, i, i, i, i))
+
+        threads = [Thread(target=commit, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(20, log.commit_count, 'Every transaction is committed')
+        self.assertLess(log.fsync_count, 20, 'Transactions share fsync calls')
+        self.assertEqual(20, self.node_store.record_count, 'Every record is applied')
+
+        log.close()
+
+    def test_background_checkpoint(self):
+        log = self.__open(checkpoint_size=1)
+
+        with log.transaction() as transaction:
+            transaction.write(self.node_store, NodeRecord(True, 1, 1, 1, 1, 1, 1))
+
+        for _ in range(50):
+            if log.log_size == 0:
+                break
+            sleep(0.01)
+
+        self.assertEqual(0, log.log_size, 'Log is checkpointed in background')
+
+        log.close()